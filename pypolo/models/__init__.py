@@ -1,9 +1,27 @@
 from . import kernels  # isort: skip
 from .base_model import BaseModel  # isort: skip
+from .retraining_scheduler import RetrainingScheduler  # isort: skip
+from .fantasy_posterior import FantasyPosterior  # isort: skip
 from .gpr_model import GPRModel  # isort: skip
+from .sgpr_model import SGPRModel  # isort: skip
+from .rff_model import RFFModel  # isort: skip
+from .local_gpr_model import LocalGPRModel  # isort: skip
+from .batched_gpr_model import BatchedGPRModel  # isort: skip
+from .multi_output_gpr_model import MultiOutputGPRModel  # isort: skip
+from .grid_gpr_model import GridGPRModel  # isort: skip
+from .vecchia_gpr_model import VecchiaGPRModel  # isort: skip
 
 __all__ = [
     "kernels",
     "BaseModel",
+    "RetrainingScheduler",
+    "FantasyPosterior",
     "GPRModel",
+    "SGPRModel",
+    "RFFModel",
+    "LocalGPRModel",
+    "BatchedGPRModel",
+    "MultiOutputGPRModel",
+    "GridGPRModel",
+    "VecchiaGPRModel",
 ]
@@ -1,32 +1,45 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, Union
+from typing import (TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple,
+                    Union)
 
 import numpy as np
+import torch
 
 from ..utils import torch_utils
 
+if TYPE_CHECKING:
+    from .retraining_scheduler import RetrainingScheduler
+
 
 class BaseModel(ABC):
     """Interface of a probabilistic model."""
 
     @abstractmethod
-    def __init__(self, device_name: str) -> None:
+    def __init__(self,
+                 device_name: str,
+                 precision: Optional[str] = None) -> None:
         r"""Initializes a model with the specified device name.
 
         Args:
             device_name (str): The name of the PyTorch device to be used for
                 computations.
+            precision (Optional[str], optional): Precision policy, one of
+                "float32", "float64", and "mixed". Defaults to None, i.e.,
+                float64 on CPU and float32 on CUDA.
 
         """
         super().__init__()
-        self.dtype, self.device = torch_utils.get_dtype_and_device(device_name)
+        self.precision = precision
+        self.dtype, self.device = torch_utils.get_dtype_and_device(
+            device_name, precision)
+        self.scheduler: Optional["RetrainingScheduler"] = None
 
     @abstractmethod
     def learn(self,
               x_new: np.ndarray,
               y_new: np.ndarray,
               num_iter: int,
-              verbose: bool = True) -> None:
+              verbose: bool = True) -> Optional[int]:
         r"""Optimizes the model parameters.
 
         Args:
@@ -38,25 +51,199 @@ class BaseModel(ABC):
             verbose (bool): Print the optimization information or not?
             writer (Union[SummaryWriter, None]): Tensorboard writer.
 
+        Returns:
+            Optional[int]: Number of optimization iterations actually run,
+                or None if the model does not report it.
+
         Raises:
             NotImplementedError: This is an abstract method and must be
                 implemented by derived classes.
         """
         raise NotImplementedError
 
+    def update(self,
+               x_new: np.ndarray,
+               y_new: np.ndarray,
+               num_iter: int,
+               verbose: bool = True,
+               **kwargs: Any) -> bool:
+        r"""Adds new data and optimizes the model when `scheduler` says so.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+            num_iter (int): Number of optimization/training iterations of a
+                retraining.
+            verbose (bool): Print the optimization information or not?
+            **kwargs (Any): Further arguments of `learn` for optimizing,
+                e.g., `tol`.
+
+        Returns:
+            bool: Whether the model parameters were optimized.
+
+        ??? tip "When to use this method?"
+
+            Missions that call `learn` after every measurement can call
+            `update` instead and attach a `RetrainingScheduler` as
+            `scheduler`. Without a scheduler, `update` is `learn`.
+
+        """
+        if self.scheduler is None:
+            self.learn(x_new, y_new, num_iter, verbose, **kwargs)
+            return True
+        return self.scheduler.step(self, x_new, y_new, num_iter, verbose,
+                                   **kwargs)
+
     @abstractmethod
-    def predict(self, x_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """Makes predictions.
 
         Args:
             x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
 
         Returns:
-            Tuple[np.ndarray, np.ndarray]: A tuple containing predictive mean
-                and predictive standard deviation of shape (num_inputs, 1).
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
+
+        ??? tip "Only pay for what you consume"
+
+            Objectives that only need the uncertainty should use
+            `mode="var"`, and visualizations that only need the mean should
+            use `mode="mean"`, which skips the costly triangular solve.
 
         Raises:
             NotImplementedError: This is an abstract method and must be
                 implemented by derived classes.
         """
         raise NotImplementedError
+
+    def predict_chunks(
+        self,
+        x_test: np.ndarray,
+        chunk_size: int,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Iterator[Tuple[slice, Optional[np.ndarray], Optional[np.ndarray]]]:
+        """Makes predictions chunk by chunk.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            chunk_size (int): Maximum number of test inputs per chunk.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Yields:
+            Tuple[slice, Optional[np.ndarray], Optional[np.ndarray]]: The rows
+                of `x_test` in the chunk, and the predictive mean and
+                predictive standard deviation of the chunk.
+
+        Raises:
+            ValueError: If `chunk_size` is not positive.
+
+        ??? tip "When to use this generator?"
+
+            Pipelines that consume the predictions chunk by chunk (e.g.,
+            writing a map to disk) never hold the whole prediction in memory.
+
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        num_inputs = x_test.shape[0]
+        for start in range(0, num_inputs, chunk_size):
+            index = slice(start, min(start + chunk_size, num_inputs))
+            mean, std = self.predict(x_test[index],
+                                     mode=mode,
+                                     noise_free=noise_free)
+            yield index, mean, std
+
+    def save(self, path: str) -> None:
+        r"""Saves the training data, parameters, and cached factorizations.
+
+        Args:
+            path (str): Path of the checkpoint file.
+
+        ??? tip "Skip the replay"
+
+            A model constructed with the same arguments can `load` the file
+            and `predict` right away, without replaying the data through
+            `learn` or refactorizing the covariance matrix.
+
+        """
+        checkpoint = self._get_checkpoint()
+        checkpoint["model"] = type(self).__name__
+        torch.save(checkpoint, path)
+
+    def load(self, path: str) -> None:
+        r"""Restores a checkpoint written by `save`.
+
+        Args:
+            path (str): Path of the checkpoint file.
+
+        Raises:
+            ValueError: If the checkpoint was saved by another model class.
+
+        ??? note "Memory mapping"
+
+            The file is memory-mapped where the installed PyTorch supports
+            it, so large factors are paged in lazily instead of being read
+            into memory up front.
+
+        """
+        try:
+            checkpoint = torch.load(path, map_location=self.device, mmap=True)
+        except TypeError:
+            # `mmap` is only available in PyTorch 2.1 and later.
+            checkpoint = torch.load(path, map_location=self.device)
+        if checkpoint.get("model") != type(self).__name__:
+            raise ValueError(f"Checkpoint of {checkpoint.get('model')} " +
+                             f"cannot be loaded into {type(self).__name__}.")
+        self._set_checkpoint(checkpoint)
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the state to be saved.
+
+        Raises:
+            NotImplementedError: If the model does not support checkpoints.
+
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support checkpoints.")
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`.
+
+        Raises:
+            NotImplementedError: If the model does not support checkpoints.
+
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support checkpoints.")
+
+    @staticmethod
+    def _validate_mode(mode: str) -> None:
+        r"""Check if the prediction `mode` is valid.
+
+        Args:
+            mode (str): Which predictive moments to compute.
+
+        Raises:
+            ValueError: If `mode` is not one of "mean", "var", and "both".
+
+        """
+        if mode not in ("mean", "var", "both"):
+            raise ValueError("mode must be one of 'mean', 'var', and 'both'.")
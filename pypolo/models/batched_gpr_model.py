@@ -0,0 +1,479 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from torch import nn
+from torch.nn import Parameter
+from tqdm import tqdm
+
+from ..utils import TensorBuffer, torch_utils
+from .base_model import BaseModel
+from .kernels import BaseKernel
+
+
+class BatchedGPRModel(BaseModel, nn.Module):
+
+    def __init__(self,
+                 device_name: str,
+                 kernels: Sequence[BaseKernel],
+                 noise: Union[float, Sequence[float], np.ndarray],
+                 lr_hyper: float = 0.01,
+                 jitter: Optional[float] = None,
+                 precision: Optional[str] = None) -> None:
+        r"""Independent Gaussian process regression models in one batch.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernels (Sequence[BaseKernel]): One kernel per model, e.g.,
+                `GaussianKernel`, `MaternKernel`, or a `SumKernel`.
+            noise (Union[float, Sequence[float], np.ndarray]): Initial noise
+                variance, either shared by all models or one per model.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (Optional[float], optional): The jitter to add to the
+                diagonal of the covariance matrices. Defaults to None, i.e.,
+                `torch_utils.default_jitter` of the factorization dtype.
+            precision (Optional[str], optional): Precision policy, one of
+                "float32", "float64", and "mixed". Must match the precision
+                of the kernels. Defaults to None, i.e., float64 on CPU and
+                float32 on CUDA.
+
+        Raises:
+            ValueError: If `kernels` is empty, if a kernel has another dtype
+                than the model, or if `noise` does not have one entry per
+                model.
+
+        ??? note "Padding and masking"
+
+            The training sets are zero-padded to the size $N$ of the largest
+            one and stacked into a (num_models, N, N) covariance tensor. The
+            rows and columns of the padded entries are replaced by those of
+            the identity matrix, which leaves the Cholesky factor, the
+            solution, and the log-determinant of the valid block unchanged.
+            Hence, `learn` and `predict` run one batched `cholesky_ex` and
+            `cholesky_solve` for all models per iteration, and the loss is
+            the sum of the independent negative log marginal likelihoods.
+            The kernels are evaluated model by model, so every model may
+            have a different kind of kernel.
+
+        ??? note "Mixed precision"
+
+            As in `GPRModel`, `precision="mixed"` factorizes in float32 and
+            refines the solutions against the float64 covariance matrices.
+
+        """
+        if len(kernels) == 0:
+            raise ValueError("kernels must not be empty.")
+        BaseModel.__init__(self, device_name, precision)
+        if any(kernel.dtype != self.dtype for kernel in kernels):
+            raise ValueError("kernels and model must have the same dtype.")
+        nn.Module.__init__(self)
+        self.num_models = len(kernels)
+        self.kernels = nn.ModuleList(kernels)
+        self._free_noise = Parameter(
+            torch_utils.inv_softplus(self._per_model(noise)))
+        self.lr_hyper = lr_hyper
+        self.opt_hyper = torch.optim.Adam(self.parameters(), lr=lr_hyper)
+        self._factor_dtype = torch_utils.factor_dtype(self.dtype, precision)
+        if jitter is None:
+            jitter = torch_utils.default_jitter(self._factor_dtype)
+        self.jitter = jitter
+        self._num_updates = 0
+        self._cache = None
+        self._cache_key = None
+        self._x_buffers = [
+            TensorBuffer(self.dtype, self.device)
+            for _ in range(self.num_models)
+        ]
+        self._y_buffers = [
+            TensorBuffer(self.dtype, self.device)
+            for _ in range(self.num_models)
+        ]
+        self._x_train = None
+        self._y_train = None
+        self._mask = None
+
+    def learn(self,
+              x_new: Sequence[Optional[np.ndarray]],
+              y_new: Sequence[Optional[np.ndarray]],
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Adds new data to every model and optimizes all of them.
+
+        Args:
+            x_new (Sequence[Optional[np.ndarray]]): New training inputs of
+                every model, each of shape (num_inputs, dim_inputs). None or
+                an empty array means no new data for that model.
+            y_new (Sequence[Optional[np.ndarray]]): New training outputs of
+                every model, each of shape (num_inputs, 1).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._add_data(x_new, y_new)
+        self.train()
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            self.opt_hyper.zero_grad()
+            loss = self._compute_loss()
+            loss.backward()
+            self.opt_hyper.step()
+            progress_bar.set_description(
+                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+        if num_iter > 0:
+            self._num_updates += 1
+        self.eval()
+
+    def predict(
+        self,
+        x_test: Union[np.ndarray, Sequence[np.ndarray]],
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[List[np.ndarray]], Optional[List[np.ndarray]]]:
+        """Makes predictions with every model.
+
+        Args:
+            x_test (Union[np.ndarray, Sequence[np.ndarray]]): Test inputs of
+                shape (num_inputs, dim_inputs) shared by all models, or one
+                such array per model.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[List[np.ndarray]], Optional[List[np.ndarray]]]:
+                Lists containing the predictive mean and predictive standard
+                deviation of every model, each of shape (num_inputs, 1). The
+                entry not requested by `mode` is None.
+
+        Raises:
+            ValueError: If `x_test` is a sequence without one entry per
+                model, or if no model has training data yet.
+
+        """
+        self._validate_mode(mode)
+        if isinstance(x_test, np.ndarray):
+            x_test = [x_test] * self.num_models
+        if len(x_test) != self.num_models:
+            raise ValueError("x_test must contain one array per model.")
+        x_test_tensor, _ = self._pad(x_test)
+        mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                               noise_free=noise_free,
+                                               mode=mode)
+        sizes = [len(x) for x in x_test]
+        mean, std = None, None
+        if mean_tensor is not None:
+            mean_array = mean_tensor.cpu().numpy()
+            mean = [mean_array[b, :size] for b, size in enumerate(sizes)]
+        if std_tensor is not None:
+            std_array = std_tensor.cpu().numpy()
+            std = [std_array[b, :size] for b, size in enumerate(sizes)]
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_models, num_inputs, dim_inputs).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_models, num_inputs, 1), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_models, num_inputs, 1), or None if `mode` is
+                "mean".
+
+        Raises:
+            ValueError: If no model has training data yet.
+
+        """
+        if self._mask is None:
+            raise ValueError("The model has no training data. Call learn " +
+                             "before predicting.")
+        with torch.no_grad():
+            mean, std = None, None
+            L, iK_y = self._cached_common()
+            # Padded training entries must not contribute to the predictions.
+            Ksn = self._kernel(x_test, self.x_train) * self._mask.transpose(
+                -2, -1)
+            if mode in ("mean", "both"):
+                mean = Ksn @ iK_y
+            if mode in ("var", "both"):
+                Kns = Ksn.transpose(-2, -1)
+                if L.dtype == self.dtype:
+                    iL_Kns = torch.linalg.solve_triangular(L,
+                                                           Kns,
+                                                           upper=False)
+                    explained = iL_Kns.square().sum(-2).unsqueeze(-1)
+                else:
+                    K = self._covariance()
+                    iK_Kns = torch_utils.refined_cholesky_solve(
+                        L, Kns, lambda v: K @ v)
+                    explained = (Kns * iK_Kns).sum(-2).unsqueeze(-1)
+                prior = torch.stack([
+                    kernel.diag(x) for kernel, x in zip(self.kernels, x_test)
+                ])
+                var = prior - explained
+                if not noise_free:
+                    var = var + self.noise
+                std = var.clamp_min(0.0).sqrt()
+        return mean, std
+
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Zero-padded training inputs of shape (num_models, N, dim)."""
+        return self._x_train
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Zero-padded training outputs of shape (num_models, N, 1)."""
+        return self._y_train
+
+    @property
+    def num_train(self) -> List[int]:
+        r"""Number of training samples of every model."""
+        return [len(buffer) for buffer in self._x_buffers]
+
+    @property
+    def noise(self) -> torch.Tensor:
+        r"""Noise variances of shape (num_models, 1, 1)."""
+        return torch_utils.softplus(self._free_noise)
+
+    def _per_model(
+            self, value: Union[float, Sequence[float],
+                               np.ndarray]) -> torch.Tensor:
+        r"""Broadcasts a hyper-parameter to shape (num_models, 1, 1).
+
+        Args:
+            value (Union[float, Sequence[float], np.ndarray]): A scalar shared
+                by all models or a vector with one entry per model.
+
+        Returns:
+            torch.Tensor: Tensor of shape (num_models, 1, 1).
+
+        Raises:
+            ValueError: If `value` does not have one entry per model.
+
+        """
+        value = torch.as_tensor(value, dtype=self.dtype, device=self.device)
+        if value.ndim == 0:
+            value = value.expand(self.num_models)
+        if value.shape != (self.num_models, ):
+            raise ValueError("Per-model hyper-parameters must have " +
+                             "num_models entries.")
+        return value.view(self.num_models, 1, 1).clone()
+
+    def _kernel(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
+        r"""Covariance matrices of shape (num_models, n1, n2).
+
+        Every model evaluates its own kernel on its slice of the inputs.
+
+        """
+        return torch.stack([
+            kernel(a, b) for kernel, a, b in zip(self.kernels, x1, x2)
+        ])
+
+    def _add_data(self, x_new: Sequence[Optional[np.ndarray]],
+                  y_new: Sequence[Optional[np.ndarray]]) -> None:
+        r"""Appends the new data and rebuilds the padded training tensors.
+
+        Args:
+            x_new (Sequence[Optional[np.ndarray]]): New inputs of every model.
+            y_new (Sequence[Optional[np.ndarray]]): New outputs of every
+                model.
+
+        Raises:
+            ValueError: If the sequences do not have one entry per model or
+                if the inputs and outputs of a model have different lengths.
+
+        """
+        if len(x_new) != self.num_models or len(y_new) != self.num_models:
+            raise ValueError("x_new and y_new must contain one array per " +
+                             "model.")
+        updates = []
+        for b, (x, y) in enumerate(zip(x_new, y_new)):
+            if x is None or len(x) == 0:
+                continue
+            if y is None or x.shape[0] != y.shape[0]:
+                raise ValueError("x_new and y_new should have same length.")
+            if y.ndim != 2 or y.shape[1] != 1:
+                raise ValueError("y_new must be of shape (num_outputs, 1).")
+            updates.append((b, x, y))
+        if not updates and max(self.num_train) == 0:
+            raise ValueError("At least one model needs training data.")
+        for b, x, y in updates:
+            self._x_buffers[b].append(x)
+            self._y_buffers[b].append(y)
+        self._x_train, self._mask = self._pad(self._buffer_data(
+            self._x_buffers))
+        self._y_train, _ = self._pad(self._buffer_data(self._y_buffers))
+        self._num_updates += 1
+
+    @staticmethod
+    def _buffer_data(buffers: List[TensorBuffer]) -> List[torch.Tensor]:
+        r"""Data of the buffers, where empty ones become zero-row tensors.
+
+        Models without data are fully padded and predict with their prior.
+
+        """
+        reference = next(buffer.data for buffer in buffers if len(buffer))
+        return [
+            buffer.data if len(buffer) else reference[:0]
+            for buffer in buffers
+        ]
+
+    def _pad(
+        self, arrays: Sequence[Union[np.ndarray, torch.Tensor]]
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Stacks arrays of different lengths with zero padding.
+
+        Args:
+            arrays (Sequence[Union[np.ndarray, torch.Tensor]]): One array of
+                shape (num_rows, dim) per model.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: The padded tensor of shape
+                (num_models, max_num_rows, dim), and the mask of shape
+                (num_models, max_num_rows, 1) that is one at the valid rows.
+
+        """
+        tensors = [
+            torch.as_tensor(array, dtype=self.dtype, device=self.device)
+            for array in arrays
+        ]
+        max_rows = max(tensor.shape[0] for tensor in tensors)
+        padded = torch.zeros(len(tensors),
+                             max_rows,
+                             tensors[0].shape[1],
+                             dtype=self.dtype,
+                             device=self.device)
+        mask = torch.zeros(len(tensors),
+                           max_rows,
+                           1,
+                           dtype=self.dtype,
+                           device=self.device)
+        for b, tensor in enumerate(tensors):
+            padded[b, :tensor.shape[0]] = tensor
+            mask[b, :tensor.shape[0]] = 1.0
+        return padded, mask
+
+    def _compute_loss(self) -> torch.Tensor:
+        r"""Compute the summed negative log marginal likelihood.
+
+        Returns:
+            torch.Tensor: The training loss of all models.
+
+        """
+        L, iK_y = self._compute_common()
+        quadratic = torch.sum(self.y_train * iK_y)
+        diagonal = L.diagonal(dim1=-2, dim2=-1).to(self.dtype)
+        logdet = diagonal.square().log().sum()
+        constant = sum(self.num_train) * np.log(2 * np.pi)
+        return 0.5 * (quadratic + logdet + constant)
+
+    def _compute_common(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Compute the batched Cholesky factors and `iK_y`.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factors of the padded training
+                covariance matrices. Shape: (num_models, N, N).
+            iK_y (torch.Tensor): Inverse training covariance matrices
+                multiplied by training outputs. Shape: (num_models, N, 1).
+
+        """
+        K = self._covariance()
+        L = torch_utils.robust_cholesky(K.to(self._factor_dtype),
+                                        jitter=self.jitter)
+        if L.dtype == self.dtype:
+            iK_y = torch.cholesky_solve(self.y_train, L, upper=False)
+        else:
+            iK_y = torch_utils.refined_cholesky_solve(L, self.y_train,
+                                                      lambda v: K @ v)
+        return L, iK_y
+
+    def _covariance(self) -> torch.Tensor:
+        r"""Padded training covariance matrices of shape (num_models, N, N)."""
+        mask = self._mask
+        K = self._kernel(self.x_train, self.x_train)
+        K = K * (mask @ mask.transpose(-2, -1))
+        # Valid entries get the noise variance and padded ones a unit
+        # diagonal, so that the padded block of K_y is the identity.
+        diagonal = mask * self.noise + (1.0 - mask)
+        return K + torch.diag_embed(diagonal.squeeze(-1))
+
+    def _cached_common(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Cached version of `_compute_common` for prediction.
+
+        ??? note "When is the cache refreshed?"
+
+            The cache is keyed on the number of updates to the training data
+            and hyper-parameters, which is increased by `_add_data` and
+            `learn`, and on the `hyper_version` of every kernel, which
+            increases when a kernel hyper-parameter is set directly.
+
+        """
+        version = self._cache_version()
+        if self._cache is None or self._cache_key != version:
+            with torch.no_grad():
+                self._cache = self._compute_common()
+            self._cache_key = version
+        return self._cache
+
+    def _cache_version(self) -> Tuple[int, Tuple[int, ...]]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, tuple(kernel.hyper_version
+                                        for kernel in self.kernels)
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, and posterior cache."""
+        has_data = max(self.num_train) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": [
+                buffer.data.clone() if len(buffer) else None
+                for buffer in self._x_buffers
+            ],
+            "y_train": [
+                buffer.data.clone() if len(buffer) else None
+                for buffer in self._y_buffers
+            ],
+            "cache": self._cached_common() if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self.opt_hyper = torch.optim.Adam(self.parameters(), lr=self.lr_hyper)
+        self._x_buffers = [
+            TensorBuffer(self.dtype, self.device)
+            for _ in range(self.num_models)
+        ]
+        self._y_buffers = [
+            TensorBuffer(self.dtype, self.device)
+            for _ in range(self.num_models)
+        ]
+        for b, (x, y) in enumerate(
+                zip(checkpoint["x_train"], checkpoint["y_train"])):
+            if x is not None:
+                self._x_buffers[b].append(x)
+                self._y_buffers[b].append(y)
+        self._x_train, self._y_train, self._mask = None, None, None
+        if max(self.num_train) > 0:
+            self._x_train, self._mask = self._pad(
+                self._buffer_data(self._x_buffers))
+            self._y_train, _ = self._pad(self._buffer_data(self._y_buffers))
+        self._num_updates += 1
+        self._cache = checkpoint["cache"]
+        self._cache_key = None
+        if self._cache is not None:
+            self._cache_key = self._cache_version()
@@ -0,0 +1,224 @@
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+import torch
+
+from ..utils import torch_utils
+from .base_model import BaseModel
+
+if TYPE_CHECKING:
+    from .gpr_model import GPRModel
+
+
+class FantasyPosterior:
+
+    def __init__(
+        self,
+        model: "GPRModel",
+        x_fantasy: np.ndarray,
+        y_fantasy: Optional[np.ndarray] = None,
+    ) -> None:
+        r"""Posterior of a `GPRModel` conditioned on fantasy observations.
+
+        Args:
+            model (GPRModel): The parent model, which is not modified.
+            x_fantasy (np.ndarray): Fantasy inputs of shape
+                (num_fantasy, dim_inputs), or a batch of fantasy sets of shape
+                (batch_size, num_fantasy, dim_inputs).
+            y_fantasy (Optional[np.ndarray], optional): Fantasy outputs of
+                shape (num_fantasy, dim_outputs) or
+                (batch_size, num_fantasy, dim_outputs). Defaults to None,
+                i.e., the fantasy outputs equal the predictive mean of the
+                parent, which leaves the mean unchanged and only shrinks the
+                variance.
+
+        Raises:
+            ValueError: If the shapes of `x_fantasy` and `y_fantasy` are
+                invalid.
+
+        ??? warning "Snapshot of the parent"
+
+            The posterior keeps the training inputs and the factorization of
+            the parent at construction. Predictions raise a ValueError once
+            the parent has changed its data or hyper-parameters, and a new
+            posterior has to be created with `condition_on`.
+
+        ??? note "Block Cholesky extension"
+
+            With the cached factor $\boldsymbol{L}$ of the parent,
+            $\boldsymbol{B}=\boldsymbol{L}^{-1}\boldsymbol{K}_{nf}$ and the
+            factor $\boldsymbol{L}_{f}$ of the Schur complement
+            $\boldsymbol{K}_{ff}+\sigma^2\mathbf{I}-
+            \boldsymbol{B}^{\intercal}\boldsymbol{B}$ are the only new
+            blocks of the extended factor. They cost
+            $O(n^2k + nk^2)$ per fantasy set of size $k$ instead of the
+            $O((n+k)^3)$ of refactorizing, and all fantasy sets of a batch
+            are handled by the same batched triangular solves.
+
+        """
+        x_fantasy = torch.as_tensor(x_fantasy,
+                                    dtype=model.dtype,
+                                    device=model.device)
+        self.is_batched = x_fantasy.ndim == 3
+        if x_fantasy.ndim == 2:
+            x_fantasy = x_fantasy.unsqueeze(0)
+        dim_inputs = model.x_train.shape[1]
+        if x_fantasy.ndim != 3 or x_fantasy.shape[-1] != dim_inputs:
+            raise ValueError("x_fantasy must be of shape " +
+                             "([batch_size,] num_fantasy, dim_inputs).")
+        self.model = model
+        self.x_fantasy = x_fantasy
+        with torch.no_grad():
+            L, iK_y = model._cached_common()
+            self._L, self._iK_y = L, iK_y
+            self._version = model._cache_version()
+            self._x_train = model.x_train.clone()
+            K_nf = model.kernel(self._expand(self._x_train), x_fantasy)
+            self._B = torch.linalg.solve_triangular(L,
+                                                    K_nf.to(L.dtype),
+                                                    upper=False)
+            K_ff = model.kernel(x_fantasy, x_fantasy)
+            K_ff.diagonal(dim1=-2, dim2=-1).add_(model.noise)
+            schur = K_ff.to(L.dtype) - self._B.transpose(-2, -1) @ self._B
+            self._L_f = torch_utils.robust_cholesky(schur, jitter=model.jitter)
+            self._alpha = None
+            if y_fantasy is not None:
+                y_fantasy = torch.as_tensor(y_fantasy,
+                                            dtype=model.dtype,
+                                            device=model.device)
+                if y_fantasy.ndim == 2:
+                    y_fantasy = y_fantasy.unsqueeze(0)
+                if (y_fantasy.shape[:2] != x_fantasy.shape[:2]
+                        or y_fantasy.shape[2] != iK_y.shape[1]):
+                    raise ValueError("y_fantasy must match x_fantasy and " +
+                                     "the training outputs.")
+                residual = y_fantasy - K_nf.transpose(-2, -1) @ iK_y
+                self._alpha = torch.cholesky_solve(residual.to(L.dtype),
+                                                   self._L_f,
+                                                   upper=False)
+
+    @property
+    def batch_size(self) -> int:
+        r"""Number of fantasy sets."""
+        return self.x_fantasy.shape[0]
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions with the fantasy posterior.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs)
+                shared by all fantasy sets, or of shape
+                (batch_size, num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean of shape
+                ([batch_size,] num_inputs, dim_outputs) and predictive
+                standard deviation of shape ([batch_size,] num_inputs, 1).
+                The batch dimension is present if the fantasy inputs were
+                batched. The entry not requested by `mode` is None.
+
+        """
+        BaseModel._validate_mode(mode)
+        x_test = torch.as_tensor(x_test,
+                                 dtype=self.model.dtype,
+                                 device=self.model.device)
+        mean, std = self.forward(x_test, noise_free, mode)
+        if mean is not None:
+            mean = mean.cpu().numpy()
+            mean = mean if self.is_batched else mean[0]
+        if std is not None:
+            std = std.cpu().numpy()
+            std = std if self.is_batched else std[0]
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_inputs, dim_inputs) shared by all fantasy sets, or of
+                shape (batch_size, num_inputs, dim_inputs).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (batch_size, num_inputs, dim_outputs), or None if `mode` is
+                "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (batch_size, num_inputs, 1), or None if `mode` is
+                "mean".
+
+        Raises:
+            ValueError: If the parent model changed after construction.
+
+        ??? tip "Shared test inputs"
+
+            Test inputs shared by all fantasy sets have the same covariance
+            with the training inputs in every set, so the cross-covariance
+            and its $O(n^2m)$ triangular solve are computed once and
+            broadcast. Only the terms that involve the fantasy inputs are
+            computed per set.
+
+        """
+        model, L = self.model, self._L
+        if model._cache_version() != self._version:
+            raise ValueError("The parent model changed after condition_on.")
+        with torch.no_grad():
+            mean, std = None, None
+            # Also checks the batch size of batched test inputs.
+            x_batch = self._expand(x_test)
+            x_train = self._x_train
+            if x_test.ndim == 3:
+                x_train = self._expand(x_train)
+            K_sn = model.kernel(x_test, x_train)
+            if mode in ("var", "both") or self._alpha is not None:
+                K_ns = K_sn.transpose(-2, -1).to(L.dtype)
+                V = torch.linalg.solve_triangular(L, K_ns, upper=False)
+                # Posterior covariance between the test and fantasy inputs.
+                K_sf = model.kernel(x_batch, self.x_fantasy)
+                C = K_sf.to(L.dtype) - V.transpose(-2, -1) @ self._B
+            if mode in ("mean", "both"):
+                mean = K_sn @ self._iK_y
+                if self._alpha is not None:
+                    mean = mean + (C @ self._alpha).to(model.dtype)
+                mean = mean.expand(self.batch_size, *mean.shape[-2:])
+            if mode in ("var", "both"):
+                W = torch.linalg.solve_triangular(self._L_f,
+                                                  C.transpose(-2, -1),
+                                                  upper=False)
+                explained = (V.square().sum(-2).unsqueeze(-1) +
+                             W.square().sum(-2).unsqueeze(-1))
+                Kss_diag = model.kernel.diag(x_test.reshape(
+                    -1, x_test.shape[-1])).view(*x_test.shape[:-1], 1)
+                var = Kss_diag - explained.to(model.dtype)
+                var.clamp_(min=model.jitter)
+                if not noise_free:
+                    var += model.noise
+                std = var.sqrt()
+        return mean, std
+
+    def _expand(self, x: torch.Tensor) -> torch.Tensor:
+        r"""Expands unbatched inputs to (batch_size, num_inputs, dim)."""
+        if x.ndim == 2:
+            return x.expand(self.batch_size, *x.shape)
+        if x.shape[0] != self.batch_size:
+            raise ValueError("Batched inputs must have batch_size entries.")
+        return x
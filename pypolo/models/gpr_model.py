@@ -1,13 +1,19 @@
-from typing import Tuple, Union
+import copy
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 import numpy as np
 import torch
 from torch import nn
 from torch.nn import Parameter
+from torch.utils.checkpoint import checkpoint
 from tqdm import tqdm
 
-from ..utils import torch_utils
+from ..utils import TensorBuffer, torch_utils
 from .base_model import BaseModel
+from .fantasy_posterior import FantasyPosterior
 from .kernels import BaseKernel
 
 
@@ -18,7 +24,16 @@ class GPRModel(BaseModel, nn.Module):
                  kernel: BaseKernel,
                  noise: float,
                  lr_hyper: float = 0.01,
-                 jitter: float = 1e-6) -> None:
+                 jitter: Optional[float] = None,
+                 incremental: bool = False,
+                 max_num_train: Optional[int] = None,
+                 solver: str = "cholesky",
+                 cg_tol: float = 1e-6,
+                 max_cg_iter: int = 1000,
+                 num_probes: int = 10,
+                 tile_size: int = 1024,
+                 precision: Optional[str] = None,
+                 optimizer: str = "adam") -> None:
         r"""Gaussian Process Regression.
 
         Args:
@@ -26,8 +41,41 @@ class GPRModel(BaseModel, nn.Module):
             kernel (BaseKernel): The kernel function.
             noise (float): The noise variance of the Gaussian likelihood.
             lr_hyper (float, optional): Learning rate of hyper-parameters.
-            jitter (float, optional): The jitter to add to the diagonal of the
-                covariance matrix. Defaults to 1e-6.
+                Only used by the Adam optimizer.
+            jitter (Optional[float], optional): The jitter to add to the
+                diagonal of the covariance matrix. Defaults to None, i.e.,
+                `torch_utils.default_jitter` of the factorization precision.
+            incremental (bool, optional): If True, new data extends the cached
+                Cholesky factor instead of refactorizing the covariance matrix.
+                Only used by the "cholesky" solver. Defaults to False.
+            max_num_train (Optional[int], optional): If given, only the most
+                recent `max_num_train` samples are kept. Defaults to None,
+                i.e., the training set grows without bound.
+            solver (str, optional): Inference engine, one of "cholesky" for
+                dense Cholesky factorization, "cg" for conjugate gradients,
+                and "sparse" for conjugate gradients on the sparse covariance
+                matrix of a compactly supported kernel. Defaults to
+                "cholesky".
+            cg_tol (float, optional): Relative residual tolerance of conjugate
+                gradients. Defaults to 1e-6.
+            max_cg_iter (int, optional): Maximum number of conjugate gradient
+                iterations. Defaults to 1000.
+            num_probes (int, optional): Number of random probe vectors of the
+                stochastic log-determinant estimator. Defaults to 10.
+            tile_size (int, optional): Number of training inputs per tile of
+                the kernel matrix-vector products. Defaults to 1024.
+            precision (Optional[str], optional): Precision policy, one of
+                "float32", "float64", and "mixed". Must match the precision
+                of `kernel`. Defaults to None, i.e., float64 on CPU and
+                float32 on CUDA.
+            optimizer (str, optional): Hyper-parameter optimizer, either
+                "adam" or "lbfgs". Defaults to "adam".
+
+        Raises:
+            ValueError: If `optimizer` or `solver` is unknown, if the
+                "sparse" solver gets a kernel without sparse entries, if
+                `max_num_train` is not positive, or if the kernel has another
+                dtype than the model.
 
         ??? note "What is jitter and why is it necessary?"
 
@@ -36,8 +84,83 @@ class GPRModel(BaseModel, nn.Module):
             This is necessary because the covariance matrix is not always
             positive definite due to numerical errors.
 
+        ??? note "Mixed precision"
+
+            With `precision="mixed"`, data, hyper-parameters, and kernel
+            matrices are float64, but the Cholesky factorization and the
+            triangular solves run in float32, which halves their memory
+            traffic. Solutions with the float32 factor are corrected by
+            iterative refinement against the float64 kernel matrix, so the
+            predictive mean and variance stay close to float64 accuracy on
+            reasonably conditioned matrices. On badly conditioned ones, tiny
+            negative variances left by the float32 factor are clamped like
+            those of the iterative solvers.
+
+        ??? note "L-BFGS"
+
+            Every iteration of the "lbfgs" optimizer is one quasi-Newton step
+            with a strong-Wolfe line search, which typically needs far fewer
+            Cholesky factorizations than Adam to converge. Its initial step
+            size is one, so `lr_hyper` does not apply.
+
+        ??? note "Multiple outputs"
+
+            Training outputs may have several columns, e.g., the channels of
+            a multi-channel sensor. The channels share the inputs, kernel,
+            and noise, so a single factorization solves all columns at once.
+            Use `MultiOutputGPRModel` for per-channel hyper-parameters.
+
+        ??? note "Incremental conditioning"
+
+            Appending $k$ samples to $n$ existing ones extends the cached
+            factor by a block Cholesky update in $O(n^2k)$ rather than
+            refactorizing in $O((n+k)^3)$. The factor is recomputed from
+            scratch once `learn` changes the hyper-parameters.
+
+        ??? note "Streaming with a bounded budget"
+
+            With `max_num_train`, the oldest samples are forgotten once the
+            budget is exceeded. The cached factor is extended with the new
+            samples and the forgotten ones are removed by a rank-$r$ update
+            of the trailing block of the factor in $O(rn^2)$, so every step
+            costs a bounded time and memory.
+
+        ??? note "Iterative solver"
+
+            The "cg" solver never forms the $n\times{n}$ covariance matrix.
+            It computes $\boldsymbol{K}_{y}^{-1}\mathbf{y}$ with
+            preconditioned conjugate gradients on kernel matrix-vector products
+            evaluated in tiles of `tile_size` rows, and estimates
+            $\log|\boldsymbol{K}_{y}|$ in `_compute_loss` by stochastic
+            Lanczos quadrature, costing $O(n^2)$ per iteration and $O(n)$
+            memory per tile row.
+
+        ??? note "Sparse solver"
+
+            With a compactly supported kernel such as `WendlandKernel`, the
+            "sparse" solver builds only the nonzero entries of
+            $\boldsymbol{K}_{y}$ by a neighbor search, once per solve, and
+            runs the same iterative solver on them. Training and the
+            predictive mean then cost time and memory proportional to the
+            number of nonzero entries, which grows linearly with $n$ when the
+            support radius is small compared to the workspace. The predictive
+            variance still forms (num_inputs, num_train) matrices, which
+            `chunk_size` bounds.
+
         """
-        BaseModel.__init__(self, device_name)
+        if optimizer not in ("adam", "lbfgs"):
+            raise ValueError("optimizer must be either 'adam' or 'lbfgs'.")
+        if solver not in ("cholesky", "cg", "sparse"):
+            raise ValueError(
+                "solver must be one of 'cholesky', 'cg', and 'sparse'.")
+        if solver == "sparse" and not hasattr(kernel, "sparse_entries"):
+            raise ValueError("The 'sparse' solver requires a compactly " +
+                             "supported kernel, e.g., WendlandKernel.")
+        if max_num_train is not None and max_num_train <= 0:
+            raise ValueError("max_num_train must be positive.")
+        BaseModel.__init__(self, device_name, precision)
+        if kernel.dtype != self.dtype:
+            raise ValueError("kernel and model must have the same dtype.")
         nn.Module.__init__(self)
         self.kernel = kernel
         self._free_noise = Parameter(
@@ -47,14 +170,38 @@ class GPRModel(BaseModel, nn.Module):
                     dtype=self.dtype,
                     device=self.device,
                 )))
-        self._init_optimizers(lr_hyper)
+        self._init_optimizers(lr_hyper, optimizer)
+        self._factor_dtype = torch_utils.factor_dtype(self.dtype, precision)
+        if jitter is None:
+            jitter = torch_utils.default_jitter(self._factor_dtype)
         self.jitter = jitter
+        self.incremental = incremental
+        self.max_num_train = max_num_train
+        self.solver = solver
+        self.cg_tol = cg_tol
+        self.max_cg_iter = max_cg_iter
+        self.num_probes = num_probes
+        self.tile_size = tile_size
+        # Number of updates to the training data and hyper-parameters, and the
+        # posterior terms (L, iK_y) cached for that number.
+        self._num_updates = 0
+        self._cache = None
+        self._cache_key = None
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        self.eval()
 
     def learn(self,
               x_new: np.ndarray,
               y_new: np.ndarray,
               num_iter: int,
-              verbose: bool = True) -> None:
+              verbose: bool = True,
+              tol: Optional[float] = None,
+              num_restarts: int = 1,
+              num_workers: Optional[int] = None,
+              restart_scale: float = 1.0,
+              subset_size: Optional[int] = None,
+              subset: str = "random") -> int:
         r"""Optimizes the model parameters.
 
         Args:
@@ -62,45 +209,429 @@ class GPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             y_new (np.ndarray): New training outputs of shape
                 (num_outputs, dim_outputs).
-            num_iter (int): Number of optimization/training iterations.
+            num_iter (int): Maximum number of optimization/training
+                iterations.
             verbose (bool): Print the optimization information or not?
-            writer (Union[SummaryWriter, None]): Tensorboard writer.
+            tol (Optional[float], optional): Stop early once the relative
+                change of the loss between two iterations is at most `tol`.
+                Defaults to None, i.e., always run `num_iter` iterations.
+            num_restarts (int, optional): Number of initializations of the
+                hyper-parameters to optimize. Defaults to 1.
+            num_workers (Optional[int], optional): Number of processes that
+                optimize the restarts concurrently. Defaults to None, i.e.,
+                one per CPU core up to `num_restarts`.
+            restart_scale (float, optional): Standard deviation of the
+                Gaussian perturbation added to the unconstrained
+                hyper-parameters of every restart but the first.
+                Defaults to 1.0.
+            subset_size (Optional[int], optional): If given, every iteration
+                optimizes the exact marginal likelihood of a subset of this
+                many training samples. Defaults to None, i.e., the full
+                training set.
+            subset (str, optional): How subsets are drawn, either "random"
+                for uniformly sampled training samples or "spatial" for the
+                nearest neighbors of a random training sample. Defaults to
+                "random".
+
+        Returns:
+            int: Number of optimization iterations actually run, summed over
+                the restarts.
+
+        Raises:
+            ValueError: If `num_restarts`, `num_workers`, or `subset_size` is
+                not positive, if `subset` is unknown, or if subsets are
+                combined with multiple restarts, `tol`, or L-BFGS.
+
+        ??? note "Multiple restarts"
+
+            The negative log marginal likelihood is multimodal in the
+            lengthscale, so a single run can get stuck in a poor local
+            optimum. With `num_restarts > 1`, the first restart starts from
+            the current hyper-parameters and the others from random
+            perturbations of them. Each restart is optimized in its own
+            process with one thread, and the hyper-parameters with the lowest
+            final loss are loaded back into the model. If every restart
+            fails, e.g., because its Cholesky factorization diverged, the
+            current hyper-parameters are kept.
+
+        ??? warning "Worker processes"
+
+            Unless `num_workers=1`, `num_restarts > 1` starts a pool of
+            processes with the "spawn" method, which re-imports the calling
+            script in every worker. Scripts that call `learn` with restarts
+            must therefore guard their entry point with
+            `if __name__ == "__main__":`.
+
+        ??? note "Mini-batch learning"
+
+            With `subset_size` $m$, every iteration factorizes only the
+            $m\times{m}$ covariance matrix of a fresh subset, so an
+            iteration costs $O(m^3)$ regardless of the number of training
+            samples. The subset loss is scaled by $n/m$ to match the
+            magnitude of the full loss. Random subsets capture the noise and
+            amplitude of the whole dataset, while spatial subsets keep
+            nearby samples together, which is informative about short
+            lengthscales. The exact posterior on all samples is rebuilt once
+            by the next prediction after learning. Since the objective
+            changes with every subset, it only suits stochastic optimizers:
+            the loss changes between iterations are dominated by the subset
+            rather than by convergence, so `tol` cannot detect convergence,
+            and the curvature estimates and line search of L-BFGS assume a
+            fixed objective.
 
         """
-        self._add_data(x_new, y_new)
+        if num_restarts <= 0:
+            raise ValueError("num_restarts must be positive.")
+        if num_workers is not None and num_workers <= 0:
+            raise ValueError("num_workers must be positive.")
+        if subset_size is not None and subset_size <= 0:
+            raise ValueError("subset_size must be positive.")
+        if subset not in ("random", "spatial"):
+            raise ValueError("subset must be either 'random' or 'spatial'.")
+        if subset_size is not None and num_restarts > 1:
+            raise ValueError("subset_size does not support num_restarts > 1.")
+        if subset_size is not None and tol is not None:
+            raise ValueError("subset_size does not support tol.")
+        if subset_size is not None and self.optimizer == "lbfgs":
+            raise ValueError("subset_size requires the 'adam' optimizer.")
+        self._add_data(x_new, y_new, extend=num_iter == 0)
+        if num_restarts == 1:
+            return self._optimize(num_iter, verbose, tol, subset_size, subset)
+        return self._optimize_restarts(num_iter, tol, num_restarts,
+                                       num_workers, restart_scale, verbose)
+
+    def _optimize(self,
+                  num_iter: int,
+                  verbose: bool = True,
+                  tol: Optional[float] = None,
+                  subset_size: Optional[int] = None,
+                  subset: str = "random") -> int:
+        r"""Optimizes the hyper-parameters on the current training data.
+
+        Args:
+            num_iter (int): Maximum number of optimization iterations.
+            verbose (bool): Print the optimization information or not?
+            tol (Optional[float], optional): Relative loss change for early
+                stopping. Defaults to None.
+            subset_size (Optional[int], optional): Number of training samples
+                per iteration. Defaults to None, i.e., all of them.
+            subset (str, optional): Either "random" or "spatial".
+                Defaults to "random".
+
+        Returns:
+            int: Number of iterations actually run.
+
+        """
+        indices = None
+
+        def closure():
+            self.opt_hyper.zero_grad()
+            if indices is None:
+                loss = self._compute_loss()
+            else:
+                loss = self._compute_subset_loss(indices)
+            loss.backward()
+            return loss
+
         self.train()
+        num_run, previous_loss = 0, None
         progress_bar = tqdm(range(num_iter), disable=not verbose)
         for i in progress_bar:
-            self.opt_hyper.zero_grad()
-            loss = self._compute_loss()
-            loss.backward()
-            self.opt_hyper.step()
-            progress_bar.set_description(
-                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+            if subset_size is not None and subset_size < len(self._x_buffer):
+                indices = self._sample_subset(subset_size, subset)
+            loss = self.opt_hyper.step(closure).item()
+            num_run += 1
+            progress_bar.set_description(f"Iter: {i:02d} loss: {loss: .2f}")
+            if tol is not None and previous_loss is not None:
+                change = abs(previous_loss - loss)
+                if change <= tol * max(1.0, abs(loss)):
+                    break
+            previous_loss = loss
+        if num_run > 0:
+            self._num_updates += 1
         self.eval()
+        self.kernel.clear_cache()
+        return num_run
+
+    def _optimize_restarts(self,
+                           num_iter: int,
+                           tol: Optional[float],
+                           num_restarts: int,
+                           num_workers: Optional[int],
+                           restart_scale: float,
+                           verbose: bool = True) -> int:
+        r"""Optimizes several initializations and keeps the best one.
+
+        Args:
+            num_iter (int): Maximum number of optimization iterations.
+            tol (Optional[float]): Relative loss change for early stopping.
+            num_restarts (int): Number of initializations to optimize.
+            num_workers (Optional[int]): Number of worker processes.
+            restart_scale (float): Standard deviation of the perturbation of
+                the unconstrained hyper-parameters.
+            verbose (bool): Print the optimization information or not?
+
+        Returns:
+            int: Number of iterations run by all restarts.
+
+        """
+        restarts = [self._perturbed_copy(0.0)]
+        for _ in range(num_restarts - 1):
+            restarts.append(self._perturbed_copy(restart_scale))
+        if num_workers is None:
+            num_workers = min(num_restarts, os.cpu_count() or 1)
+        if num_workers == 1:
+            results = [
+                _optimize_restart(model, num_iter, tol, verbose)
+                for model in restarts
+            ]
+        else:
+            # Forked workers can deadlock in the thread pool of the parent.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=num_workers,
+                                     mp_context=context,
+                                     initializer=torch.set_num_threads,
+                                     initargs=(1, )) as executor:
+                results = list(
+                    executor.map(_optimize_restart, restarts,
+                                 [num_iter] * num_restarts,
+                                 [tol] * num_restarts,
+                                 [verbose] * num_restarts))
+        num_run = sum(result[2] for result in results)
+        best_loss, best_state, _ = min(results, key=lambda result: result[0])
+        if not np.isfinite(best_loss):
+            # Every restart failed, so none of their states is trustworthy.
+            return num_run
+        self.load_state_dict(best_state)
+        self._init_optimizers(self.lr_hyper, self.optimizer)
+        self._num_updates += 1
+        return num_run
+
+    def _perturbed_copy(self, scale: float) -> "GPRModel":
+        r"""Copies the model and perturbs its unconstrained hyper-parameters.
+
+        Args:
+            scale (float): Standard deviation of the Gaussian perturbation.
+
+        Returns:
+            GPRModel: An independent copy with fresh optimizer states.
+
+        """
+        self.kernel.clear_cache()
+        model = copy.deepcopy(self)
+        model._cache, model._cache_key = None, None
+        with torch.no_grad():
+            for param in model.parameters():
+                param.add_(scale * torch.randn_like(param))
+        model._init_optimizers(model.lr_hyper, model.optimizer)
+        return model
 
-    def predict(self, x_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """Makes predictions.
 
         Args:
             x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            chunk_size (Optional[int], optional): Maximum number of test inputs
+                predicted at once. Defaults to None, i.e., all inputs at once
+                unless `memory_budget` is given.
+            memory_budget (Optional[int], optional): Approximate number of
+                bytes the intermediate matrices of one chunk may occupy. Only
+                used when `chunk_size` is None. Defaults to None.
 
         Returns:
-            Tuple[np.ndarray, np.ndarray]: A tuple containing predictive mean
-                and predictive standard deviation of shape (num_inputs, 1).
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean of shape (num_inputs, dim_outputs)
+                and predictive standard deviation of shape (num_inputs, 1),
+                which is shared by all output channels. The entry not
+                requested by `mode` is None.
+
+        ??? note "Chunked prediction"
+
+            `forward` materializes two (num_inputs, num_train) matrices.
+            Streaming the test inputs in chunks bounds this memory, and the
+            results are written into pre-allocated output arrays.
 
         """
-        x_test_tensor = torch.as_tensor(x_test,
-                                        dtype=self.dtype,
-                                        device=self.device)
-        mean_tensor, std_tensor = self.forward(x_test_tensor)
-        return mean_tensor.cpu().numpy(), std_tensor.cpu().numpy()
+        self._validate_mode(mode)
+        num_inputs = x_test.shape[0]
+        if chunk_size is None and memory_budget is not None:
+            chunk_size = self._budget_to_chunk_size(memory_budget)
+        if chunk_size is None or chunk_size >= num_inputs:
+            x_test_tensor = torch.as_tensor(x_test,
+                                            dtype=self.dtype,
+                                            device=self.device)
+            mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                                   noise_free=noise_free,
+                                                   mode=mode)
+            mean = None if mean_tensor is None else mean_tensor.cpu().numpy()
+            std = None if std_tensor is None else std_tensor.cpu().numpy()
+            return mean, std
+        mean, std = None, None
+        for index, mean_chunk, std_chunk in self.predict_chunks(
+                x_test, chunk_size, mode=mode, noise_free=noise_free):
+            if index.start == 0:
+                mean = self._allocate_output(mean_chunk, num_inputs)
+                std = self._allocate_output(std_chunk, num_inputs)
+            if mean is not None:
+                mean[index] = mean_chunk
+            if std is not None:
+                std[index] = std_chunk
+        return mean, std
+
+    def condition_on(
+        self,
+        x_fantasy: np.ndarray,
+        y_fantasy: Optional[np.ndarray] = None,
+    ) -> FantasyPosterior:
+        r"""Conditions the posterior on fantasy data without modifying it.
+
+        Args:
+            x_fantasy (np.ndarray): Fantasy inputs of shape
+                (num_fantasy, dim_inputs), or a batch of fantasy sets of shape
+                (batch_size, num_fantasy, dim_inputs).
+            y_fantasy (Optional[np.ndarray], optional): Fantasy outputs.
+                Defaults to None, i.e., the predictive mean of this model.
+
+        Returns:
+            FantasyPosterior: A posterior view that reuses the cached
+                Cholesky factor of this model.
+
+        Raises:
+            ValueError: If the model does not use the "cholesky" solver.
+
+        ??? tip "Look-ahead planning"
+
+            The variance of a GP does not depend on the outputs, so the
+            information gain of a candidate path can be evaluated by
+            conditioning on its inputs alone, e.g.,
+            `model.condition_on(paths).predict(x_test, mode="var")` for a
+            batch of candidate paths.
+
+        """
+        if self.solver != "cholesky":
+            raise ValueError("condition_on requires the 'cholesky' solver.")
+        return FantasyPosterior(self, x_fantasy, y_fantasy)
+
+    def sample_posterior(self,
+                         x_test: np.ndarray,
+                         num_samples: int,
+                         num_features: int = 1024,
+                         seed: Optional[int] = None) -> np.ndarray:
+        r"""Draws posterior function samples by pathwise conditioning.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            num_samples (int): Number of function samples.
+            num_features (int, optional): Number of random Fourier features
+                of the prior samples. Defaults to 1024.
+            seed (Optional[int], optional): Seed of the sampled functions.
+                Calls with the same seed and unchanged model evaluate the same
+                functions, e.g., at different test inputs. Defaults to None,
+                i.e., a random seed.
+
+        Returns:
+            np.ndarray: Samples of the latent function values of shape
+                (num_samples, num_inputs, dim_outputs).
+
+        Raises:
+            ValueError: If `num_samples` is not positive or the kernel does
+                not provide random features.
+
+        ??? note "Matheron's rule"
+
+            A posterior sample is a prior sample plus a data correction,
+            $f_{*}(\cdot)=f(\cdot)+\boldsymbol{k}(\cdot, X)
+            \boldsymbol{K}_{y}^{-1}(\mathbf{y}-f(X)-\boldsymbol{\epsilon})$
+            with $\boldsymbol{\epsilon}\sim\mathcal{N}(\mathbf{0},
+            \sigma^2\mathbf{I})$. The prior sample
+            $f(\cdot)=\boldsymbol{\phi}(\cdot)^{\intercal}\mathbf{w}$ uses
+            random features of the kernel, and the solve reuses the cached
+            factorization, so a sample costs $O(n+D)$ per test input instead
+            of factorizing the joint covariance of all test inputs.
+
+        """
+        if num_samples <= 0:
+            raise ValueError("num_samples must be positive.")
+        if not hasattr(self.kernel, "random_features"):
+            raise ValueError("sample_posterior requires a kernel with " +
+                             "random features, e.g., GaussianKernel.")
+        generator = torch.Generator(device=self.device)
+        if seed is None:
+            generator.seed()
+        else:
+            generator.manual_seed(seed)
+        options = dict(generator=generator,
+                       dtype=self.dtype,
+                       device=self.device)
+        x_test = torch.as_tensor(x_test, dtype=self.dtype, device=self.device)
+        num_train, num_outputs = self.y_train.shape
+        num_columns = num_samples * num_outputs
+        with torch.no_grad():
+            frequencies = self.kernel.sample_frequencies(
+                num_features, self.x_train.shape[1], generator)
+            phases = 2 * np.pi * torch.rand(num_features, **options)
+            weights = torch.randn(num_features, num_columns, **options)
+            noise = self.noise.sqrt() * torch.randn(num_train, num_columns,
+                                                    **options)
+            prior_train = self.kernel.random_features(
+                self.x_train, frequencies, phases) @ weights
+            targets = self.y_train.repeat(1, num_samples)
+            residual = targets - prior_train - noise
+            if self.solver != "cholesky":
+                correction = self._cg_solve(residual)
+            else:
+                L, _ = self._cached_common()
+                correction = self._cholesky_solve(L, residual)
+            samples = []
+            for start in range(0, len(x_test), self.tile_size):
+                x_tile = x_test[start:start + self.tile_size]
+                features = self.kernel.random_features(x_tile, frequencies,
+                                                       phases)
+                samples.append(features @ weights +
+                               self.kernel(x_tile, self.x_train) @ correction)
+            samples = torch.cat(samples).view(-1, num_samples, num_outputs)
+        return samples.transpose(0, 1).cpu().numpy()
+
+    @staticmethod
+    def _allocate_output(chunk: Optional[np.ndarray],
+                         num_inputs: int) -> Optional[np.ndarray]:
+        r"""Allocates an output array for `num_inputs` rows like `chunk`."""
+        if chunk is None:
+            return None
+        return np.empty((num_inputs, *chunk.shape[1:]), dtype=chunk.dtype)
+
+    def _budget_to_chunk_size(self, memory_budget: int) -> int:
+        r"""Converts a memory budget in bytes to a number of test inputs.
+
+        Args:
+            memory_budget (int): Number of bytes available for a chunk.
+
+        Returns:
+            int: The largest chunk size, at least one, whose cross-covariance
+                and triangular solve fit in the budget.
+
+        """
+        num_train = self.x_train.shape[0]
+        bytes_per_input = 2 * num_train * self.x_train.element_size()
+        return max(1, memory_budget // bytes_per_input)
 
     def forward(
         self,
         x_test: torch.Tensor,
         noise_free: bool = False,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
         r"""Make prediction.
 
         Args:
@@ -108,11 +639,14 @@ class GPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             noise_free (bool, optional): If True, predict the latent function
                 values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
 
         Returns:
-            mean (torch.Tensor): Predictive mean of shape (num_inputs, 1)
-            std (torch.Tensor): Predictive standard deviation of shape
-                (num_inputs, 1).
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, dim_outputs), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
 
         ??? note "Difference between `forward` and `predict`"
 
@@ -122,22 +656,67 @@ class GPRModel(BaseModel, nn.Module):
 
         """
         with torch.no_grad():
-            L, iK_y = self._compute_common()
-            Ksn = self.kernel(x_test, self.x_train)
-            Kss_diag = self.kernel.diag(x_test)
-            iL_Kns = torch.linalg.solve_triangular(L, Ksn.t(), upper=False)
-            mean = Ksn @ iK_y
-            var = Kss_diag - iL_Kns.square().sum(0).view(-1, 1)
-            # Variance might be zero when lengthscale is too large.
-            if torch.any(var <= 0.0):
-                print(var.ravel().numpy())
-                raise ValueError("Predictive variance <= 0.0!")
-            var.clamp_(min=self.jitter)
-            if not noise_free:
-                var += self.noise
-            std = var.sqrt()
+            mean, std = None, None
+            L, iK_y = self._cached_common()
+            Ksn = None
+            if self.solver != "sparse":
+                Ksn = self.kernel(x_test, self.x_train)
+            if mode in ("mean", "both"):
+                if Ksn is None:
+                    mean = self._sparse_matmul(x_test, iK_y)
+                else:
+                    mean = Ksn @ iK_y
+            if mode in ("var", "both"):
+                if Ksn is None:
+                    Ksn = self.kernel(x_test, self.x_train)
+                Kss_diag = self.kernel.diag(x_test)
+                exact = self.solver == "cholesky" and L.dtype == self.dtype
+                if self.solver != "cholesky":
+                    iK_Kns = self._cg_solve(Ksn.t())
+                    explained = (Ksn.t() * iK_Kns).sum(0).view(-1, 1)
+                elif not exact:
+                    # The float32 error of a triangular solve grows with the
+                    # condition number, so the solve is refined in float64.
+                    iK_Kns = self._cholesky_solve(L, Ksn.t())
+                    explained = (Ksn.t() * iK_Kns).sum(0).view(-1, 1)
+                else:
+                    iL_Kns = torch.linalg.solve_triangular(L,
+                                                           Ksn.t(),
+                                                           upper=False)
+                    explained = iL_Kns.square().sum(0).view(-1, 1)
+                var = Kss_diag - explained
+                # Variance might be zero when lengthscale is too large.
+                # Conjugate gradients and reduced-precision factors are
+                # approximate, so their tiny negative variances are clamped
+                # below instead.
+                if exact and torch.any(var <= 0.0):
+                    print(var.ravel().numpy())
+                    raise ValueError("Predictive variance <= 0.0!")
+                var.clamp_(min=self.jitter)
+                if not noise_free:
+                    var += self.noise
+                std = var.sqrt()
         return mean, std
 
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Training inputs of shape (num_train, dim_inputs).
+
+        ??? note "Storage"
+
+            Training data live in pre-allocated `TensorBuffer`s, so this is a
+            view of the filled rows rather than a standalone tensor. Later
+            appends and forgetting do not modify the rows of a view
+            returned earlier.
+
+        """
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Training outputs of shape (num_train, dim_outputs)."""
+        return self._y_buffer.data
+
     @property
     def noise(self) -> torch.Tensor:
         r"""The noise variance hyper-parameter.
@@ -162,8 +741,12 @@ class GPRModel(BaseModel, nn.Module):
         """
         with torch.inference_mode():
             self._free_noise.copy_(torch_utils.inv_softplus(noise))
+        self._num_updates += 1
 
-    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+    def _add_data(self,
+                  x_new: np.ndarray,
+                  y_new: np.ndarray,
+                  extend: bool = True) -> None:
         r"""Add new data to the training set.
 
         Args:
@@ -171,29 +754,64 @@ class GPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             y_new (np.ndarray): New training outputs of shape
                 (num_outputs, dim_outputs).
+            extend (bool, optional): Whether to extend the cached factor to
+                the new data. `learn` skips the extension when it optimizes
+                the hyper-parameters afterwards, which discards the factor.
+                Defaults to True.
 
         """
         self._validate_data(x_new, y_new)
-        if not (hasattr(self, 'x_train') and hasattr(self, 'y_train')):
-            self.x_train = torch.as_tensor(x_new,
-                                           dtype=self.dtype,
-                                           device=self.device)
-            self.y_train = torch.as_tensor(y_new,
-                                           dtype=self.dtype,
-                                           device=self.device)
-        else:
-            self.x_train = torch.cat((self.x_train,
-                                      torch.as_tensor(
-                                          x_new,
-                                          dtype=self.dtype,
-                                          device=self.device,
-                                      )))
-            self.y_train = torch.cat((self.y_train,
-                                      torch.as_tensor(
-                                          y_new,
-                                          dtype=self.dtype,
-                                          device=self.device,
-                                      )))
+        streaming = self.max_num_train is not None
+        can_extend = ((self.incremental or streaming) and extend
+                      and self.solver == "cholesky" and self._cache is not None
+                      and self._cache_key == self._cache_version())
+        self._num_updates += 1
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+        if can_extend:
+            with torch.no_grad():
+                self._cache = self._extend_common()
+            self._cache_key = self._cache_version()
+        if streaming and len(self._x_buffer) > self.max_num_train:
+            self._forget_oldest(len(self._x_buffer) - self.max_num_train)
+
+    def _forget_oldest(self, num_forget: int) -> None:
+        r"""Removes the oldest training samples.
+
+        Args:
+            num_forget (int): Number of samples to remove.
+
+        ??? note "Removing rows from the Cholesky factor"
+
+            $$
+            \boldsymbol{L}=
+            \begin{bmatrix}
+            \boldsymbol{L}_{11} & \mathbf{0} \\
+            \boldsymbol{L}_{21} & \boldsymbol{L}_{22}
+            \end{bmatrix}
+            \Rightarrow
+            \boldsymbol{K}_{22}=
+            \boldsymbol{L}_{22}\boldsymbol{L}_{22}^{\intercal}
+            +\boldsymbol{L}_{21}\boldsymbol{L}_{21}^{\intercal},
+            $$
+
+            so the factor of the remaining samples is a rank-`num_forget`
+            update of $\boldsymbol{L}_{22}$.
+
+        """
+        is_cached = (self.solver == "cholesky" and self._cache is not None
+                     and self._cache_key == self._cache_version())
+        self._num_updates += 1
+        self._x_buffer.remove_first(num_forget)
+        self._y_buffer.remove_first(num_forget)
+        if is_cached:
+            with torch.no_grad():
+                L, _ = self._cache
+                L = torch_utils.cholesky_update(L[num_forget:, num_forget:],
+                                                L[num_forget:, :num_forget])
+                iK_y = self._cholesky_solve(L, self.y_train)
+            self._cache = (L, iK_y)
+            self._cache_key = self._cache_version()
 
     def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
         r"""Check if the inputs `x_new` and `y_new` are valid.
@@ -201,31 +819,28 @@ class GPRModel(BaseModel, nn.Module):
         Args:
             x_new (np.ndarray): An array of shape (num_inputs, dim_inputs)
                 containing the input features of the new data.
-            y_new (np.ndarray): An array of shape (num_outputs, 1)
+            y_new (np.ndarray): An array of shape (num_outputs, dim_outputs)
                 containing the output targets of the new data.
 
         Raises:
             ValueError: If any of the following conditions are met:
                 1. `x_new` is not 2D.
                 2. `y_new` is not 2D.
-                3. `y_new` has more than 1 column.
-                4. `x_new` and `y_new` have different number of samples.
-                5. `x_new` and `self.x_train` have different number of features.
-                6. `y_new` and `self.y_train` have different number of columns.
+                3. `x_new` and `y_new` have different number of samples.
+                4. `x_new` and `self.x_train` have different number of features.
+                5. `y_new` and `self.y_train` have different number of columns.
 
         """
         if x_new.ndim != 2:
             raise ValueError("x_train must be 2D.")
         if y_new.ndim != 2:
             raise ValueError("y_train must be 2D.")
-        if y_new.shape[1] != 1:
-            raise ValueError("Only support univariate output for now.")
         if x_new.shape[0] != y_new.shape[0]:
             raise ValueError("x_train and y_train should have same length.")
-        if (hasattr(self, 'x_train')
+        if (len(self._x_buffer) > 0
                 and x_new.shape[1] != self.x_train.shape[1]):
             raise ValueError("x_train and x_new should have same shape.")
-        if (hasattr(self, 'y_train')
+        if (len(self._y_buffer) > 0
                 and y_new.shape[1] != self.y_train.shape[1]):
             raise ValueError("y_train and y_new should have same shape.")
 
@@ -244,13 +859,65 @@ class GPRModel(BaseModel, nn.Module):
             +\frac{n}{2}\log{2\pi}.
             $$
 
+            With $c$ output channels, the loss is the sum over the columns of
+            $\mathbf{Y}$, which share $\mathbf{K}_{y}$, so the
+            log-determinant is computed once and multiplied by $c$.
+
         """
+        if self.solver != "cholesky":
+            return self._compute_iterative_loss()
         L, iK_y = self._compute_common()
+        num_train, num_outputs = self.y_train.shape
         quadratic = torch.sum(self.y_train * iK_y)
-        logdet = L.diag().square().log().sum()
-        constant = len(self.y_train) * np.log(2 * np.pi)
+        logdet = num_outputs * L.diag().to(self.dtype).square().log().sum()
+        constant = num_train * num_outputs * np.log(2 * np.pi)
         return 0.5 * (quadratic + logdet + constant)
 
+    def _sample_subset(self, subset_size: int, subset: str) -> torch.Tensor:
+        r"""Draws the training samples of one mini-batch iteration.
+
+        Args:
+            subset_size (int): Number of training samples.
+            subset (str): Either "random" for uniformly sampled training
+                samples or "spatial" for the nearest neighbors of a random
+                training sample.
+
+        Returns:
+            torch.Tensor: Indices of the training samples of shape
+                (subset_size,).
+
+        """
+        num_train = len(self._x_buffer)
+        if subset == "random":
+            return torch.randperm(num_train, device=self.device)[:subset_size]
+        center = torch.randint(num_train, (1, ), device=self.device)
+        return torch_utils.nearest_neighbors(self.x_train[center],
+                                             self.x_train, subset_size)[0]
+
+    def _compute_subset_loss(self, indices: torch.Tensor) -> torch.Tensor:
+        r"""Compute training loss on a subset of the training data.
+
+        Args:
+            indices (torch.Tensor): Indices of the training samples.
+
+        Returns:
+            torch.Tensor: The negative log marginal likelihood of the subset,
+                scaled by `num_train / len(indices)`.
+
+        """
+        x, y = self.x_train[indices], self.y_train[indices]
+        K = self.kernel(x, x)
+        K.diagonal().add_(self.noise)
+        L = torch_utils.robust_cholesky(K.to(self._factor_dtype),
+                                        jitter=self.jitter)
+        iK_y = torch.cholesky_solve(y.to(L.dtype), L, upper=False)
+        num_subset, num_outputs = y.shape
+        quadratic = torch.sum(y * iK_y.to(self.dtype))
+        logdet = num_outputs * L.diag().to(self.dtype).square().log().sum()
+        constant = num_subset * num_outputs * np.log(2 * np.pi)
+        scale = len(self._x_buffer) / num_subset
+        return 0.5 * scale * (quadratic + logdet + constant)
+
     def _compute_common(self):
         r"""Compute common terms for `_compute_loss` and `predict`.
 
@@ -258,7 +925,7 @@ class GPRModel(BaseModel, nn.Module):
             L (torch.Tensor): Lower Cholesky factor of the training covariance
                 matrix. Shape: (num_train, num_train).
             iK_y (torch.Tensor): Inverse training covariance matrix multiplied
-                by training outputs. Shape: (num_train, 1).
+                by training outputs. Shape: (num_train, dim_outputs).
 
         ??? note "What are L and iK_y?"
 
@@ -271,23 +938,358 @@ class GPRModel(BaseModel, nn.Module):
             \boldsymbol{K}_{y}^{-1} \mathbf{y} =
             \mathtt{cholesky solve}(\boldsymbol{y}, \boldsymbol{L})
             $$
+
+            The iterative solvers do not compute `L` and return None instead.
         """
-        K = self.kernel(self.x_train, self.x_train)
+        if self.solver != "cholesky":
+            return None, self._cg_solve(self.y_train)
+        # Distances are only cached while `_optimize` runs in training mode.
+        key = (id(self), self._num_updates) if self.training else None
+        K = self.kernel.gram(self.x_train, key=key)
         K.diagonal().add_(self.noise)
-        L = torch_utils.robust_cholesky(K, jitter=self.jitter)
-        iK_y = torch.cholesky_solve(self.y_train, L, upper=False)
+        L = torch_utils.robust_cholesky(K.to(self._factor_dtype),
+                                        jitter=self.jitter)
+        iK_y = self._cholesky_solve(L, self.y_train, lambda v: K @ v)
         return L, iK_y
 
-    def _init_optimizers(self, lr_hyper: float) -> None:
+    def _cholesky_solve(
+        self,
+        L: torch.Tensor,
+        rhs: torch.Tensor,
+        matvec: Optional[Callable[[torch.Tensor], torch.Tensor]] = None,
+    ) -> torch.Tensor:
+        r"""Solves $\boldsymbol{K}_{y}^{-1}$ `rhs` with the factor `L`.
+
+        Args:
+            L (torch.Tensor): Lower Cholesky factor of the training covariance
+                matrix, possibly in the lower factorization precision.
+            rhs (torch.Tensor): Right-hand sides of shape
+                (num_train, num_columns).
+            matvec (Optional[Callable], optional): Multiplies the
+                full-precision training covariance matrix with a tensor,
+                e.g., a product with an already built matrix. Defaults to
+                None, i.e., the tiled `_matvec`, which rebuilds the matrix.
+
+        Returns:
+            torch.Tensor: The solution of shape (num_train, num_columns),
+                refined against the full-precision matrix if `L` has a
+                lower precision than `rhs`.
+
+        """
+        if L.dtype == rhs.dtype:
+            return torch.cholesky_solve(rhs, L, upper=False)
+        if matvec is None:
+            matvec = self._matvec
+        return torch_utils.refined_cholesky_solve(L, rhs, matvec)
+
+    def _compute_iterative_loss(self) -> torch.Tensor:
+        r"""Compute training loss with the iterative solver.
+
+        Returns:
+            torch.Tensor: A surrogate whose value approximates the negative
+                log marginal likelihood and whose gradient is the (stochastic)
+                gradient of the negative log marginal likelihood.
+
+        ??? note "Gradient surrogates"
+
+            With $\boldsymbol{\alpha}=\boldsymbol{K}_{y}^{-1}\mathbf{y}$
+            and probes $\mathbf{z}$ held constant,
+            $2\mathbf{y}^{\intercal}\boldsymbol{\alpha}-
+            \boldsymbol{\alpha}^{\intercal}\boldsymbol{K}_{y}
+            \boldsymbol{\alpha}$ has the value and gradient of the
+            quadratic term, and
+            $(\boldsymbol{K}_{y}^{-1}\mathbf{z})^{\intercal}
+            \boldsymbol{K}_{y}\mathbf{P}^{-1}\mathbf{z}$ has the gradient
+            $\mathrm{tr}(\boldsymbol{K}_{y}^{-1}\partial\boldsymbol{K}_{y})$
+            of the log-determinant in expectation, where $\mathbf{P}$ is
+            the Jacobi preconditioner and
+            $\mathbb{E}[\mathbf{z}\mathbf{z}^{\intercal}]=\mathbf{P}$.
+
+        """
+        num_train, num_outputs = self.y_train.shape
+        with torch.no_grad():
+            matvec = self._training_matvec()
+            precond_diag = self.kernel.diag(self.x_train) + self.noise
+            iK_y, *_ = torch_utils.conjugate_gradient(matvec,
+                                                      self.y_train,
+                                                      precond_diag,
+                                                      self.max_cg_iter,
+                                                      self.cg_tol)
+            signs = torch.randint(0,
+                                  2, (num_train, self.num_probes),
+                                  device=self.device).to(self.dtype)
+            whitened_probes = 2.0 * signs - 1.0
+            probes = precond_diag.sqrt() * whitened_probes
+            iK_z, alphas, betas, num_iters = torch_utils.conjugate_gradient(
+                matvec, probes, precond_diag, self.max_cg_iter, self.cg_tol)
+            quadratures = torch_utils.lanczos_logdet_quadrature(
+                alphas, betas, num_iters)
+            logdet_value = (precond_diag.log().sum() +
+                            num_train * quadratures.mean())
+        quadratic = 2.0 * torch.sum(self.y_train * iK_y) - self._bilinear(
+            iK_y, iK_y)
+        trace = self._bilinear(iK_z, probes / precond_diag) / self.num_probes
+        logdet = num_outputs * (logdet_value + trace - trace.detach())
+        constant = num_train * num_outputs * np.log(2 * np.pi)
+        return 0.5 * (quadratic + logdet + constant)
+
+    def _matvec(self, vectors: torch.Tensor) -> torch.Tensor:
+        r"""Multiplies the training covariance matrix with `vectors` in tiles.
+
+        Args:
+            vectors (torch.Tensor): Tensor of shape (num_train, num_vectors).
+
+        Returns:
+            torch.Tensor: $\boldsymbol{K}_{y}$ `@ vectors` of shape
+                (num_train, num_vectors).
+
+        """
+        products = []
+        for start in range(0, len(self.x_train), self.tile_size):
+            x_tile = self.x_train[start:start + self.tile_size]
+            products.append(self.kernel(x_tile, self.x_train) @ vectors)
+        return torch.cat(products) + self.noise * vectors
+
+    def _training_matvec(self) -> Callable[[torch.Tensor], torch.Tensor]:
+        r"""Returns the matrix-vector product of the training covariance.
+
+        Returns:
+            Callable[[torch.Tensor], torch.Tensor]: `_matvec`, or for the
+                "sparse" solver a product with the nonzero entries of
+                $\boldsymbol{K}_{y}$, which are computed once here.
+
+        """
+        if self.solver != "sparse":
+            return self._matvec
+        rows, cols, values = self.kernel.sparse_entries(
+            self.x_train, self.x_train)
+        noise = self.noise
+
+        def matvec(vectors: torch.Tensor) -> torch.Tensor:
+            products = vectors.new_zeros(vectors.shape).index_add(
+                0, rows,
+                values.unsqueeze(1) * vectors[cols])
+            return products + noise * vectors
+
+        return matvec
+
+    def _sparse_matmul(self, x_test: torch.Tensor,
+                       vectors: torch.Tensor) -> torch.Tensor:
+        r"""Multiplies the sparse test-training covariance with `vectors`.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_inputs, dim_inputs).
+            vectors (torch.Tensor): Tensor of shape (num_train, num_vectors).
+
+        Returns:
+            torch.Tensor: Product of shape (num_inputs, num_vectors).
+
+        """
+        rows, cols, values = self.kernel.sparse_entries(x_test, self.x_train)
+        products = vectors.new_zeros(len(x_test), vectors.shape[1])
+        return products.index_add(0, rows, values.unsqueeze(1) * vectors[cols])
+
+    def _bilinear(self, left: torch.Tensor,
+                  right: torch.Tensor) -> torch.Tensor:
+        r"""Differentiable `sum(left * (K_y @ right))` computed in tiles.
+
+        Args:
+            left (torch.Tensor): Tensor of shape (num_train, num_vectors).
+            right (torch.Tensor): Tensor of shape (num_train, num_vectors).
+
+        Returns:
+            torch.Tensor: The scalar bilinear form.
+
+        ??? note "Memory"
+
+            Each tile is checkpointed, so the backward pass recomputes the
+            kernel tile instead of storing all of them. The "sparse" solver
+            uses its nonzero entries instead.
+
+        """
+        if self.solver == "sparse":
+            return torch.sum(left * self._training_matvec()(right))
+
+        def tile_form(x_tile, left_tile):
+            return torch.sum(left_tile *
+                             (self.kernel(x_tile, self.x_train) @ right))
+
+        total = self.noise * torch.sum(left * right)
+        for start in range(0, len(self.x_train), self.tile_size):
+            stop = start + self.tile_size
+            total = total + checkpoint(tile_form,
+                                       self.x_train[start:stop],
+                                       left[start:stop],
+                                       use_reentrant=False)
+        return total
+
+    def _cg_solve(self, rhs: torch.Tensor) -> torch.Tensor:
+        r"""Solves $\boldsymbol{K}_{y}^{-1}$ `rhs` by conjugate gradients.
+
+        Args:
+            rhs (torch.Tensor): Right-hand sides of shape
+                (num_train, num_columns).
+
+        Returns:
+            torch.Tensor: The solution of shape (num_train, num_columns).
+
+        """
+        precond_diag = self.kernel.diag(self.x_train) + self.noise
+        solution, *_ = torch_utils.conjugate_gradient(self._training_matvec(),
+                                                      rhs, precond_diag,
+                                                      self.max_cg_iter,
+                                                      self.cg_tol)
+        return solution
+
+    def _cached_common(self):
+        r"""Cached version of `_compute_common` for prediction.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the training covariance
+                matrix. Shape: (num_train, num_train).
+            iK_y (torch.Tensor): Inverse training covariance matrix multiplied
+                by training outputs. Shape: (num_train, dim_outputs).
+
+        ??? note "When is the cache refreshed?"
+
+            The cache is keyed on the version of the training data and the
+            hyper-parameters, which is increased by `_add_data`, `learn`, and
+            the hyper-parameter setters of the model and its kernel.
+            Repeated predictions in between reuse the same factorization.
+
+        """
+        key = self._cache_version()
+        if self._cache is None or self._cache_key != key:
+            with torch.no_grad():
+                self._cache = self._compute_common()
+            self._cache_key = key
+        return self._cache
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, and posterior cache."""
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train if has_data else None,
+            "y_train": self.y_train if has_data else None,
+            "cache": self._cached_common() if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self._init_optimizers(self.lr_hyper, self.optimizer)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        if checkpoint["x_train"] is not None:
+            self._x_buffer.append(checkpoint["x_train"])
+            self._y_buffer.append(checkpoint["y_train"])
+        self._num_updates += 1
+        self._cache = checkpoint["cache"]
+        self._cache_key = None
+        if self._cache is not None:
+            self._cache_key = self._cache_version()
+
+    def _cache_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, self.kernel.hyper_version
+
+    def _extend_common(self):
+        r"""Extends the cached common terms to the newly added data.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the training covariance
+                matrix. Shape: (num_train, num_train).
+            iK_y (torch.Tensor): Inverse training covariance matrix multiplied
+                by training outputs. Shape: (num_train, dim_outputs).
+
+        ??? note "Block Cholesky extension"
+
+            $$
+            \boldsymbol{L}_{+} =
+            \begin{bmatrix}
+            \boldsymbol{L} & \mathbf{0} \\
+            (\boldsymbol{L}^{-1}\boldsymbol{K}_{on})^{\intercal} &
+            \mathtt{chol}(\boldsymbol{K}_{nn} + \sigma^2\mathbf{I}
+            - \boldsymbol{K}_{no}\boldsymbol{K}_{y}^{-1}\boldsymbol{K}_{on})
+            \end{bmatrix}
+            $$
+
+        """
+        L, _ = self._cache
+        num_old = L.shape[0]
+        x_old, x_new = self.x_train[:num_old], self.x_train[num_old:]
+        K_cross = self.kernel(x_old, x_new)
+        K_new = self.kernel(x_new, x_new)
+        K_new.diagonal().add_(self.noise)
+        L = torch_utils.cholesky_extend(L,
+                                        K_cross.to(L.dtype),
+                                        K_new.to(L.dtype),
+                                        jitter=self.jitter)
+        iK_y = self._cholesky_solve(L, self.y_train)
+        return L, iK_y
+
+    def _init_optimizers(self,
+                         lr_hyper: float,
+                         optimizer: str = "adam") -> None:
         """Initialize optimizers for hyper-parameters.
 
         Args:
             lr_hyper (float, optional): Learning rate of hyper-parameters.
                 Defaults to 0.01.
+            optimizer (str, optional): Either "adam" or "lbfgs".
+                Defaults to "adam".
 
         """
         self.lr_hyper = lr_hyper
+        self.optimizer = optimizer
         hyper_params = []
         for name, param in self.named_parameters():
             hyper_params.append(param)
-        self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
+        if optimizer == "lbfgs":
+            self.opt_hyper = torch.optim.LBFGS(hyper_params,
+                                               lr=1.0,
+                                               max_iter=1,
+                                               line_search_fn="strong_wolfe")
+        else:
+            self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
+
+
+def _optimize_restart(
+    model: GPRModel,
+    num_iter: int,
+    tol: Optional[float],
+    verbose: bool = False,
+) -> Tuple[float, Dict[str, torch.Tensor], int]:
+    r"""Optimizes one restart of `GPRModel.learn` in a worker process.
+
+    Args:
+        model (GPRModel): The restart to optimize.
+        num_iter (int): Maximum number of optimization iterations.
+        tol (Optional[float]): Relative loss change for early stopping.
+        verbose (bool, optional): Print the optimization information or not?
+            Defaults to False.
+
+    Returns:
+        Tuple[float, Dict[str, torch.Tensor], int]: The final loss, which is
+            infinite if it is not finite, the optimized state dict on the
+            CPU, and the number of iterations run.
+
+    """
+    # Counts every iteration if the optimization fails midway.
+    num_run = num_iter
+    try:
+        num_run = model._optimize(num_iter, verbose=verbose, tol=tol)
+        with torch.no_grad():
+            loss = model._compute_loss().item()
+    except (RuntimeError, ValueError):
+        # E.g., the Cholesky factorization fails for extreme lengthscales.
+        loss = float("inf")
+    if not np.isfinite(loss):
+        loss = float("inf")
+    state = {
+        name: value.detach().cpu()
+        for name, value in model.state_dict().items()
+    }
+    return loss, state, num_run
@@ -0,0 +1,632 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+from torch.nn import Parameter
+from tqdm import tqdm
+
+from ..utils import TensorBuffer, torch_utils
+from .base_model import BaseModel
+from .kernels import GaussianKernel
+
+
+class GridGPRModel(BaseModel, nn.Module):
+
+    def __init__(self,
+                 device_name: str,
+                 kernel: GaussianKernel,
+                 noise: float,
+                 workspace: List[float],
+                 grid_shape: Tuple[int, int],
+                 lr_hyper: float = 0.01,
+                 jitter: float = 1e-6,
+                 cg_tol: float = 1e-6,
+                 max_cg_iter: int = 1000,
+                 num_probes: int = 10,
+                 num_variance_samples: int = 1024,
+                 seed: int = 0) -> None:
+        r"""Gaussian Process Regression with structured kernel interpolation.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernel (GaussianKernel): A Gaussian kernel whose lengthscale is a
+                scalar or has one entry per axis.
+            noise (float): The noise variance of the Gaussian likelihood.
+            workspace (List[float]): Bounding box [xmin, ymin, xmax, ymax]
+                of the grid, e.g., the extent of a `TensorMap`.
+            grid_shape (Tuple[int, int]): Number of grid nodes along the x
+                and y axes. Both must be at least two.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (float, optional): The jitter to add to the diagonal of the
+                per-axis covariance matrices. Defaults to 1e-6.
+            cg_tol (float, optional): Relative residual tolerance of conjugate
+                gradients. Defaults to 1e-6.
+            max_cg_iter (int, optional): Maximum number of conjugate gradient
+                iterations. Defaults to 1000.
+            num_probes (int, optional): Number of random probe vectors of the
+                stochastic log-determinant estimator. Defaults to 10.
+            num_variance_samples (int, optional): Number of posterior samples
+                used to estimate the predictive variance. Must be at least
+                one. Defaults to 1024.
+            seed (int, optional): Seed of the dedicated random number
+                generator of the variance samples. Defaults to 0.
+
+        Raises:
+            ValueError: If `kernel` is not a `GaussianKernel` with one or two
+                lengthscales, if `workspace` or `grid_shape` is invalid, or
+                if `num_variance_samples` is not positive.
+
+        ??? note "Structured kernel interpolation (KISS-GP)"
+
+            The Gaussian kernel factorizes over the axes, so its covariance
+            matrix on a regular grid of $G=g_xg_y$ nodes is the Kronecker
+            product $\alpha\boldsymbol{K}_x\otimes\boldsymbol{K}_y$, and a
+            matrix-vector product costs $O(G(g_x+g_y))$ without forming it.
+            Training inputs are interpolated bilinearly from their four
+            surrounding nodes,
+            $\boldsymbol{K}\approx\boldsymbol{W}(\alpha\boldsymbol{K}_x
+            \otimes\boldsymbol{K}_y)\boldsymbol{W}^{\intercal}$, so
+            conjugate gradients and stochastic Lanczos quadrature train the
+            model in time near-linear in the grid size. The predictive mean
+            on the grid is cached after each update, and the variance is
+            estimated from pathwise posterior samples on the grid, so
+            predicting the full map costs $O(G)$.
+
+        ??? note "Accuracy of the variance"
+
+            The samples are centered at the exact posterior mean, so the
+            relative standard error of the variance estimate is
+            $\sqrt{2/S}$ for $S$ samples, i.e., about 4% for the default
+            1024 samples. The samples take $G\times{S}$ memory and are
+            drawn once per update of the data or hyper-parameters, and only
+            when a variance is requested. They come from a dedicated
+            generator that is reseeded with `seed` before every draw, so the
+            global random stream is untouched and the variance of the same
+            model is reproducible.
+
+        """
+        if not isinstance(kernel, GaussianKernel):
+            raise ValueError("GridGPRModel requires a GaussianKernel.")
+        if kernel.lengthscale.numel() not in (1, 2):
+            raise ValueError("The lengthscale must be a scalar or have " +
+                             "one entry per axis.")
+        if len(workspace) != 4:
+            raise ValueError("Workspace = [xmin, ymin, xmax, ymax].")
+        if workspace[0] >= workspace[2] or workspace[1] >= workspace[3]:
+            raise ValueError("Workspace must have positive extent.")
+        if len(grid_shape) != 2 or min(grid_shape) < 2:
+            raise ValueError("grid_shape must contain two integers >= 2.")
+        if num_variance_samples <= 0:
+            raise ValueError("num_variance_samples must be positive.")
+        BaseModel.__init__(self, device_name)
+        nn.Module.__init__(self)
+        self.kernel = kernel
+        self._free_noise = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    noise,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+        self._init_optimizers(lr_hyper)
+        self.workspace = workspace
+        self.grid_shape = tuple(grid_shape)
+        self.jitter = jitter
+        self.cg_tol = cg_tol
+        self.max_cg_iter = max_cg_iter
+        self.num_probes = num_probes
+        self.num_variance_samples = num_variance_samples
+        self.nodes = [
+            torch.linspace(workspace[axis],
+                           workspace[axis + 2],
+                           grid_shape[axis],
+                           dtype=self.dtype,
+                           device=self.device) for axis in range(2)
+        ]
+        self._num_updates = 0
+        self.seed = seed
+        self._generator = torch.Generator(device=self.device)
+        self._cache = None
+        self._cache_key = None
+        self._sample_cache = None
+        self._sample_cache_key = None
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        self._index_buffer = TensorBuffer(torch.long, self.device)
+        self._weight_buffer = TensorBuffer(self.dtype, self.device)
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Optimizes the model parameters.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape (num_inputs, 2).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, 1).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._add_data(x_new, y_new)
+        self.train()
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            self.opt_hyper.zero_grad()
+            loss = self._compute_loss()
+            loss.backward()
+            self.opt_hyper.step()
+            progress_bar.set_description(
+                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+        if num_iter > 0:
+            self._num_updates += 1
+        self.eval()
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, 2).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
+
+        """
+        self._validate_mode(mode)
+        x_test = torch.as_tensor(x_test, dtype=self.dtype, device=self.device)
+        mean, std = self.forward(x_test, noise_free=noise_free, mode=mode)
+        mean = None if mean is None else mean.cpu().numpy()
+        std = None if std is None else std.cpu().numpy()
+        return mean, std
+
+    def predict_grid(
+        self,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions at all grid nodes.
+
+        Args:
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_y, num_x), i.e., rows follow the y axis like a
+                `TensorMap`. The entry not requested by `mode` is None.
+
+        """
+        self._validate_mode(mode)
+        with torch.no_grad():
+            mean_grid = self._cached_common()
+            mean, std = None, None
+            if mode in ("mean", "both"):
+                mean = mean_grid.view(self.grid_shape).t().cpu().numpy()
+            if mode in ("var", "both"):
+                var = self._sample_variance(self._cached_samples(),
+                                            mean_grid, noise_free)
+                std = var.sqrt().view(self.grid_shape).t().cpu().numpy()
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape (num_inputs, 2).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, 1), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
+
+        """
+        with torch.no_grad():
+            std = None
+            mean_grid = self._cached_common()
+            index, weight = self._interpolation(x_test)
+            mean = self._interpolate(index, weight, mean_grid)
+            if mode in ("var", "both"):
+                samples = self._interpolate(index, weight,
+                                            self._cached_samples())
+                std = self._sample_variance(samples, mean, noise_free).sqrt()
+            if mode == "var":
+                mean = None
+        return mean, std
+
+    @property
+    def x_train(self) -> torch.Tensor:
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        return self._y_buffer.data
+
+    @property
+    def noise(self) -> torch.Tensor:
+        r"""The noise variance hyper-parameter.
+
+        Returns:
+            torch.Tensor: The noise variance.
+
+        """
+        return torch_utils.softplus(self._free_noise)
+
+    @noise.setter
+    def noise(self, noise: torch.Tensor) -> None:
+        r"""The noise variance hyper-parameter.
+
+        Args:
+            noise (torch.Tensor): The new value of the noise variance.
+
+        """
+        with torch.inference_mode():
+            self._free_noise.copy_(torch_utils.inv_softplus(noise))
+        self._num_updates += 1
+
+    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Add new data and their interpolation weights to the training set.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape (num_inputs, 2).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, 1).
+
+        """
+        self._validate_data(x_new, y_new)
+        x_new = torch.as_tensor(x_new, dtype=self.dtype, device=self.device)
+        index, weight = self._interpolation(x_new)
+        self._num_updates += 1
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+        self._index_buffer.append(index)
+        self._weight_buffer.append(weight)
+
+    def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Check if the inputs `x_new` and `y_new` are valid.
+
+        Args:
+            x_new (np.ndarray): An array of shape (num_inputs, 2) containing
+                the input features of the new data.
+            y_new (np.ndarray): An array of shape (num_outputs, 1)
+                containing the output targets of the new data.
+
+        Raises:
+            ValueError: If `x_new` is not of shape (num_inputs, 2), if
+                `y_new` is not of shape (num_outputs, 1), or if they have
+                different number of samples.
+
+        """
+        if x_new.ndim != 2 or x_new.shape[1] != 2:
+            raise ValueError("x_new must be of shape (num_inputs, 2).")
+        if y_new.ndim != 2 or y_new.shape[1] != 1:
+            raise ValueError("y_new must be of shape (num_outputs, 1).")
+        if x_new.shape[0] != y_new.shape[0]:
+            raise ValueError("x_train and y_train should have same length.")
+
+    def _interpolation(
+            self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Bilinear interpolation from the four surrounding grid nodes.
+
+        Args:
+            x (torch.Tensor): Inputs of shape (num_inputs, 2). Inputs outside
+                the workspace are clamped to its border.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor]: Flat node indices and weights,
+                both of shape (num_inputs, 4).
+
+        """
+        corners, fractions = [], []
+        for axis in range(2):
+            num = self.grid_shape[axis]
+            spacing = self.nodes[axis][1] - self.nodes[axis][0]
+            position = (x[:, axis] - self.nodes[axis][0]) / spacing
+            position = position.clamp(0, num - 1)
+            lower = position.floor().long().clamp(max=num - 2)
+            corners.append(lower)
+            fractions.append(position - lower)
+        (ix, iy), (tx, ty) = corners, fractions
+        num_y = self.grid_shape[1]
+        index = torch.stack([
+            ix * num_y + iy,
+            ix * num_y + iy + 1,
+            (ix + 1) * num_y + iy,
+            (ix + 1) * num_y + iy + 1,
+        ], 1)
+        weight = torch.stack([
+            (1 - tx) * (1 - ty),
+            (1 - tx) * ty,
+            tx * (1 - ty),
+            tx * ty,
+        ], 1)
+        return index, weight
+
+    @staticmethod
+    def _interpolate(index: torch.Tensor, weight: torch.Tensor,
+                     grid_values: torch.Tensor) -> torch.Tensor:
+        r"""Computes $\boldsymbol{W}$ `@ grid_values`."""
+        return (weight.unsqueeze(-1) * grid_values[index]).sum(1)
+
+    def _interpolate_t(self, index: torch.Tensor, weight: torch.Tensor,
+                       values: torch.Tensor) -> torch.Tensor:
+        r"""Computes $\boldsymbol{W}^{\intercal}$ `@ values`."""
+        num_nodes = self.grid_shape[0] * self.grid_shape[1]
+        contributions = weight.unsqueeze(-1) * values.unsqueeze(1)
+        output = values.new_zeros(num_nodes, values.shape[1])
+        return output.index_add(0, index.flatten(),
+                                contributions.flatten(0, 1))
+
+    def _axis_covariances(self) -> List[torch.Tensor]:
+        r"""Unit-amplitude Gaussian covariance matrices of the grid axes."""
+        lengthscale = self.kernel.lengthscale.reshape(-1).expand(2)
+        covariances = []
+        for axis in range(2):
+            nodes = self.nodes[axis] / lengthscale[axis]
+            diff = nodes.unsqueeze(1) - nodes.unsqueeze(0)
+            covariances.append(torch.exp(-0.5 * diff.square()))
+        return covariances
+
+    def _grid_matvec(self, covariances: List[torch.Tensor],
+                     values: torch.Tensor) -> torch.Tensor:
+        r"""Computes $(\alpha\boldsymbol{K}_x\otimes\boldsymbol{K}_y)$
+        `@ values` for grid values of shape (num_nodes, num_columns)."""
+        K_x, K_y = covariances
+        grid = values.view(*self.grid_shape, -1)
+        product = torch.einsum("ij,jkc,lk->ilc", K_x, grid, K_y)
+        return self.kernel.amplitude * product.reshape(values.shape)
+
+    def _matvec(self, covariances: List[torch.Tensor],
+                vectors: torch.Tensor) -> torch.Tensor:
+        r"""Multiplies the interpolated training covariance with `vectors`.
+
+        Args:
+            covariances (List[torch.Tensor]): Output of `_axis_covariances`.
+            vectors (torch.Tensor): Tensor of shape (num_train, num_vectors).
+
+        Returns:
+            torch.Tensor: $\boldsymbol{K}_{y}$ `@ vectors` of shape
+                (num_train, num_vectors).
+
+        """
+        index, weight = self._index_buffer.data, self._weight_buffer.data
+        grid = self._interpolate_t(index, weight, vectors)
+        grid = self._grid_matvec(covariances, grid)
+        return self._interpolate(index, weight, grid) + self.noise * vectors
+
+    def _precond_diag(self, covariances: List[torch.Tensor]) -> torch.Tensor:
+        r"""Diagonal of the interpolated training covariance matrix."""
+        index, weight = self._index_buffer.data, self._weight_buffer.data
+        K_x, K_y = covariances
+        num_y = self.grid_shape[1]
+        ix, iy = index // num_y, index % num_y
+        cov = (K_x[ix.unsqueeze(2), ix.unsqueeze(1)] *
+               K_y[iy.unsqueeze(2), iy.unsqueeze(1)])
+        quadratic = torch.einsum("na,nab,nb->n", weight, cov, weight)
+        return self.kernel.amplitude * quadratic.unsqueeze(1) + self.noise
+
+    def _cg_solve(self, covariances: List[torch.Tensor],
+                  rhs: torch.Tensor) -> torch.Tensor:
+        r"""Solves $\boldsymbol{K}_{y}^{-1}$ `rhs` by conjugate gradients."""
+        solution, *_ = torch_utils.conjugate_gradient(
+            lambda vectors: self._matvec(covariances, vectors), rhs,
+            self._precond_diag(covariances), self.max_cg_iter, self.cg_tol)
+        return solution
+
+    def _compute_loss(self) -> torch.Tensor:
+        r"""Compute training loss.
+
+        Returns:
+            torch.Tensor: A surrogate whose value approximates the negative
+                log marginal likelihood and whose gradient is the (stochastic)
+                gradient of the negative log marginal likelihood.
+
+        ??? note "Gradient surrogates"
+
+            The same surrogates as the "cg" solver of `GPRModel` are used
+            with the interpolated covariance matrix.
+
+        """
+        covariances = self._axis_covariances()
+        num_train = len(self.y_train)
+
+        def matvec(vectors):
+            return self._matvec(covariances, vectors)
+
+        with torch.no_grad():
+            precond_diag = self._precond_diag(covariances)
+            iK_y, *_ = torch_utils.conjugate_gradient(matvec, self.y_train,
+                                                      precond_diag,
+                                                      self.max_cg_iter,
+                                                      self.cg_tol)
+            signs = torch.randint(0,
+                                  2, (num_train, self.num_probes),
+                                  device=self.device).to(self.dtype)
+            probes = precond_diag.sqrt() * (2.0 * signs - 1.0)
+            iK_z, alphas, betas, num_iters = torch_utils.conjugate_gradient(
+                matvec, probes, precond_diag, self.max_cg_iter, self.cg_tol)
+            quadratures = torch_utils.lanczos_logdet_quadrature(
+                alphas, betas, num_iters)
+            logdet_value = (precond_diag.log().sum() +
+                            num_train * quadratures.mean())
+        quadratic = 2.0 * torch.sum(self.y_train * iK_y) - torch.sum(
+            iK_y * matvec(iK_y))
+        trace = torch.sum(iK_z * matvec(probes / precond_diag))
+        trace = trace / self.num_probes
+        logdet = logdet_value + trace - trace.detach()
+        constant = num_train * np.log(2 * np.pi)
+        return 0.5 * (quadratic + logdet + constant)
+
+    def _compute_common(self) -> torch.Tensor:
+        r"""Compute the posterior mean on the grid.
+
+        Returns:
+            torch.Tensor: Posterior mean at the grid nodes of shape
+                (num_nodes, 1).
+
+        """
+        covariances = self._axis_covariances()
+        index, weight = self._index_buffer.data, self._weight_buffer.data
+        solution = self._cg_solve(covariances, self.y_train)
+        return self._grid_matvec(covariances,
+                                 self._interpolate_t(index, weight, solution))
+
+    def _compute_samples(self) -> torch.Tensor:
+        r"""Draw pathwise posterior samples on the grid.
+
+        Returns:
+            torch.Tensor: Posterior samples at the grid nodes of shape
+                (num_nodes, num_variance_samples).
+
+        ??? note "Pathwise samples on the grid"
+
+            A prior sample on the grid is
+            $\sqrt{\alpha}(\boldsymbol{L}_x\otimes\boldsymbol{L}_y)
+            \mathbf{z}$, and Matheron's rule adds
+            $\alpha(\boldsymbol{K}_x\otimes\boldsymbol{K}_y)
+            \boldsymbol{W}^{\intercal}\boldsymbol{K}_{y}^{-1}
+            (\mathbf{y}-\boldsymbol{W}\mathbf{f}-\boldsymbol{\epsilon})$.
+            All samples share one batched CG solve.
+
+        """
+        covariances = self._axis_covariances()
+        num_samples = self.num_variance_samples
+        num_train = len(self.y_train)
+        factors = []
+        for covariance in covariances:
+            factors.append(
+                torch_utils.robust_cholesky(covariance, jitter=self.jitter))
+        L_x, L_y = factors
+        self._generator.manual_seed(self.seed)
+        options = dict(generator=self._generator,
+                       dtype=self.dtype,
+                       device=self.device)
+        z = torch.randn(*self.grid_shape, num_samples, **options)
+        prior = self.kernel.amplitude.sqrt() * torch.einsum(
+            "ij,jkc,lk->ilc", L_x, z, L_y)
+        prior = prior.reshape(-1, num_samples)
+        index, weight = self._index_buffer.data, self._weight_buffer.data
+        epsilon = self.noise.sqrt() * torch.randn(num_train, num_samples,
+                                                  **options)
+        residual = (self.y_train - self._interpolate(index, weight, prior) -
+                    epsilon)
+        solution = self._cg_solve(covariances, residual)
+        return prior + self._grid_matvec(
+            covariances, self._interpolate_t(index, weight, solution))
+
+    def _cached_common(self) -> torch.Tensor:
+        r"""Cached version of `_compute_common` for prediction.
+
+        ??? note "When is the cache refreshed?"
+
+            The cache is keyed on the version of the training data and the
+            hyper-parameters, which is increased by `_add_data`, `learn`, and
+            the hyper-parameter setters of the model and its kernel.
+
+        """
+        key = self._cache_version()
+        if self._cache is None or self._cache_key != key:
+            with torch.no_grad():
+                self._cache = self._compute_common()
+            self._cache_key = key
+        return self._cache
+
+    def _cached_samples(self) -> torch.Tensor:
+        r"""Cached version of `_compute_samples` with the same key."""
+        key = self._cache_version()
+        if self._sample_cache is None or self._sample_cache_key != key:
+            with torch.no_grad():
+                self._sample_cache = self._compute_samples()
+            self._sample_cache_key = key
+        return self._sample_cache
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, and posterior mean.
+
+        The variance samples are not saved, because they are redrawn from
+        the seeded generator when a variance is requested.
+
+        """
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train.clone() if has_data else None,
+            "y_train": self.y_train.clone() if has_data else None,
+            "cache": self._cached_common() if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self._init_optimizers(self.lr_hyper)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        self._index_buffer = TensorBuffer(torch.long, self.device)
+        self._weight_buffer = TensorBuffer(self.dtype, self.device)
+        if checkpoint["x_train"] is not None:
+            self._add_data(checkpoint["x_train"], checkpoint["y_train"])
+        self._num_updates += 1
+        self._cache = checkpoint["cache"]
+        self._cache_key = None
+        self._sample_cache, self._sample_cache_key = None, None
+        if self._cache is not None:
+            self._cache_key = self._cache_version()
+
+    def _cache_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, self.kernel.hyper_version
+
+    def _sample_variance(self, samples: torch.Tensor, mean: torch.Tensor,
+                         noise_free: bool) -> torch.Tensor:
+        r"""Predictive variance of shape (num_inputs, 1) from samples.
+
+        The posterior samples are centered at the exact posterior `mean`
+        rather than at their sample mean, which keeps all degrees of freedom
+        of the samples for the variance.
+
+        """
+        var = (samples - mean).square().mean(dim=1, keepdim=True)
+        if not noise_free:
+            var = var + self.noise
+        return var
+
+    def _init_optimizers(self, lr_hyper: float) -> None:
+        """Initialize optimizers for hyper-parameters.
+
+        Args:
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+                Defaults to 0.01.
+
+        """
+        self.lr_hyper = lr_hyper
+        hyper_params = []
+        for name, param in self.named_parameters():
+            hyper_params.append(param)
+        self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
@@ -1,7 +1,22 @@
 from .base_kernel import BaseKernel  # isort: skip
+from .distances import PairwiseDistances  # isort: skip
+from .stationary_kernel import StationaryKernel  # isort: skip
 from .gaussian_kernel import GaussianKernel  # isort: skip
+from .matern_kernel import MaternKernel  # isort: skip
+from .rational_quadratic_kernel import RationalQuadraticKernel  # isort: skip
+from .wendland_kernel import WendlandKernel  # isort: skip
+from .composite_kernel import CompositeKernel  # isort: skip
+from .composite_kernel import ProductKernel, SumKernel  # isort: skip
 
 __all__ = [
     "BaseKernel",
+    "PairwiseDistances",
+    "StationaryKernel",
     "GaussianKernel",
+    "MaternKernel",
+    "RationalQuadraticKernel",
+    "WendlandKernel",
+    "CompositeKernel",
+    "SumKernel",
+    "ProductKernel",
 ]
@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+from typing import Hashable, Optional
 
 import torch
 from torch.nn.parameter import Parameter
@@ -9,13 +10,18 @@ from pypolo.utils import torch_utils
 class BaseKernel(torch.nn.Module, metaclass=ABCMeta):
 
     @abstractmethod
-    def __init__(self, amplitude: float, device_name: str) -> None:
+    def __init__(self,
+                 amplitude: float,
+                 device_name: str,
+                 precision: Optional[str] = None) -> None:
         r"""Initializes a kernel with the specified amplitude and device name.
 
         Args:
             amplitude (float): The positive amplitude parameter of the kernel.
             device_name (str): The name of the PyTorch device to be used for
                 computations.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
 
         ??? note "Parameterization"
 
@@ -25,7 +31,9 @@ class BaseKernel(torch.nn.Module, metaclass=ABCMeta):
 
         """
         super().__init__()
-        self.dtype, self.device = torch_utils.get_dtype_and_device(device_name)
+        self.dtype, self.device = torch_utils.get_dtype_and_device(
+            device_name, precision)
+        self._num_hyper_updates = 0
         self._free_amplitude = Parameter(
             torch_utils.inv_softplus(
                 torch.as_tensor(
@@ -34,6 +42,21 @@ class BaseKernel(torch.nn.Module, metaclass=ABCMeta):
                     device=self.device,
                 )))
 
+    @property
+    def hyper_version(self) -> int:
+        r"""A counter that increases whenever a hyper-parameter is set.
+
+        Returns:
+            int: The number of hyper-parameter updates made through setters.
+
+        ??? note "Why do we need this?"
+
+            Models cache quantities derived from the kernel (e.g., Cholesky
+            factors) and use this counter to tell if the cache is stale.
+
+        """
+        return self._num_hyper_updates
+
     @property
     def amplitude(self) -> torch.Tensor:
         r"""The amplitude of the kernel.
@@ -58,6 +81,7 @@ class BaseKernel(torch.nn.Module, metaclass=ABCMeta):
         """
         with torch.inference_mode():
             self._free_amplitude.copy_(torch_utils.inv_softplus(amplitude))
+        self._num_hyper_updates += 1
 
     def diag(self, x: torch.Tensor) -> torch.Tensor:
         """Compute the diagonal elements of the self-covariance matrix.
@@ -81,6 +105,26 @@ class BaseKernel(torch.nn.Module, metaclass=ABCMeta):
             device=self.device,
         )
 
+    def gram(self,
+             x: torch.Tensor,
+             key: Optional[Hashable] = None) -> torch.Tensor:
+        r"""Compute the covariance matrix of `x` with itself.
+
+        Args:
+            x (torch.Tensor): Inputs of shape (num_inputs, dim_inputs).
+            key (Optional[Hashable], optional): Identifies the version of
+                `x`. Kernels may cache hyper-parameter independent terms
+                under this key. Defaults to None, i.e., no caching.
+
+        Returns:
+            torch.Tensor: Covariance matrix of shape (num_inputs, num_inputs).
+
+        """
+        return self.forward(x, x)
+
+    def clear_cache(self) -> None:
+        r"""Drops terms cached by `gram`, which does not cache by default."""
+
     @abstractmethod
     def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
         """Compute the covariance matrix between two sets of inputs.
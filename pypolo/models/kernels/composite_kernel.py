@@ -0,0 +1,165 @@
+from abc import abstractmethod
+from typing import Hashable, Optional, Sequence
+
+import torch
+
+from .base_kernel import BaseKernel
+from .distances import PairwiseDistances
+from .stationary_kernel import StationaryKernel
+
+
+class CompositeKernel(BaseKernel):
+
+    def __init__(self, kernels: Sequence[StationaryKernel]) -> None:
+        r"""Combines stationary kernels evaluated on shared distances.
+
+        Args:
+            kernels (Sequence[StationaryKernel]): Component kernels, which
+                keep their own hyper-parameters.
+
+        Raises:
+            ValueError: If there are no kernels, or their dtypes or devices
+                differ.
+
+        ??? note "Shared distances"
+
+            All components are evaluated on the same `PairwiseDistances`, so
+            the pairwise distances are computed once per evaluation rather
+            than once per component, and the Gram cache of the composite
+            kernel serves all components. If several components have
+            per-dimension lengthscales, they share per-dimension squared
+            differences, which cost `dim_inputs` times the memory of the
+            distances.
+
+        ??? note "Parameterization"
+
+            A composite kernel has no hyper-parameters of its own, so it
+            does not call `BaseKernel.__init__`, which would create an
+            amplitude. Its `amplitude` is derived from the components.
+
+        """
+        if len(kernels) == 0:
+            raise ValueError("kernels must not be empty.")
+        if any(k.dtype != kernels[0].dtype or k.device != kernels[0].device
+               for k in kernels):
+            raise ValueError("All kernels must share the dtype and device.")
+        torch.nn.Module.__init__(self)
+        self.dtype, self.device = kernels[0].dtype, kernels[0].device
+        self.kernels = torch.nn.ModuleList(kernels)
+        self._num_hyper_updates = 0
+        self._gram_key = None
+        self._gram_cache = None
+
+    @property
+    def hyper_version(self) -> int:
+        r"""A counter that increases whenever a component is updated."""
+        return self._num_hyper_updates + sum(k.hyper_version
+                                             for k in self.kernels)
+
+    def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
+        return self.evaluate(
+            PairwiseDistances(x1, x2, cache_differences=self._share_diff()))
+
+    def gram(self,
+             x: torch.Tensor,
+             key: Optional[Hashable] = None) -> torch.Tensor:
+        r"""Compute the covariance matrix of `x` with itself.
+
+        Args:
+            x (torch.Tensor): Inputs of shape (num_inputs, dim_inputs).
+            key (Optional[Hashable], optional): Identifies the version of
+                `x`. The distances are cached under this key for all
+                components. Defaults to None, i.e., no caching.
+
+        Returns:
+            torch.Tensor: Covariance matrix of shape (num_inputs, num_inputs).
+
+        """
+        if key is None:
+            return self.forward(x, x)
+        cache_key = (key, x.shape)
+        if self._gram_cache is None or self._gram_key != cache_key:
+            x = x.detach()
+            self._gram_cache = PairwiseDistances(x, x, cache_differences=True)
+            self._gram_key = cache_key
+        return self.evaluate(self._gram_cache)
+
+    def clear_cache(self) -> None:
+        r"""Drops the distances cached by `gram`."""
+        self._gram_key = None
+        self._gram_cache = None
+
+    @abstractmethod
+    def evaluate(self, distances: PairwiseDistances) -> torch.Tensor:
+        r"""Combines the components evaluated on shared distances.
+
+        Raises:
+            NotImplementedError: This is an abstract method and must be
+                implemented by a subclass.
+
+        """
+        raise NotImplementedError
+
+    def _share_diff(self) -> bool:
+        r"""Whether several components have per-dimension lengthscales."""
+        num_ard = sum(k.lengthscale.numel() > 1 for k in self.kernels)
+        return num_ard > 1
+
+
+class SumKernel(CompositeKernel):
+    r"""Sum of stationary kernels evaluated on shared distances."""
+
+    @property
+    def amplitude(self) -> torch.Tensor:
+        r"""The sum of the component amplitudes, i.e., the variance."""
+        return sum(k.amplitude for k in self.kernels)
+
+    @amplitude.setter
+    def amplitude(self, amplitude: torch.Tensor) -> None:
+        r"""Rescales all component amplitudes to sum to `amplitude`.
+
+        Args:
+            amplitude (torch.Tensor): The new value of the amplitude.
+
+        """
+        with torch.no_grad():
+            ratio = amplitude / self.amplitude
+            for kernel in self.kernels:
+                kernel.amplitude = kernel.amplitude * ratio
+
+    def evaluate(self, distances: PairwiseDistances) -> torch.Tensor:
+        cov = self.kernels[0].evaluate(distances)
+        for kernel in self.kernels[1:]:
+            cov = cov + kernel.evaluate(distances)
+        return cov
+
+
+class ProductKernel(CompositeKernel):
+    r"""Product of stationary kernels evaluated on shared distances."""
+
+    @property
+    def amplitude(self) -> torch.Tensor:
+        r"""The product of the component amplitudes, i.e., the variance."""
+        amplitude = self.kernels[0].amplitude
+        for kernel in self.kernels[1:]:
+            amplitude = amplitude * kernel.amplitude
+        return amplitude
+
+    @amplitude.setter
+    def amplitude(self, amplitude: torch.Tensor) -> None:
+        r"""Rescales the first component so the product is `amplitude`.
+
+        Args:
+            amplitude (torch.Tensor): The new value of the amplitude.
+
+        """
+        with torch.no_grad():
+            ratio = amplitude / self.amplitude
+            first = self.kernels[0]
+            first.amplitude = first.amplitude * ratio
+
+    def evaluate(self, distances: PairwiseDistances) -> torch.Tensor:
+        cov = self.kernels[0].evaluate(distances)
+        for kernel in self.kernels[1:]:
+            cov = cov * kernel.evaluate(distances)
+        return cov
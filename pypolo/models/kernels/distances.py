@@ -0,0 +1,73 @@
+import torch
+
+
+class PairwiseDistances:
+
+    def __init__(self,
+                 x1: torch.Tensor,
+                 x2: torch.Tensor,
+                 cache_differences: bool = False) -> None:
+        r"""Lazily computed distances shared by stationary kernels.
+
+        Args:
+            x1 (torch.Tensor): First input tensor of shape
+                ([batch_size,] num_inputs_1, dim_inputs).
+            x2 (torch.Tensor): Second input tensor of shape
+                ([batch_size,] num_inputs_2, dim_inputs).
+            cache_differences (bool, optional): If True, per-dimension
+                lengthscales reuse the per-dimension squared differences of
+                shape (..., num_inputs_1, num_inputs_2, dim_inputs), which
+                costs `dim_inputs` times the memory of the distances.
+                Otherwise, every per-dimension lengthscale recomputes the
+                distances of the rescaled inputs. Defaults to False.
+
+        ??? note "Fused distance engine"
+
+            Stationary kernels only depend on
+            $\|(\mathbf{x}-\mathbf{x}')/\ell\|^2$. With an isotropic
+            lengthscale, this is the unscaled squared distance divided by
+            $\ell^2$, so the unscaled distances are computed on first use
+            and reused by every kernel evaluated on the same object, e.g.,
+            all components of a `SumKernel` or `ProductKernel`, or all
+            iterations of `learn` through the Gram cache.
+
+        """
+        self.x1 = x1
+        self.x2 = x2
+        self.cache_differences = cache_differences
+        self._squared = None
+        self._squared_diff = None
+
+    def squared(self) -> torch.Tensor:
+        r"""Unscaled squared Euclidean distances.
+
+        Returns:
+            torch.Tensor: Distances of shape
+                ([batch_size,] num_inputs_1, num_inputs_2).
+
+        """
+        if self._squared is None:
+            self._squared = torch.cdist(self.x1, self.x2).square()
+        return self._squared
+
+    def scaled_squared(self, lengthscale: torch.Tensor) -> torch.Tensor:
+        r"""Squared distances of the inputs divided by the lengthscale.
+
+        Args:
+            lengthscale (torch.Tensor): A scalar lengthscale or one
+                lengthscale per input dimension.
+
+        Returns:
+            torch.Tensor: Scaled distances of the same shape as `squared`.
+
+        """
+        lengthscale = lengthscale.reshape(-1)
+        if lengthscale.numel() == 1:
+            return self.squared() / lengthscale.square()
+        if not self.cache_differences:
+            return torch.cdist(self.x1.div(lengthscale),
+                               self.x2.div(lengthscale)).square()
+        if self._squared_diff is None:
+            diff = self.x1.unsqueeze(-2) - self.x2.unsqueeze(-3)
+            self._squared_diff = diff.square()
+        return (self._squared_diff / lengthscale.square()).sum(-1)
@@ -1,20 +1,19 @@
-from typing import Union
+from typing import Optional, Union
 
 import numpy as np
 import torch
-from pypolo.utils import torch_utils
-from torch.nn.parameter import Parameter
 
-from .base_kernel import BaseKernel
+from .stationary_kernel import StationaryKernel
 
 
-class GaussianKernel(BaseKernel):
+class GaussianKernel(StationaryKernel):
 
     def __init__(
         self,
         lengthscale: Union[float, list, np.ndarray, torch.Tensor],
         amplitude: float,
         device_name: str,
+        precision: Optional[str] = None,
     ) -> None:
         r"""Initialize a Gaussian kernel.
 
@@ -23,6 +22,8 @@ class GaussianKernel(BaseKernel):
                 Positive hyper-parameter lengthscale.
             amplitude (float): Positive hyper-parameter amplitude.
             device_name (str): PyTorch device name.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
 
         ??? note "Intuitive understanding of lengthscale"
 
@@ -33,42 +34,74 @@ class GaussianKernel(BaseKernel):
             similar function values.
 
         """
-        super().__init__(amplitude, device_name)
-        self._free_lengthscale = Parameter(
-            torch_utils.inv_softplus(
-                torch.as_tensor(
-                    lengthscale,
-                    dtype=self.dtype,
-                    device=self.device,
-                )))
-
-    @property
-    def lengthscale(self) -> torch.Tensor:
-        r"""The lengthscale hyper-parameter.
+        super().__init__(lengthscale, amplitude, device_name, precision)
+
+    @staticmethod
+    def _profile(scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Squared exponential $\exp(-d^2/2)$."""
+        return torch.exp(-0.5 * scaled_squared)
+
+    def sample_frequencies(
+        self,
+        num_features: int,
+        dim_inputs: int,
+        generator: Optional[torch.Generator] = None,
+    ) -> torch.Tensor:
+        r"""Samples frequencies of random Fourier features.
+
+        Args:
+            num_features (int): Number of random features.
+            dim_inputs (int): Dimension of the inputs.
+            generator (Optional[torch.Generator], optional): Random number
+                generator. Defaults to None, i.e., the global generator.
 
         Returns:
-            torch.Tensor: The lengthscale of the kernel.
+            torch.Tensor: Standard normal frequencies of shape
+                (num_features, dim_inputs), i.e., samples from the spectral
+                density of the kernel with unit lengthscale.
 
-        ??? note "Positivity"
+        ??? note "Why unit lengthscale?"
 
-            The positivity of lengthscale is ensured by a softplus function.
+            The frequencies are divided by the lengthscale in
+            `random_features`, so the same samples stay valid after the
+            lengthscale is optimized.
 
         """
-        return torch_utils.softplus(self._free_lengthscale)
+        return torch.randn(num_features,
+                           dim_inputs,
+                           generator=generator,
+                           dtype=self.dtype,
+                           device=self.device)
 
-    @lengthscale.setter
-    def lengthscale(self, lengthscale: torch.Tensor) -> None:
-        r"""The lengthscale hyper-parameter.
+    def random_features(
+        self,
+        x: torch.Tensor,
+        frequencies: torch.Tensor,
+        phases: torch.Tensor,
+    ) -> torch.Tensor:
+        r"""Computes random Fourier features.
 
         Args:
-            lengthscale (torch.Tensor): The new value of the lengthscale.
+            x (torch.Tensor): Inputs of shape (num_inputs, dim_inputs).
+            frequencies (torch.Tensor): Frequencies of shape
+                (num_features, dim_inputs) from `sample_frequencies`.
+            phases (torch.Tensor): Phases of shape (num_features,) drawn
+                uniformly from $[0, 2\pi)$.
+
+        Returns:
+            torch.Tensor: Features of shape (num_inputs, num_features).
+
+        ??? note "Random Fourier features"
+
+            By Bochner's theorem,
+            $k(\mathbf{x}, \mathbf{x}')\approx
+            \boldsymbol{\phi}(\mathbf{x})^{\intercal}
+            \boldsymbol{\phi}(\mathbf{x}')$ with
+            $\boldsymbol{\phi}(\mathbf{x}) = \sqrt{2\alpha/D}
+            \cos(\boldsymbol{\Omega}\mathbf{x}/\ell+\mathbf{b})$.
 
         """
-        with torch.inference_mode():
-            self._free_lengthscale.copy_(torch_utils.inv_softplus(lengthscale))
-
-    def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
-        scale = self.lengthscale
-        dist = torch.cdist(x1.div(scale), x2.div(scale), p=2)
-        cov_mat = self.amplitude * torch.exp(-0.5 * torch.square(dist))
-        return cov_mat
+        num_features = frequencies.shape[0]
+        projection = x.div(self.lengthscale) @ frequencies.t() + phases
+        scale = torch.sqrt(2.0 * self.amplitude / num_features)
+        return scale * torch.cos(projection)
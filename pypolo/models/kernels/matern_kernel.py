@@ -0,0 +1,59 @@
+import math
+from typing import Optional, Union
+
+import numpy as np
+import torch
+
+from .stationary_kernel import StationaryKernel
+
+
+class MaternKernel(StationaryKernel):
+
+    def __init__(
+        self,
+        lengthscale: Union[float, list, np.ndarray, torch.Tensor],
+        amplitude: float,
+        device_name: str,
+        nu: float = 1.5,
+        precision: Optional[str] = None,
+    ) -> None:
+        r"""Initialize a Matérn kernel.
+
+        Args:
+            lengthscale (Union[float, list, np.ndarray, torch.Tensor]):
+                Positive hyper-parameter lengthscale.
+            amplitude (float): Positive hyper-parameter amplitude.
+            device_name (str): PyTorch device name.
+            nu (float, optional): Smoothness, one of 0.5, 1.5, and 2.5.
+                Defaults to 1.5.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
+
+        Raises:
+            ValueError: If `nu` is not supported.
+
+        ??? note "Smoothness"
+
+            Sample functions of a Matérn kernel are $\lceil\nu\rceil-1$ times
+            differentiable, i.e., $\nu=0.5$ gives the rough exponential
+            kernel and $\nu\to\infty$ recovers the `GaussianKernel`. With
+            $r=\|(\mathbf{x}-\mathbf{x}')/\ell\|$, the supported cases are
+            $e^{-r}$, $(1+\sqrt{3}r)e^{-\sqrt{3}r}$, and
+            $(1+\sqrt{5}r+5r^2/3)e^{-\sqrt{5}r}$.
+
+        """
+        if nu not in (0.5, 1.5, 2.5):
+            raise ValueError("nu must be one of 0.5, 1.5, and 2.5.")
+        super().__init__(lengthscale, amplitude, device_name, precision)
+        self.nu = nu
+
+    def _profile(self, scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Matérn function of the scaled distance."""
+        dist = self._distance(scaled_squared)
+        if self.nu == 0.5:
+            return torch.exp(-dist)
+        if self.nu == 1.5:
+            dist = math.sqrt(3.0) * dist
+            return (1.0 + dist) * torch.exp(-dist)
+        dist = math.sqrt(5.0) * dist
+        return (1.0 + dist + dist.square() / 3.0) * torch.exp(-dist)
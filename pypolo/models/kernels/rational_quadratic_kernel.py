@@ -0,0 +1,79 @@
+from typing import Optional, Union
+
+import numpy as np
+import torch
+from pypolo.utils import torch_utils
+from torch.nn.parameter import Parameter
+
+from .stationary_kernel import StationaryKernel
+
+
+class RationalQuadraticKernel(StationaryKernel):
+
+    def __init__(
+        self,
+        lengthscale: Union[float, list, np.ndarray, torch.Tensor],
+        amplitude: float,
+        device_name: str,
+        alpha: float = 1.0,
+        precision: Optional[str] = None,
+    ) -> None:
+        r"""Initialize a rational quadratic kernel.
+
+        Args:
+            lengthscale (Union[float, list, np.ndarray, torch.Tensor]):
+                Positive hyper-parameter lengthscale.
+            amplitude (float): Positive hyper-parameter amplitude.
+            device_name (str): PyTorch device name.
+            alpha (float, optional): Positive hyper-parameter that weights
+                large-scale against small-scale variations. Defaults to 1.0.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
+
+        ??? note "Scale mixture"
+
+            $k(\mathbf{x},\mathbf{x}')=\alpha_k(1+d^2/(2\alpha))^{-\alpha}$
+            is an infinite mixture of Gaussian kernels with different
+            lengthscales, where $\alpha_k$ is the amplitude. It approaches
+            the `GaussianKernel` as $\alpha\to\infty$.
+
+        """
+        super().__init__(lengthscale, amplitude, device_name, precision)
+        self._free_alpha = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    alpha,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+
+    @property
+    def alpha(self) -> torch.Tensor:
+        r"""The scale-mixture hyper-parameter.
+
+        Returns:
+            torch.Tensor: The alpha of the kernel.
+
+        ??? note "Positivity"
+
+            The positivity of alpha is ensured by a softplus function.
+
+        """
+        return torch_utils.softplus(self._free_alpha)
+
+    @alpha.setter
+    def alpha(self, alpha: torch.Tensor) -> None:
+        r"""The scale-mixture hyper-parameter.
+
+        Args:
+            alpha (torch.Tensor): The new value of alpha.
+
+        """
+        with torch.inference_mode():
+            self._free_alpha.copy_(torch_utils.inv_softplus(alpha))
+        self._num_hyper_updates += 1
+
+    def _profile(self, scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Rational quadratic function $(1+d^2/(2\alpha))^{-\alpha}$."""
+        alpha = self.alpha
+        return torch.pow(1.0 + scaled_squared / (2.0 * alpha), -alpha)
@@ -0,0 +1,151 @@
+from abc import abstractmethod
+from typing import Hashable, Optional, Union
+
+import numpy as np
+import torch
+from pypolo.utils import torch_utils
+from torch.nn.parameter import Parameter
+
+from .base_kernel import BaseKernel
+from .distances import PairwiseDistances
+
+
+class StationaryKernel(BaseKernel):
+
+    @abstractmethod
+    def __init__(
+        self,
+        lengthscale: Union[float, list, np.ndarray, torch.Tensor],
+        amplitude: float,
+        device_name: str,
+        precision: Optional[str] = None,
+    ) -> None:
+        r"""Initialize a stationary kernel.
+
+        Args:
+            lengthscale (Union[float, list, np.ndarray, torch.Tensor]):
+                Positive hyper-parameter lengthscale, either shared by all
+                input dimensions or one per dimension.
+            amplitude (float): Positive hyper-parameter amplitude.
+            device_name (str): PyTorch device name.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
+
+        ??? note "Stationary kernels"
+
+            A stationary kernel is
+            $k(\mathbf{x},\mathbf{x}')=\alpha\,g(d^2)$ with the scaled
+            squared distance $d^2=\|(\mathbf{x}-\mathbf{x}')/\ell\|^2$ and
+            a profile $g$ with $g(0)=1$. Subclasses only implement
+            `_profile`, and the distances come from `PairwiseDistances`.
+
+        """
+        super().__init__(amplitude, device_name, precision)
+        self._free_lengthscale = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    lengthscale,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+        self._gram_key = None
+        self._gram_cache = None
+
+    @property
+    def lengthscale(self) -> torch.Tensor:
+        r"""The lengthscale hyper-parameter.
+
+        Returns:
+            torch.Tensor: The lengthscale of the kernel.
+
+        ??? note "Positivity"
+
+            The positivity of lengthscale is ensured by a softplus function.
+
+        """
+        return torch_utils.softplus(self._free_lengthscale)
+
+    @lengthscale.setter
+    def lengthscale(self, lengthscale: torch.Tensor) -> None:
+        r"""The lengthscale hyper-parameter.
+
+        Args:
+            lengthscale (torch.Tensor): The new value of the lengthscale.
+
+        """
+        with torch.inference_mode():
+            self._free_lengthscale.copy_(torch_utils.inv_softplus(lengthscale))
+        self._num_hyper_updates += 1
+
+    def forward(self, x1: torch.Tensor, x2: torch.Tensor) -> torch.Tensor:
+        return self.evaluate(PairwiseDistances(x1, x2))
+
+    def evaluate(self, distances: PairwiseDistances) -> torch.Tensor:
+        r"""Evaluates the kernel on precomputed distances.
+
+        Args:
+            distances (PairwiseDistances): Distances between the inputs,
+                which may be shared with other kernels.
+
+        Returns:
+            torch.Tensor: Covariance values of the same shape as
+                `distances.squared()`.
+
+        """
+        scaled = distances.scaled_squared(self.lengthscale)
+        return self.amplitude * self._profile(scaled)
+
+    def gram(self,
+             x: torch.Tensor,
+             key: Optional[Hashable] = None) -> torch.Tensor:
+        r"""Compute the covariance matrix of `x` with itself.
+
+        Args:
+            x (torch.Tensor): Inputs of shape (num_inputs, dim_inputs).
+            key (Optional[Hashable], optional): Identifies the version of
+                `x`, e.g., the number of data updates of a model. Defaults to
+                None, i.e., no caching.
+
+        Returns:
+            torch.Tensor: Covariance matrix of shape (num_inputs, num_inputs).
+
+        ??? note "Distance cache"
+
+            The distances between the inputs do not depend on the
+            hyper-parameters, so they are computed once per `key` and only
+            re-weighted by the lengthscale and passed through the profile
+            afterwards, e.g., in every iteration of `learn`. The cache holds
+            the dense squared distances, or the per-dimension squared
+            differences for per-dimension lengthscales, until
+            `clear_cache` is called.
+
+        """
+        if key is None:
+            return self.forward(x, x)
+        cache_key = (key, x.shape)
+        if self._gram_cache is None or self._gram_key != cache_key:
+            x = x.detach()
+            self._gram_cache = PairwiseDistances(x, x, cache_differences=True)
+            self._gram_key = cache_key
+        return self.evaluate(self._gram_cache)
+
+    def clear_cache(self) -> None:
+        r"""Drops the distances cached by `gram`."""
+        self._gram_key = None
+        self._gram_cache = None
+
+    @abstractmethod
+    def _profile(self, scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Maps scaled squared distances to correlations with $g(0)=1$.
+
+        Raises:
+            NotImplementedError: This is an abstract method and must be
+                implemented by a subclass.
+
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _distance(scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Scaled distance with a finite gradient at zero distance."""
+        return scaled_squared.clamp(min=1e-30).sqrt()
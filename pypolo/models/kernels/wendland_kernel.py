@@ -0,0 +1,97 @@
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import torch
+from pypolo.utils import torch_utils
+
+from .stationary_kernel import StationaryKernel
+
+
+class WendlandKernel(StationaryKernel):
+
+    def __init__(
+        self,
+        lengthscale: Union[float, list, np.ndarray, torch.Tensor],
+        amplitude: float,
+        device_name: str,
+        precision: Optional[str] = None,
+    ) -> None:
+        r"""Initialize a compactly supported Wendland kernel.
+
+        Args:
+            lengthscale (Union[float, list, np.ndarray, torch.Tensor]):
+                Positive support radius, either shared by all input
+                dimensions or one per dimension.
+            amplitude (float): Positive hyper-parameter amplitude.
+            device_name (str): PyTorch device name.
+            precision (Optional[str], optional): Precision policy, which must
+                match the one of the model. Defaults to None.
+
+        ??? note "Compact support"
+
+            With $r=\|(\mathbf{x}-\mathbf{x}')/\ell\|$, the kernel
+            $k(r)=\alpha(1-r)_{+}^{4}(4r+1)$ is positive definite in up to
+            three input dimensions and exactly zero for $r\geq1$. Only
+            pairs within the support radius interact, so the covariance
+            matrix of spread-out samples is sparse.
+
+        """
+        super().__init__(lengthscale, amplitude, device_name, precision)
+
+    def sparse_entries(
+        self,
+        x1: torch.Tensor,
+        x2: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        r"""Computes the nonzero entries of the covariance matrix.
+
+        Args:
+            x1 (torch.Tensor): First input tensor of shape
+                (num_inputs_1, dim_inputs).
+            x2 (torch.Tensor): Second input tensor of shape
+                (num_inputs_2, dim_inputs).
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor, torch.Tensor]: Row indices,
+                column indices, and values of the nonzero entries. The values
+                are differentiable with respect to the hyper-parameters.
+
+        """
+        scale = self.lengthscale
+        x1, x2 = x1.div(scale), x2.div(scale)
+        rows, cols = torch_utils.radius_neighbors(x1, x2, 1.0)
+        scaled = (x1[rows] - x2[cols]).square().sum(1)
+        return rows, cols, self.amplitude * self._profile(scaled)
+
+    def sparse_forward(self, x1: torch.Tensor,
+                       x2: torch.Tensor) -> torch.Tensor:
+        r"""Computes the covariance matrix as a sparse tensor.
+
+        Args:
+            x1 (torch.Tensor): First input tensor of shape
+                (num_inputs_1, dim_inputs).
+            x2 (torch.Tensor): Second input tensor of shape
+                (num_inputs_2, dim_inputs).
+
+        Returns:
+            torch.Tensor: Sparse COO covariance matrix of shape
+                (num_inputs_1, num_inputs_2).
+
+        ??? tip "Memory"
+
+            The neighbor search hashes the inputs into cells of the support
+            radius, so time and memory grow with the number of nonzero
+            entries rather than with `num_inputs_1 * num_inputs_2`.
+
+        """
+        rows, cols, values = self.sparse_entries(x1, x2)
+        return torch.sparse_coo_tensor(torch.stack([rows, cols]),
+                                       values,
+                                       size=(len(x1), len(x2)))
+
+    @staticmethod
+    def _profile(scaled_squared: torch.Tensor) -> torch.Tensor:
+        r"""Wendland function $(1-r)_{+}^{4}(4r+1)$."""
+        dist = StationaryKernel._distance(scaled_squared)
+        support = (1.0 - dist).clamp(min=0.0)
+        return support.pow(4) * (4.0 * dist + 1.0)
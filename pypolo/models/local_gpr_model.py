@@ -0,0 +1,240 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base_model import BaseModel
+from .gpr_model import GPRModel
+
+
+class LocalGPRModel(BaseModel):
+
+    def __init__(
+        self,
+        device_name: str,
+        workspace: List[float],
+        num_tiles: Tuple[int, int],
+        model_factory: Callable[[], GPRModel],
+        overlap: float = 0.1,
+    ) -> None:
+        r"""A mixture of local Gaussian process regression models.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            workspace (List[float]): Bounding box [xmin, ymin, xmax, ymax]
+                of the planner's workspace.
+            num_tiles (Tuple[int, int]): Number of tiles along the x and y
+                axes.
+            model_factory (Callable[[], GPRModel]): Function that creates an
+                untrained model with its own kernel for a tile.
+            overlap (float, optional): Half-width of the blending region
+                around the tile borders as a fraction of the tile size.
+                Must be in (0, 0.5]. Defaults to 0.1.
+
+        Raises:
+            ValueError: If `workspace`, `num_tiles`, or `overlap` is invalid.
+
+        ??? note "Bounded cost per step"
+
+            Each tile owns an independent model trained on the samples inside
+            the tile extended by the blending region. `learn` only adds data
+            to and optimizes the tiles that received new samples, so the cost
+            of a step depends on the data density rather than the mission
+            length. Predictions blend the neighboring tiles with weights that
+            ramp linearly across the blending region and sum to one.
+
+        """
+        super().__init__(device_name)
+        if len(workspace) != 4:
+            raise ValueError("Workspace = [xmin, ymin, xmax, ymax].")
+        if workspace[0] >= workspace[2] or workspace[1] >= workspace[3]:
+            raise ValueError("Workspace must have positive extent.")
+        if len(num_tiles) != 2 or min(num_tiles) <= 0:
+            raise ValueError("num_tiles must contain two positive integers.")
+        if not 0.0 < overlap <= 0.5:
+            raise ValueError("overlap must be in (0, 0.5].")
+        self.workspace = workspace
+        self.num_tiles = tuple(num_tiles)
+        self.model_factory = model_factory
+        self.overlap = overlap
+        self.tile_size = np.array([
+            (workspace[2] - workspace[0]) / num_tiles[0],
+            (workspace[3] - workspace[1]) / num_tiles[1],
+        ])
+        self.margin = overlap * self.tile_size
+        self.models: List[Optional[GPRModel]] = [None] * int(
+            np.prod(num_tiles))
+        # The prior of an untrained tile is fixed by `model_factory`.
+        prototype = model_factory()
+        self._prior_amplitude = prototype.kernel.amplitude.item()
+        self._prior_noise = prototype.noise.item()
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Adds the new data to and optimizes the tiles that contain them.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape (num_inputs, 2).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, 1).
+            num_iter (int): Number of optimization/training iterations of
+                each updated tile.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._validate_data(x_new, y_new)
+        weights = self._compute_weights(x_new)
+        for tile in np.flatnonzero(weights.any(axis=0)):
+            inside = weights[:, tile] > 0.0
+            if self.models[tile] is None:
+                self.models[tile] = self.model_factory()
+            self.models[tile].learn(x_new[inside], y_new[inside], num_iter,
+                                    verbose)
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions by blending the local models.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, 2).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
+
+        ??? note "Moments of the mixture"
+
+            With blending weights $w_t$, the mean is
+            $\sum_t w_t\mu_t$ and the variance is
+            $\sum_t w_t(\sigma_t^2+\mu_t^2)-(\sum_t w_t\mu_t)^2$.
+            Inputs not covered by any trained tile get the prior of an
+            untrained tile model.
+
+        """
+        self._validate_mode(mode)
+        weights = self._compute_weights(x_test)
+        trained = np.array([model is not None for model in self.models])
+        weights[:, ~trained] = 0.0
+        total = weights.sum(axis=1, keepdims=True)
+        covered = total[:, 0] > 0.0
+        weights[covered] /= total[covered]
+        num_inputs = x_test.shape[0]
+        first_moment = np.zeros((num_inputs, 1))
+        second_moment = np.zeros((num_inputs, 1))
+        tile_mode = "mean" if mode == "mean" else "both"
+        for tile in np.flatnonzero(weights.any(axis=0)):
+            inside = weights[:, tile] > 0.0
+            mean, std = self.models[tile].predict(x_test[inside],
+                                                  mode=tile_mode,
+                                                  noise_free=noise_free)
+            weight = weights[inside, tile:tile + 1]
+            first_moment[inside] += weight * mean
+            if std is not None:
+                second_moment[inside] += weight * (np.square(std) +
+                                                   np.square(mean))
+        mean, std = None, None
+        if mode in ("mean", "both"):
+            mean = first_moment
+        if mode in ("var", "both"):
+            second_moment[~covered] = self._prior_variance(noise_free)
+            var = second_moment - np.square(first_moment)
+            std = np.sqrt(np.maximum(var, 0.0))
+        return mean, std
+
+    def _prior_variance(self, noise_free: bool) -> float:
+        r"""Prior predictive variance of an untrained tile model."""
+        if noise_free:
+            return self._prior_amplitude
+        return self._prior_amplitude + self._prior_noise
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the checkpoints of the trained tiles.
+
+        ??? note "Tile models"
+
+            Untrained tiles are saved as None. The tiles are restored into
+            models created by `model_factory`, which must therefore build
+            the same model class as the one that was saved.
+
+        """
+        return {
+            "tiles": [
+                None if model is None else model._get_checkpoint()
+                for model in self.models
+            ],
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`.
+
+        Raises:
+            ValueError: If the checkpoint has another number of tiles.
+
+        """
+        tiles = checkpoint["tiles"]
+        if len(tiles) != len(self.models):
+            raise ValueError("The checkpoint has another number of tiles.")
+        for tile, tile_checkpoint in enumerate(tiles):
+            self.models[tile] = None
+            if tile_checkpoint is not None:
+                self.models[tile] = self.model_factory()
+                self.models[tile]._set_checkpoint(tile_checkpoint)
+
+    def _compute_weights(self, x: np.ndarray) -> np.ndarray:
+        r"""Computes the blending weight of every tile at every input.
+
+        Args:
+            x (np.ndarray): Inputs of shape (num_inputs, 2).
+
+        Returns:
+            np.ndarray: Weights of shape (num_inputs, num_tiles), which are
+                positive inside the extended tiles and sum to one.
+
+        """
+        axis_weights = []
+        for axis in range(2):
+            num = self.num_tiles[axis]
+            lower = (self.workspace[axis] +
+                     self.tile_size[axis] * np.arange(num))
+            upper = lower + self.tile_size[axis]
+            margin = self.margin[axis]
+            coord = x[:, axis:axis + 1]
+            rise = np.clip((coord - lower + margin) / (2 * margin), 0.0, 1.0)
+            fall = np.clip((upper + margin - coord) / (2 * margin), 0.0, 1.0)
+            # Tiles at the border of the workspace also cover the outside.
+            rise[:, 0] = 1.0
+            fall[:, -1] = 1.0
+            axis_weights.append(rise * fall)
+        weights = axis_weights[0][:, None, :] * axis_weights[1][:, :, None]
+        return weights.reshape(x.shape[0], -1)
+
+    def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Check if the inputs `x_new` and `y_new` are valid.
+
+        Args:
+            x_new (np.ndarray): An array of shape (num_inputs, 2) containing
+                the input features of the new data.
+            y_new (np.ndarray): An array of shape (num_outputs, 1)
+                containing the output targets of the new data.
+
+        Raises:
+            ValueError: If `x_new` is not of shape (num_inputs, 2) or if
+                `x_new` and `y_new` have different number of samples.
+
+        """
+        if x_new.ndim != 2 or x_new.shape[1] != 2:
+            raise ValueError("x_new must be of shape (num_inputs, 2).")
+        if x_new.shape[0] != y_new.shape[0]:
+            raise ValueError("x_train and y_train should have same length.")
@@ -0,0 +1,99 @@
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .batched_gpr_model import BatchedGPRModel
+from .kernels import BaseKernel
+
+
+class MultiOutputGPRModel(BatchedGPRModel):
+
+    def __init__(self,
+                 device_name: str,
+                 kernels: Sequence[BaseKernel],
+                 noise: Union[float, Sequence[float], np.ndarray],
+                 lr_hyper: float = 0.01,
+                 jitter: Optional[float] = None,
+                 precision: Optional[str] = None) -> None:
+        r"""Multi-output GPR with per-channel hyper-parameters.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernels (Sequence[BaseKernel]): One kernel per output channel.
+            noise (Union[float, Sequence[float], np.ndarray]): Initial noise
+                variance, either shared by all channels or one per channel.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (Optional[float], optional): The jitter to add to the
+                diagonal of the covariance matrices. Defaults to None, i.e.,
+                `torch_utils.default_jitter` of the factorization dtype.
+            precision (Optional[str], optional): Precision policy, one of
+                "float32", "float64", and "mixed". Must match the precision
+                of the kernels. Defaults to None, i.e., float64 on CPU and
+                float32 on CUDA.
+
+        ??? tip "When to use this model?"
+
+            If all channels can share one kernel and noise variance,
+            `GPRModel` with multi-column outputs factorizes the covariance
+            matrix only once. Otherwise, this model learns independent
+            hyper-parameters per channel and still runs one batched
+            factorization for all channels per iteration.
+
+        """
+        super().__init__(device_name, kernels, noise, lr_hyper, jitter,
+                         precision)
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Optimizes the model parameters.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_inputs, num_outputs).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        Raises:
+            ValueError: If `y_new` does not have one column per kernel.
+
+        """
+        if y_new.ndim != 2 or y_new.shape[1] != self.num_models:
+            raise ValueError("y_new must be of shape (num_inputs, " +
+                             "num_outputs).")
+        super().learn([x_new] * self.num_models,
+                      [y_new[:, [c]] for c in range(self.num_models)],
+                      num_iter, verbose)
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, num_outputs). The entry not requested by
+                `mode` is None.
+
+        """
+        mean, std = super().predict(x_test, mode=mode, noise_free=noise_free)
+        if mean is not None:
+            mean = np.hstack(mean)
+        if std is not None:
+            std = np.hstack(std)
+        return mean, std
@@ -1,4 +1,4 @@
-from typing import Tuple, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -6,7 +6,7 @@ from torch import nn
 from torch.nn import Parameter
 from tqdm import tqdm
 
-from ..utils import torch_utils
+from ..utils import TensorBuffer, torch_utils
 from .base_model import BaseModel
 from .kernels import BaseKernel
 
@@ -19,7 +19,9 @@ class NeuralGPRModel(BaseModel, nn.Module):
                  noise: float,
                  lr_hyper: float = 0.01,
                  lr_nn: float = 0.001,
-                 jitter: float = 1e-6) -> None:
+                 jitter: float = 1e-6,
+                 incremental: bool = False,
+                 optimizer: str = "adam") -> None:
         r"""Gaussian Process Regression.
 
         Args:
@@ -27,9 +29,17 @@ class NeuralGPRModel(BaseModel, nn.Module):
             kernel (BaseKernel): The kernel function.
             noise (float): The noise variance of the Gaussian likelihood.
             lr_hyper (float, optional): Learning rate of hyper-parameters.
+                Only used by the Adam optimizer.
             lr_nn (float, optional): Learning rate of network parameters.
+                Only used by the Adam optimizer.
             jitter (float, optional): The jitter to add to the diagonal of the
                 covariance matrix. Defaults to 1e-6.
+            incremental (bool, optional): If True, new data extends the cached
+                Cholesky factor instead of refactorizing the covariance matrix.
+                Defaults to False.
+            optimizer (str, optional): Optimizer, either "adam" or "lbfgs".
+                L-BFGS optimizes the hyper-parameters and the network
+                parameters jointly. Defaults to "adam".
 
         ??? note "What is jitter and why is it necessary?"
 
@@ -38,7 +48,16 @@ class NeuralGPRModel(BaseModel, nn.Module):
             This is necessary because the covariance matrix is not always
             positive definite due to numerical errors.
 
+        ??? note "Incremental conditioning"
+
+            Appending $k$ samples to $n$ existing ones extends the cached
+            factor by a block Cholesky update in $O(n^2k)$ rather than
+            refactorizing in $O((n+k)^3)$. The factor is recomputed from
+            scratch once `learn` changes the hyper-parameters.
+
         """
+        if optimizer not in ("adam", "lbfgs"):
+            raise ValueError("optimizer must be either 'adam' or 'lbfgs'.")
         BaseModel.__init__(self, device_name)
         nn.Module.__init__(self)
         self.kernel = kernel
@@ -49,14 +68,23 @@ class NeuralGPRModel(BaseModel, nn.Module):
                     dtype=self.dtype,
                     device=self.device,
                 )))
-        self._init_optimizers(lr_hyper, lr_nn)
+        self._init_optimizers(lr_hyper, lr_nn, optimizer)
         self.jitter = jitter
+        self.incremental = incremental
+        # Number of updates to the training data and hyper-parameters, and the
+        # posterior terms (L, iK_y) cached for that number.
+        self._num_updates = 0
+        self._cache = None
+        self._cache_key = None
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
 
     def learn(self,
               x_new: np.ndarray,
               y_new: np.ndarray,
               num_iter: int,
-              verbose: bool = True) -> None:
+              verbose: bool = True,
+              tol: Optional[float] = None) -> int:
         r"""Optimizes the model parameters.
 
         Args:
@@ -64,49 +92,103 @@ class NeuralGPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             y_new (np.ndarray): New training outputs of shape
                 (num_outputs, dim_outputs).
-            num_iter (int): Number of optimization/training iterations.
+            num_iter (int): Maximum number of optimization/training
+                iterations.
             verbose (bool): Print the optimization information or not?
-            writer (Union[SummaryWriter, None]): Tensorboard writer.
+            tol (Optional[float], optional): Stop early once the relative
+                change of the loss between two iterations is at most `tol`.
+                Defaults to None, i.e., always run `num_iter` iterations.
+
+        Returns:
+            int: Number of optimization iterations actually run.
 
         """
-        self._add_data(x_new, y_new)
-        self.train()
-        progress_bar = tqdm(range(num_iter), disable=not verbose)
-        for i in progress_bar:
+        self._add_data(x_new, y_new, extend=num_iter == 0)
+        return self._optimize(num_iter, verbose, tol)
+
+    def _optimize(self,
+                  num_iter: int,
+                  verbose: bool = True,
+                  tol: Optional[float] = None) -> int:
+        r"""Optimizes the model parameters on the current training data.
+
+        Args:
+            num_iter (int): Maximum number of optimization iterations.
+            verbose (bool): Print the optimization information or not?
+            tol (Optional[float], optional): Relative loss change for early
+                stopping. Defaults to None.
+
+        Returns:
+            int: Number of iterations actually run.
+
+        """
+
+        def closure():
             self.opt_hyper.zero_grad()
             if self.opt_nn is not None:
                 self.opt_nn.zero_grad()
             loss = self._compute_loss()
             loss.backward()
-            self.opt_hyper.step()
+            return loss
+
+        self.train()
+        num_run, previous_loss = 0, None
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            loss = self.opt_hyper.step(closure).item()
             if self.opt_nn is not None:
                 self.opt_nn.step()
-            progress_bar.set_description(
-                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+            num_run += 1
+            progress_bar.set_description(f"Iter: {i:02d} loss: {loss: .2f}")
+            if tol is not None and previous_loss is not None:
+                change = abs(previous_loss - loss)
+                if change <= tol * max(1.0, abs(loss)):
+                    break
+            previous_loss = loss
+        if num_run > 0:
+            self._num_updates += 1
         self.eval()
+        return num_run
 
-    def predict(self, x_test: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """Makes predictions.
 
         Args:
             x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
 
         Returns:
-            Tuple[np.ndarray, np.ndarray]: A tuple containing predictive mean
-                and predictive standard deviation of shape (num_inputs, 1).
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
 
         """
+        self._validate_mode(mode)
         x_test_tensor = torch.as_tensor(x_test,
                                         dtype=self.dtype,
                                         device=self.device)
-        mean_tensor, std_tensor = self.forward(x_test_tensor)
-        return mean_tensor.cpu().numpy(), std_tensor.cpu().numpy()
+        mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                               noise_free=noise_free,
+                                               mode=mode)
+        mean = None if mean_tensor is None else mean_tensor.cpu().numpy()
+        std = None if std_tensor is None else std_tensor.cpu().numpy()
+        return mean, std
 
     def forward(
         self,
         x_test: torch.Tensor,
         noise_free: bool = False,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
         r"""Make prediction.
 
         Args:
@@ -114,11 +196,14 @@ class NeuralGPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             noise_free (bool, optional): If True, predict the latent function
                 values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
 
         Returns:
-            mean (torch.Tensor): Predictive mean of shape (num_inputs, 1)
-            std (torch.Tensor): Predictive standard deviation of shape
-                (num_inputs, 1).
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, 1), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
 
         ??? note "Difference between `forward` and `predict`"
 
@@ -128,22 +213,44 @@ class NeuralGPRModel(BaseModel, nn.Module):
 
         """
         with torch.no_grad():
-            L, iK_y = self._compute_common()
+            mean, std = None, None
+            L, iK_y = self._cached_common()
             Ksn = self.kernel(x_test, self.x_train)
-            Kss_diag = self.kernel.diag(x_test)
-            iL_Kns = torch.linalg.solve_triangular(L, Ksn.t(), upper=False)
-            mean = Ksn @ iK_y
-            var = Kss_diag - iL_Kns.square().sum(0).view(-1, 1)
-            # Variance might be zero when lengthscale is too large.
-            if torch.any(var <= 0.0):
-                print(var.ravel().numpy())
-                raise ValueError("Predictive variance <= 0.0!")
-            var.clamp_(min=self.jitter)
-            if not noise_free:
-                var += self.noise
-            std = var.sqrt()
+            if mode in ("mean", "both"):
+                mean = Ksn @ iK_y
+            if mode in ("var", "both"):
+                Kss_diag = self.kernel.diag(x_test)
+                iL_Kns = torch.linalg.solve_triangular(L,
+                                                       Ksn.t(),
+                                                       upper=False)
+                var = Kss_diag - iL_Kns.square().sum(0).view(-1, 1)
+                # Variance might be zero when lengthscale is too large.
+                if torch.any(var <= 0.0):
+                    print(var.ravel().numpy())
+                    raise ValueError("Predictive variance <= 0.0!")
+                var.clamp_(min=self.jitter)
+                if not noise_free:
+                    var += self.noise
+                std = var.sqrt()
         return mean, std
 
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Training inputs of shape (num_train, dim_inputs).
+
+        ??? note "Storage"
+
+            Training data live in pre-allocated `TensorBuffer`s, so this is a
+            view of the filled rows rather than a standalone tensor.
+
+        """
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Training outputs of shape (num_train, 1)."""
+        return self._y_buffer.data
+
     @property
     def noise(self) -> torch.Tensor:
         r"""The noise variance hyper-parameter.
@@ -168,8 +275,12 @@ class NeuralGPRModel(BaseModel, nn.Module):
         """
         with torch.inference_mode():
             self._free_noise.copy_(torch_utils.inv_softplus(noise))
+        self._num_updates += 1
 
-    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+    def _add_data(self,
+                  x_new: np.ndarray,
+                  y_new: np.ndarray,
+                  extend: bool = True) -> None:
         r"""Add new data to the training set.
 
         Args:
@@ -177,29 +288,22 @@ class NeuralGPRModel(BaseModel, nn.Module):
                 (num_inputs, dim_inputs).
             y_new (np.ndarray): New training outputs of shape
                 (num_outputs, dim_outputs).
+            extend (bool, optional): Whether to extend the cached factor to
+                the new data. `learn` skips the extension when it optimizes
+                the hyper-parameters afterwards, which discards the factor.
+                Defaults to True.
 
         """
         self._validate_data(x_new, y_new)
-        if not (hasattr(self, 'x_train') and hasattr(self, 'y_train')):
-            self.x_train = torch.as_tensor(x_new,
-                                           dtype=self.dtype,
-                                           device=self.device)
-            self.y_train = torch.as_tensor(y_new,
-                                           dtype=self.dtype,
-                                           device=self.device)
-        else:
-            self.x_train = torch.cat((self.x_train,
-                                      torch.as_tensor(
-                                          x_new,
-                                          dtype=self.dtype,
-                                          device=self.device,
-                                      )))
-            self.y_train = torch.cat((self.y_train,
-                                      torch.as_tensor(
-                                          y_new,
-                                          dtype=self.dtype,
-                                          device=self.device,
-                                      )))
+        can_extend = (self.incremental and extend and self._cache is not None
+                      and self._cache_key == self._cache_version())
+        self._num_updates += 1
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+        if can_extend:
+            with torch.no_grad():
+                self._cache = self._extend_common()
+            self._cache_key = self._cache_version()
 
     def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
         r"""Check if the inputs `x_new` and `y_new` are valid.
@@ -228,10 +332,10 @@ class NeuralGPRModel(BaseModel, nn.Module):
             raise ValueError("Only support univariate output for now.")
         if x_new.shape[0] != y_new.shape[0]:
             raise ValueError("x_train and y_train should have same length.")
-        if (hasattr(self, 'x_train')
+        if (len(self._x_buffer) > 0
                 and x_new.shape[1] != self.x_train.shape[1]):
             raise ValueError("x_train and x_new should have same shape.")
-        if (hasattr(self, 'y_train')
+        if (len(self._y_buffer) > 0
                 and y_new.shape[1] != self.y_train.shape[1]):
             raise ValueError("y_train and y_new should have same shape.")
 
@@ -284,7 +388,95 @@ class NeuralGPRModel(BaseModel, nn.Module):
         iK_y = torch.cholesky_solve(self.y_train, L, upper=False)
         return L, iK_y
 
-    def _init_optimizers(self, lr_hyper: float, lr_nn: float) -> None:
+    def _cached_common(self):
+        r"""Cached version of `_compute_common` for prediction.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the training covariance
+                matrix. Shape: (num_train, num_train).
+            iK_y (torch.Tensor): Inverse training covariance matrix multiplied
+                by training outputs. Shape: (num_train, 1).
+
+        ??? note "When is the cache refreshed?"
+
+            The cache is keyed on the version of the training data and the
+            hyper-parameters, which is increased by `_add_data`, `learn`, and
+            the hyper-parameter setters of the model and its kernel.
+            Repeated predictions in between reuse the same factorization.
+
+        """
+        key = self._cache_version()
+        if self._cache is None or self._cache_key != key:
+            with torch.no_grad():
+                self._cache = self._compute_common()
+            self._cache_key = key
+        return self._cache
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, and posterior cache."""
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train if has_data else None,
+            "y_train": self.y_train if has_data else None,
+            "cache": self._cached_common() if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self._init_optimizers(self.lr_hyper, self.lr_nn, self.optimizer)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        if checkpoint["x_train"] is not None:
+            self._x_buffer.append(checkpoint["x_train"])
+            self._y_buffer.append(checkpoint["y_train"])
+        self._num_updates += 1
+        self._cache = checkpoint["cache"]
+        self._cache_key = None
+        if self._cache is not None:
+            self._cache_key = self._cache_version()
+
+    def _cache_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, self.kernel.hyper_version
+
+    def _extend_common(self):
+        r"""Extends the cached common terms to the newly added data.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the training covariance
+                matrix. Shape: (num_train, num_train).
+            iK_y (torch.Tensor): Inverse training covariance matrix multiplied
+                by training outputs. Shape: (num_train, 1).
+
+        ??? note "Block Cholesky extension"
+
+            $$
+            \boldsymbol{L}_{+} =
+            \begin{bmatrix}
+            \boldsymbol{L} & \mathbf{0} \\
+            (\boldsymbol{L}^{-1}\boldsymbol{K}_{on})^{\intercal} &
+            \mathtt{chol}(\boldsymbol{K}_{nn} + \sigma^2\mathbf{I}
+            - \boldsymbol{K}_{no}\boldsymbol{K}_{y}^{-1}\boldsymbol{K}_{on})
+            \end{bmatrix}
+            $$
+
+        """
+        L, _ = self._cache
+        num_old = L.shape[0]
+        x_old, x_new = self.x_train[:num_old], self.x_train[num_old:]
+        K_cross = self.kernel(x_old, x_new)
+        K_new = self.kernel(x_new, x_new)
+        K_new.diagonal().add_(self.noise)
+        L = torch_utils.cholesky_extend(L, K_cross, K_new, jitter=self.jitter)
+        iK_y = torch.cholesky_solve(self.y_train, L, upper=False)
+        return L, iK_y
+
+    def _init_optimizers(self,
+                         lr_hyper: float,
+                         lr_nn: float,
+                         optimizer: str = "adam") -> None:
         """Initialize optimizers for hyper-parameters and, optinally,
         neural network parameters in non-stationary kernels.
 
@@ -293,6 +485,8 @@ class NeuralGPRModel(BaseModel, nn.Module):
                 Defaults to 0.01.
             lr_nn (float, optional): Learning rate of neural network parameters
                 in non-stationary kernels. Defaults to 0.001.
+            optimizer (str, optional): Either "adam" or "lbfgs".
+                Defaults to "adam".
 
         !!! note "Neural Network Parameters"
 
@@ -301,6 +495,14 @@ class NeuralGPRModel(BaseModel, nn.Module):
 
         """
         self.lr_hyper, self.lr_nn = lr_hyper, lr_nn
+        self.optimizer = optimizer
+        if optimizer == "lbfgs":
+            self.opt_hyper = torch.optim.LBFGS(self.parameters(),
+                                               lr=1.0,
+                                               max_iter=1,
+                                               line_search_fn="strong_wolfe")
+            self.opt_nn = None
+            return
         hyper_params, nn_params = [], []
         for name, param in self.named_parameters():
             if "nn" in name:
@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .base_model import BaseModel
+
+
+class RetrainingScheduler:
+
+    def __init__(self,
+                 every: Optional[int] = None,
+                 nll_drift: Optional[float] = None,
+                 growth_ratio: Optional[float] = None) -> None:
+        r"""Decides when `BaseModel.update` optimizes the hyper-parameters.
+
+        Args:
+            every (Optional[int], optional): Retrain once this many samples
+                arrived since the last retraining. Defaults to None.
+            nll_drift (Optional[float], optional): Retrain once the mean
+                predictive negative log-likelihood per sample of the data
+                since the last retraining exceeds that of the first batch
+                after it by this many nats. Defaults to None.
+            growth_ratio (Optional[float], optional): Retrain once the number
+                of samples is this many times the number at the last
+                retraining. Defaults to None.
+
+        Raises:
+            ValueError: If no trigger is given, `every` or `nll_drift` is not
+                positive, or `growth_ratio` is not greater than one.
+
+        ??? tip "Cheap steps"
+
+            Steps without retraining only append the data via
+            `learn(x_new, y_new, num_iter=0)`, which, e.g., extends the
+            cached factor of an incremental `GPRModel` instead of running
+            `num_iter` iterations that each refactorize the covariance
+            matrix. The first step always retrains, and any trigger that
+            fires retrains. Every skipped step is credited with the
+            iterations the most recent retraining actually ran, which is
+            fewer than `num_iter` when, e.g., `tol` stops it early.
+
+        ??? note "Predictive drift"
+
+            The `nll_drift` trigger scores every batch by its predictive
+            negative log-likelihood before it is added,
+            $\frac{1}{2}[(y-\mu)^2/\sigma^2+\log{2\pi\sigma^2}]$, so it
+            measures how well the current hyper-parameters explain unseen
+            data. It requires a model whose `predict` takes the inputs of
+            `learn`.
+
+        """
+        if every is None and nll_drift is None and growth_ratio is None:
+            raise ValueError("At least one trigger must be given.")
+        if every is not None and every <= 0:
+            raise ValueError("every must be positive.")
+        if nll_drift is not None and nll_drift <= 0.0:
+            raise ValueError("nll_drift must be positive.")
+        if growth_ratio is not None and growth_ratio <= 1.0:
+            raise ValueError("growth_ratio must be greater than one.")
+        self.every = every
+        self.nll_drift = nll_drift
+        self.growth_ratio = growth_ratio
+        self.num_steps = 0
+        self.num_retrains = 0
+        self.num_iterations = 0
+        self.num_saved_iterations = 0
+        self.num_samples = 0
+        self._num_iterations_at_retrain = 0
+        self._num_samples_at_retrain = 0
+        self._baseline_nll = None
+        self._nll_sum = 0.0
+        self._nll_count = 0
+
+    def step(self,
+             model: "BaseModel",
+             x_new: np.ndarray,
+             y_new: np.ndarray,
+             num_iter: int,
+             verbose: bool = True,
+             **kwargs: Any) -> bool:
+        r"""Adds new data to `model` and retrains it if a trigger fires.
+
+        Args:
+            model (BaseModel): The model to update.
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+            num_iter (int): Number of optimization/training iterations of a
+                retraining.
+            verbose (bool): Print the optimization information or not?
+            **kwargs (Any): Further arguments of `learn` for retraining,
+                e.g., `tol`.
+
+        Returns:
+            bool: Whether the hyper-parameters were optimized.
+
+        """
+        retrain = self.should_retrain(model, x_new, y_new)
+        self.num_steps += 1
+        self.num_samples += len(x_new)
+        if retrain:
+            num_run = model.learn(x_new, y_new, num_iter, verbose, **kwargs)
+            if num_run is None:
+                # The model does not report early stopping.
+                num_run = num_iter
+            self.num_retrains += 1
+            self.num_iterations += num_run
+            self._num_iterations_at_retrain = num_run
+            self._num_samples_at_retrain = self.num_samples
+            self._baseline_nll = None
+            self._nll_sum, self._nll_count = 0.0, 0
+        else:
+            model.learn(x_new, y_new, 0, verbose=False)
+            self.num_saved_iterations += self._num_iterations_at_retrain
+        return retrain
+
+    def should_retrain(self, model: "BaseModel", x_new: np.ndarray,
+                       y_new: np.ndarray) -> bool:
+        r"""Checks the triggers for the next batch of data.
+
+        Args:
+            model (BaseModel): The model before `x_new` and `y_new` are added.
+            x_new (np.ndarray): New training inputs.
+            y_new (np.ndarray): New training outputs.
+
+        Returns:
+            bool: Whether any trigger fires.
+
+        """
+        if self.num_retrains == 0:
+            return True
+        num_samples = self.num_samples + len(x_new)
+        fired = False
+        if self.every is not None:
+            since = num_samples - self._num_samples_at_retrain
+            fired |= since >= self.every
+        if self.growth_ratio is not None:
+            fired |= (num_samples >=
+                      self.growth_ratio * self._num_samples_at_retrain)
+        if self.nll_drift is not None and len(x_new) > 0:
+            nll = self._predictive_nll(model, x_new, y_new)
+            if self._baseline_nll is None:
+                self._baseline_nll = nll.mean()
+            self._nll_sum += nll.sum()
+            self._nll_count += nll.size
+            drift = self._nll_sum / self._nll_count - self._baseline_nll
+            fired |= drift > self.nll_drift
+        return fired
+
+    @property
+    def num_saved_factorizations(self) -> int:
+        r"""Covariance factorizations skipped by not retraining.
+
+        ??? note "Counting"
+
+            Every optimization iteration of the exact models evaluates the
+            loss once, which factorizes the covariance matrix once, so this
+            equals `num_saved_iterations`. Both are estimates, since a
+            skipped retraining is assumed to run as many iterations as the
+            most recent one did. The count is a lower bound for L-BFGS,
+            whose line search may evaluate the loss several times.
+
+        """
+        return self.num_saved_iterations
+
+    def report(self) -> Dict[str, int]:
+        r"""Summarizes the work done and saved so far.
+
+        Returns:
+            Dict[str, int]: Numbers of steps, retrainings, optimization
+                iterations actually run, and the estimated optimization
+                iterations and factorizations saved.
+
+        """
+        return {
+            "num_steps": self.num_steps,
+            "num_retrains": self.num_retrains,
+            "num_iterations": self.num_iterations,
+            "num_saved_iterations": self.num_saved_iterations,
+            "num_saved_factorizations": self.num_saved_factorizations,
+        }
+
+    @staticmethod
+    def _predictive_nll(model: "BaseModel", x_new: np.ndarray,
+                        y_new: np.ndarray) -> np.ndarray:
+        r"""Predictive negative log-likelihood of every new output."""
+        mean, std = model.predict(x_new)
+        var = np.square(std)
+        return 0.5 * (np.square(y_new - mean) / var + np.log(2 * np.pi * var))
@@ -0,0 +1,453 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+from torch.nn import Parameter
+from tqdm import tqdm
+
+from ..utils import TensorBuffer, torch_utils
+from .base_model import BaseModel
+from .kernels import GaussianKernel
+
+
+class RFFModel(BaseModel, nn.Module):
+
+    def __init__(self,
+                 device_name,
+                 kernel: GaussianKernel,
+                 noise: float,
+                 num_features: int = 512,
+                 lr_hyper: float = 0.01,
+                 jitter: float = 1e-6) -> None:
+        r"""Random Fourier feature approximation of Gaussian process
+        regression.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernel (GaussianKernel): The kernel function to approximate.
+            noise (float): The noise variance of the Gaussian likelihood.
+            num_features (int, optional): Number of random features $D$.
+                Defaults to 512.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (float, optional): The jitter passed to the Cholesky
+                decomposition. Defaults to 1e-6.
+
+        ??? note "Bayesian linear regression on random features"
+
+            With $f(\mathbf{x})=\boldsymbol{\phi}(\mathbf{x})^{\intercal}
+            \mathbf{w}$ and $\mathbf{w}\sim\mathcal{N}(\mathbf{0},\mathbf{I})$,
+            the posterior of $\mathbf{w}$ has precision
+            $\boldsymbol{A}=\mathbf{I}+\sigma^{-2}\boldsymbol{\Phi}^{\intercal}
+            \boldsymbol{\Phi}$. Each new sample is a rank-one update of the
+            Cholesky factor of $\boldsymbol{A}$ in $O(D^2)$, and predictions
+            cost $O(D^2)$ per test input regardless of the number of samples.
+            The statistics are rebuilt from the stored data in $O(nD^2)$ only
+            after the hyper-parameters change.
+
+        """
+        BaseModel.__init__(self, device_name)
+        nn.Module.__init__(self)
+        self.kernel = kernel
+        self._free_noise = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    noise,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+        self._init_optimizers(lr_hyper)
+        self.num_features = num_features
+        self.jitter = jitter
+        self.register_buffer("frequencies", None)
+        self.register_buffer("phases", None)
+        # The statistics (L, b) of the weight posterior are valid for a given
+        # number of hyper-parameter updates, the prediction cache (L, iA_b)
+        # for a given number of data and hyper-parameter updates.
+        self._num_updates = 0
+        self._num_hyper_updates = 0
+        self._stats = None
+        self._stats_key = None
+        self._cache = None
+        self._cache_key = None
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Optimizes the model parameters.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._add_data(x_new, y_new)
+        self.train()
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            self.opt_hyper.zero_grad()
+            loss = self._compute_loss()
+            loss.backward()
+            self.opt_hyper.step()
+            progress_bar.set_description(
+                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+        if num_iter > 0:
+            self._num_updates += 1
+            self._num_hyper_updates += 1
+        self.eval()
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
+
+        """
+        self._validate_mode(mode)
+        x_test_tensor = torch.as_tensor(x_test,
+                                        dtype=self.dtype,
+                                        device=self.device)
+        mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                               noise_free=noise_free,
+                                               mode=mode)
+        mean = None if mean_tensor is None else mean_tensor.cpu().numpy()
+        std = None if std_tensor is None else std_tensor.cpu().numpy()
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_inputs, dim_inputs).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, 1), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
+
+        """
+        with torch.no_grad():
+            mean, std = None, None
+            L, iA_b = self._cached_common()
+            features = self._features(x_test)
+            if mode in ("mean", "both"):
+                mean = features @ iA_b
+            if mode in ("var", "both"):
+                iL_features = torch.linalg.solve_triangular(L,
+                                                            features.t(),
+                                                            upper=False)
+                var = iL_features.square().sum(0).view(-1, 1)
+                var.clamp_(min=self.jitter)
+                if not noise_free:
+                    var += self.noise
+                std = var.sqrt()
+        return mean, std
+
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Training inputs of shape (num_train, dim_inputs)."""
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Training outputs of shape (num_train, 1)."""
+        return self._y_buffer.data
+
+    @property
+    def noise(self) -> torch.Tensor:
+        r"""The noise variance hyper-parameter.
+
+        Returns:
+            torch.Tensor: The noise variance of the Gaussian likelihood.
+
+        """
+        return torch_utils.softplus(self._free_noise)
+
+    @noise.setter
+    def noise(self, noise: torch.Tensor) -> None:
+        r"""The noise variance hyper-parameter.
+
+        Args:
+            noise (torch.Tensor): The new value of the noise variance.
+
+        """
+        with torch.inference_mode():
+            self._free_noise.copy_(torch_utils.inv_softplus(noise))
+        self._num_updates += 1
+        self._num_hyper_updates += 1
+
+    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Add new data to the training set and update the statistics.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+
+        """
+        self._validate_data(x_new, y_new)
+        if self.frequencies is None:
+            self.frequencies = self.kernel.sample_frequencies(
+                self.num_features, x_new.shape[1])
+            self.phases = 2 * np.pi * torch.rand(
+                self.num_features, dtype=self.dtype, device=self.device)
+        can_update = (self._stats is not None
+                      and self._stats_key == self._hyper_version())
+        self._num_updates += 1
+        num_old = len(self._x_buffer)
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+        if can_update:
+            with torch.no_grad():
+                self._stats = self._update_statistics(
+                    *self._stats, self.x_train[num_old:],
+                    self.y_train[num_old:])
+
+    def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Check if the inputs `x_new` and `y_new` are valid.
+
+        Args:
+            x_new (np.ndarray): An array of shape (num_inputs, dim_inputs)
+                containing the input features of the new data.
+            y_new (np.ndarray): An array of shape (num_outputs, 1)
+                containing the output targets of the new data.
+
+        Raises:
+            ValueError: If any of the following conditions are met:
+                1. `x_new` is not 2D.
+                2. `y_new` is not 2D.
+                3. `y_new` has more than 1 column.
+                4. `x_new` and `y_new` have different number of samples.
+                5. `x_new` and `self.x_train` have different number of features.
+
+        """
+        if x_new.ndim != 2:
+            raise ValueError("x_train must be 2D.")
+        if y_new.ndim != 2:
+            raise ValueError("y_train must be 2D.")
+        if y_new.shape[1] != 1:
+            raise ValueError("Only support univariate output for now.")
+        if x_new.shape[0] != y_new.shape[0]:
+            raise ValueError("x_train and y_train should have same length.")
+        if (len(self._x_buffer) > 0
+                and x_new.shape[1] != self.x_train.shape[1]):
+            raise ValueError("x_train and x_new should have same shape.")
+
+    def _features(self, x: torch.Tensor) -> torch.Tensor:
+        r"""Random Fourier features of shape (num_inputs, num_features)."""
+        return self.kernel.random_features(x, self.frequencies, self.phases)
+
+    def _compute_loss(self) -> torch.Tensor:
+        r"""Compute training loss.
+
+        Returns:
+            torch.Tensor: The training loss.
+
+        ??? note "Loss Function: Negative Log Marginal Likelihood"
+
+            By the matrix inversion and determinant lemmas, the negative log
+            marginal likelihood of
+            $\mathbf{y}\sim\mathcal{N}(\mathbf{0},
+            \boldsymbol{\Phi}\boldsymbol{\Phi}^{\intercal}+\sigma^2\mathbf{I})$
+            costs $O(nD^2)$:
+
+            $$
+            \frac{1}{2}\left(\frac{\mathbf{y}^{\intercal}\mathbf{y}}{\sigma^2}
+            -\mathbf{b}^{\intercal}\boldsymbol{A}^{-1}\mathbf{b}
+            +\log|\boldsymbol{A}|+n\log\sigma^2+n\log{2\pi}\right),
+            \quad\mathbf{b}=\sigma^{-2}\boldsymbol{\Phi}^{\intercal}\mathbf{y}.
+            $$
+
+        """
+        L, b = self._compute_statistics(self.x_train, self.y_train)
+        num_train = len(self.y_train)
+        noise = self.noise
+        iL_b = torch.linalg.solve_triangular(L, b, upper=False)
+        quadratic = self.y_train.square().sum() / noise - iL_b.square().sum()
+        logdet = 2.0 * L.diag().log().sum() + num_train * noise.log()
+        constant = num_train * np.log(2 * np.pi)
+        return 0.5 * (quadratic + logdet + constant)
+
+    def _compute_statistics(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Compute the statistics of the weight posterior from scratch.
+
+        Args:
+            x (torch.Tensor): Training inputs of shape (num_train, dim_inputs).
+            y (torch.Tensor): Training outputs of shape (num_train, 1).
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the posterior precision
+                $\boldsymbol{A}$. Shape: (num_features, num_features).
+            b (torch.Tensor): $\sigma^{-2}\boldsymbol{\Phi}^{\intercal}
+                \mathbf{y}$. Shape: (num_features, 1).
+
+        """
+        scaled_features = self._features(x) / self.noise.sqrt()
+        A = scaled_features.t() @ scaled_features
+        A.diagonal().add_(1.0)
+        L = torch_utils.robust_cholesky(A, jitter=self.jitter)
+        b = scaled_features.t() @ y / self.noise.sqrt()
+        return L, b
+
+    def _update_statistics(
+        self,
+        L: torch.Tensor,
+        b: torch.Tensor,
+        x_new: torch.Tensor,
+        y_new: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Update the statistics of the weight posterior with new data.
+
+        Args:
+            L (torch.Tensor): Current Cholesky factor of the precision.
+            b (torch.Tensor): Current $\sigma^{-2}\boldsymbol{\Phi}^{\intercal}
+                \mathbf{y}$.
+            x_new (torch.Tensor): New inputs of shape (num_new, dim_inputs).
+            y_new (torch.Tensor): New outputs of shape (num_new, 1).
+
+        Returns:
+            L (torch.Tensor): Updated Cholesky factor of the precision.
+            b (torch.Tensor): Updated $\sigma^{-2}\boldsymbol{\Phi}^{\intercal}
+                \mathbf{y}$.
+
+        ??? note "Rank-one updates or refactorization?"
+
+            Each new sample costs $O(D^2)$ as a rank-one update, so a batch
+            with at least $D$ samples is cheaper to fold in by refactorizing
+            the updated precision in $O(D^3)$.
+
+        """
+        scaled_features = self._features(x_new) / self.noise.sqrt()
+        if len(x_new) < self.num_features:
+            L = torch_utils.cholesky_update(L, scaled_features.t())
+        else:
+            A = L @ L.t() + scaled_features.t() @ scaled_features
+            L = torch_utils.robust_cholesky(A, jitter=self.jitter)
+        b = b + scaled_features.t() @ y_new / self.noise.sqrt()
+        return L, b
+
+    def _cached_common(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Cached terms for prediction.
+
+        Returns:
+            L (torch.Tensor): Lower Cholesky factor of the posterior precision.
+                Shape: (num_features, num_features).
+            iA_b (torch.Tensor): Posterior mean of the weights.
+                Shape: (num_features, 1).
+
+        """
+        if self._stats is None or self._stats_key != self._hyper_version():
+            with torch.no_grad():
+                self._stats = self._compute_statistics(self.x_train,
+                                                       self.y_train)
+            self._stats_key = self._hyper_version()
+        key = self._cache_version()
+        if self._cache is None or self._cache_key != key:
+            L, b = self._stats
+            self._cache = (L, torch.cholesky_solve(b, L, upper=False))
+            self._cache_key = key
+        return self._cache
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, features, and weights.
+
+        ??? note "Random features"
+
+            The sampled frequencies and phases are buffers of the state
+            dict, so the restored model uses the same features as the saved
+            one. The Cholesky factor of the weight precision is saved with
+            the weight posterior, so later data can still be folded in by
+            rank-one updates.
+
+        """
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train if has_data else None,
+            "y_train": self.y_train if has_data else None,
+            "cache": self._cached_common() if has_data else None,
+            "stats": self._stats if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        state_dict = checkpoint["state_dict"]
+        if "frequencies" in state_dict:
+            # Buffers that are still None are not loaded by `load_state_dict`.
+            self.frequencies = torch.empty_like(state_dict["frequencies"])
+            self.phases = torch.empty_like(state_dict["phases"])
+        self.load_state_dict(state_dict)
+        self._init_optimizers(self.lr_hyper)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        if checkpoint["x_train"] is not None:
+            self._x_buffer.append(checkpoint["x_train"])
+            self._y_buffer.append(checkpoint["y_train"])
+        self._num_updates += 1
+        self._num_hyper_updates += 1
+        self._stats, self._stats_key = checkpoint["stats"], None
+        self._cache, self._cache_key = checkpoint["cache"], None
+        if self._stats is not None:
+            self._stats_key = self._hyper_version()
+            self._cache_key = self._cache_version()
+
+    def _hyper_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current hyper-parameters."""
+        return self._num_hyper_updates, self.kernel.hyper_version
+
+    def _cache_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, self.kernel.hyper_version
+
+    def _init_optimizers(self, lr_hyper: float) -> None:
+        """Initialize optimizers for hyper-parameters.
+
+        Args:
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+                Defaults to 0.01.
+
+        """
+        self.lr_hyper = lr_hyper
+        hyper_params = []
+        for name, param in self.named_parameters():
+            hyper_params.append(param)
+        self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
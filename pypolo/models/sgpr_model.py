@@ -0,0 +1,383 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+from torch.nn import Parameter
+from tqdm import tqdm
+
+from ..utils import TensorBuffer, torch_utils
+from .base_model import BaseModel
+from .kernels import BaseKernel
+
+
+class SGPRModel(BaseModel, nn.Module):
+
+    def __init__(self,
+                 device_name,
+                 kernel: BaseKernel,
+                 noise: float,
+                 x_inducing: np.ndarray,
+                 learn_inducing: bool = True,
+                 lr_hyper: float = 0.01,
+                 jitter: float = 1e-6) -> None:
+        r"""Sparse Gaussian Process Regression with inducing points.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernel (BaseKernel): The kernel function.
+            noise (float): The noise variance of the Gaussian likelihood.
+            x_inducing (np.ndarray): Initial inducing inputs of shape
+                (num_inducing, dim_inputs).
+            learn_inducing (bool, optional): Optimize the inducing inputs
+                together with the hyper-parameters or not? Defaults to True.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (float, optional): The jitter to add to the diagonal of the
+                inducing covariance matrix. Defaults to 1e-6.
+
+        ??? note "Computational complexity"
+
+            With $m$ inducing points and $n$ training samples, the collapsed
+            variational bound of Titsias (2009) and the predictions cost
+            $O(nm^2)$ time and $O(nm)$ memory instead of the $O(n^3)$ time
+            and $O(n^2)$ memory of `GPRModel`.
+
+        """
+        BaseModel.__init__(self, device_name)
+        nn.Module.__init__(self)
+        self.kernel = kernel
+        self._free_noise = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    noise,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+        self.x_inducing = Parameter(
+            torch.as_tensor(
+                x_inducing,
+                dtype=self.dtype,
+                device=self.device,
+            ),
+            requires_grad=learn_inducing,
+        )
+        self._init_optimizers(lr_hyper)
+        self.jitter = jitter
+        self._num_updates = 0
+        self._cache = None
+        self._cache_key = None
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Optimizes the model parameters.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._add_data(x_new, y_new)
+        self.train()
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            self.opt_hyper.zero_grad()
+            loss = self._compute_loss()
+            loss.backward()
+            self.opt_hyper.step()
+            progress_bar.set_description(
+                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+        if num_iter > 0:
+            self._num_updates += 1
+        self.eval()
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean and predictive standard deviation
+                of shape (num_inputs, 1). The entry not requested by `mode` is
+                None.
+
+        """
+        self._validate_mode(mode)
+        x_test_tensor = torch.as_tensor(x_test,
+                                        dtype=self.dtype,
+                                        device=self.device)
+        mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                               noise_free=noise_free,
+                                               mode=mode)
+        mean = None if mean_tensor is None else mean_tensor.cpu().numpy()
+        std = None if std_tensor is None else std_tensor.cpu().numpy()
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_inputs, dim_inputs).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, 1), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
+
+        """
+        with torch.no_grad():
+            mean, std = None, None
+            L_uu, L_B, c = self._cached_common()
+            Kus = self.kernel(self.x_inducing, x_test)
+            iLuu_Kus = torch.linalg.solve_triangular(L_uu, Kus, upper=False)
+            if mode in ("mean", "both"):
+                # Solve only the small (num_inducing, 1) system for the mean.
+                iLB_c = torch.linalg.solve_triangular(L_B.t(), c, upper=True)
+                mean = iLuu_Kus.t() @ iLB_c
+            if mode in ("var", "both"):
+                Kss_diag = self.kernel.diag(x_test)
+                iLB_iLuu_Kus = torch.linalg.solve_triangular(L_B,
+                                                             iLuu_Kus,
+                                                             upper=False)
+                var = (Kss_diag - iLuu_Kus.square().sum(0).view(-1, 1) +
+                       iLB_iLuu_Kus.square().sum(0).view(-1, 1))
+                var.clamp_(min=self.jitter)
+                if not noise_free:
+                    var += self.noise
+                std = var.sqrt()
+        return mean, std
+
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Training inputs of shape (num_train, dim_inputs)."""
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Training outputs of shape (num_train, 1)."""
+        return self._y_buffer.data
+
+    @property
+    def noise(self) -> torch.Tensor:
+        r"""The noise variance hyper-parameter.
+
+        Returns:
+            torch.Tensor: The noise variance of the Gaussian likelihood.
+
+        """
+        return torch_utils.softplus(self._free_noise)
+
+    @noise.setter
+    def noise(self, noise: torch.Tensor) -> None:
+        r"""The noise variance hyper-parameter.
+
+        Args:
+            noise (torch.Tensor): The new value of the noise variance.
+
+        """
+        with torch.inference_mode():
+            self._free_noise.copy_(torch_utils.inv_softplus(noise))
+        self._num_updates += 1
+
+    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Add new data to the training set.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+
+        """
+        self._validate_data(x_new, y_new)
+        self._num_updates += 1
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+
+    def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Check if the inputs `x_new` and `y_new` are valid.
+
+        Args:
+            x_new (np.ndarray): An array of shape (num_inputs, dim_inputs)
+                containing the input features of the new data.
+            y_new (np.ndarray): An array of shape (num_outputs, 1)
+                containing the output targets of the new data.
+
+        Raises:
+            ValueError: If any of the following conditions are met:
+                1. `x_new` is not 2D.
+                2. `y_new` is not 2D.
+                3. `y_new` has more than 1 column.
+                4. `x_new` and `y_new` have different number of samples.
+                5. `x_new` and the inducing inputs have different number of
+                    features.
+
+        """
+        if x_new.ndim != 2:
+            raise ValueError("x_train must be 2D.")
+        if y_new.ndim != 2:
+            raise ValueError("y_train must be 2D.")
+        if y_new.shape[1] != 1:
+            raise ValueError("Only support univariate output for now.")
+        if x_new.shape[0] != y_new.shape[0]:
+            raise ValueError("x_train and y_train should have same length.")
+        if x_new.shape[1] != self.x_inducing.shape[1]:
+            raise ValueError("x_inducing and x_new should have same shape.")
+
+    def _compute_loss(self) -> torch.Tensor:
+        r"""Compute training loss.
+
+        Returns:
+            torch.Tensor: The training loss.
+
+        ??? note "Loss Function: Negative Collapsed Evidence Lower Bound"
+
+            $$
+            -\log\mathcal{N}(\mathbf{y}|\mathbf{0},
+            \mathbf{Q}_{ff}+\sigma^2\mathbf{I})
+            +\frac{1}{2\sigma^2}\mathrm{tr}(\mathbf{K}_{ff}-\mathbf{Q}_{ff}),
+            \quad
+            \mathbf{Q}_{ff}=\mathbf{K}_{fu}\mathbf{K}_{uu}^{-1}\mathbf{K}_{uf}.
+            $$
+
+        """
+        _, L_B, A, c = self._compute_common()
+        num_train = len(self.y_train)
+        noise = self.noise
+        quadratic = self.y_train.square().sum() / noise - c.square().sum()
+        logdet = 2.0 * L_B.diag().log().sum() + num_train * noise.log()
+        trace = self.kernel.diag(self.x_train).sum() / noise - A.square().sum()
+        constant = num_train * np.log(2 * np.pi)
+        return 0.5 * (quadratic + logdet + trace + constant)
+
+    def _compute_common(self):
+        r"""Compute common terms for `_compute_loss` and `predict`.
+
+        Returns:
+            L_uu (torch.Tensor): Lower Cholesky factor of the inducing
+                covariance matrix. Shape: (num_inducing, num_inducing).
+            L_B (torch.Tensor): Lower Cholesky factor of `B`.
+                Shape: (num_inducing, num_inducing).
+            A (torch.Tensor): Scaled whitened cross-covariance.
+                Shape: (num_inducing, num_train).
+            c (torch.Tensor): Whitened projection of the training outputs.
+                Shape: (num_inducing, 1).
+
+        ??? note "What are A, B, and c?"
+
+            $$
+            \boldsymbol{A} = \sigma^{-1}\boldsymbol{L}_{uu}^{-1}
+            \boldsymbol{K}_{uf},\quad
+            \boldsymbol{B} = \mathbf{I} + \boldsymbol{A}\boldsymbol{A}^{\intercal}
+            = \boldsymbol{L}_{B}\boldsymbol{L}_{B}^{\intercal},\quad
+            \mathbf{c} = \sigma^{-1}\boldsymbol{L}_{B}^{-1}\boldsymbol{A}
+            \mathbf{y}
+            $$
+
+        """
+        Kuu = self.kernel(self.x_inducing, self.x_inducing)
+        Kuu.diagonal().add_(self.jitter)
+        L_uu = torch_utils.robust_cholesky(Kuu, jitter=self.jitter)
+        Kuf = self.kernel(self.x_inducing, self.x_train)
+        sigma = self.noise.sqrt()
+        A = torch.linalg.solve_triangular(L_uu, Kuf, upper=False) / sigma
+        B = A @ A.t()
+        B.diagonal().add_(1.0)
+        L_B = torch_utils.robust_cholesky(B, jitter=self.jitter)
+        c = torch.linalg.solve_triangular(L_B, A @ self.y_train,
+                                          upper=False) / sigma
+        return L_uu, L_B, A, c
+
+    def _cached_common(self):
+        r"""Cached terms of `_compute_common` needed for prediction.
+
+        Returns:
+            L_uu (torch.Tensor): Lower Cholesky factor of the inducing
+                covariance matrix. Shape: (num_inducing, num_inducing).
+            L_B (torch.Tensor): Lower Cholesky factor of `B`.
+                Shape: (num_inducing, num_inducing).
+            c (torch.Tensor): Whitened projection of the training outputs.
+                Shape: (num_inducing, 1).
+
+        """
+        key = self._cache_version()
+        if self._cache is None or self._cache_key != key:
+            with torch.no_grad():
+                L_uu, L_B, _, c = self._compute_common()
+            self._cache = (L_uu, L_B, c)
+            self._cache_key = key
+        return self._cache
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, parameters, and posterior cache."""
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train if has_data else None,
+            "y_train": self.y_train if has_data else None,
+            "cache": self._cached_common() if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self._init_optimizers(self.lr_hyper)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        if checkpoint["x_train"] is not None:
+            self._x_buffer.append(checkpoint["x_train"])
+            self._y_buffer.append(checkpoint["y_train"])
+        self._num_updates += 1
+        self._cache = checkpoint["cache"]
+        self._cache_key = None
+        if self._cache is not None:
+            self._cache_key = self._cache_version()
+
+    def _cache_version(self) -> Tuple[int, int]:
+        r"""The key that identifies the current data and hyper-parameters."""
+        return self._num_updates, self.kernel.hyper_version
+
+    def _init_optimizers(self, lr_hyper: float) -> None:
+        """Initialize optimizers for hyper-parameters and inducing inputs.
+
+        Args:
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+                Defaults to 0.01.
+
+        """
+        self.lr_hyper = lr_hyper
+        hyper_params = []
+        for name, param in self.named_parameters():
+            if param.requires_grad:
+                hyper_params.append(param)
+        self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
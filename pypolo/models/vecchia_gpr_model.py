@@ -0,0 +1,392 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+from torch.nn import Parameter
+from tqdm import tqdm
+
+from ..utils import TensorBuffer, torch_utils
+from .base_model import BaseModel
+from .kernels import BaseKernel
+
+
+class VecchiaGPRModel(BaseModel, nn.Module):
+
+    def __init__(self,
+                 device_name,
+                 kernel: BaseKernel,
+                 noise: float,
+                 num_neighbors: int = 16,
+                 batch_size: int = 1024,
+                 lr_hyper: float = 0.01,
+                 jitter: float = 1e-6) -> None:
+        r"""Nearest-neighbor (Vecchia) Gaussian process regression.
+
+        Args:
+            device_name (str): The name of the device to run the model.
+            kernel (BaseKernel): The kernel function.
+            noise (float): The noise variance of the Gaussian likelihood.
+            num_neighbors (int, optional): Number of nearest training samples
+                every likelihood factor and every prediction conditions on.
+                Defaults to 16.
+            batch_size (int, optional): Number of points whose conditionals
+                are computed at once. Defaults to 1024.
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+            jitter (float, optional): The jitter to add to the diagonal of the
+                neighbor covariance matrices. Defaults to 1e-6.
+
+        Raises:
+            ValueError: If `num_neighbors` or `batch_size` is not positive,
+                or if the kernel has another dtype than the model.
+
+        ??? note "Vecchia approximation"
+
+            Ordering the training samples by arrival, the marginal likelihood
+            factorizes as $p(\mathbf{y})=\prod_i p(y_i|y_1,\dots,y_{i-1})$.
+            The Vecchia approximation conditions every factor only on the
+            `num_neighbors` nearest earlier samples. Each factor is then a
+            small GP with a $k\times{k}$ covariance matrix, so the loss and
+            the predictions cost $O(nk^3)$ time instead of the $O(n^3)$ of
+            `GPRModel`, and the factors of a batch are computed by one
+            batched Cholesky factorization.
+
+        ??? note "Spatial index"
+
+            The neighbors of a training sample only depend on the samples
+            that arrived before it, so they are searched once per sample by
+            `torch_utils.nearest_neighbors`, which hashes the inputs into a
+            grid, and reused in every iteration of `learn`. Test inputs
+            condition on their nearest training samples, searched in the same
+            way. Neighbors are defined by the Euclidean distance of the
+            inputs, so the inputs should be scaled similarly per dimension.
+
+        """
+        if num_neighbors <= 0:
+            raise ValueError("num_neighbors must be positive.")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive.")
+        BaseModel.__init__(self, device_name)
+        if kernel.dtype != self.dtype:
+            raise ValueError("kernel and model must have the same dtype.")
+        nn.Module.__init__(self)
+        self.kernel = kernel
+        self._free_noise = Parameter(
+            torch_utils.inv_softplus(
+                torch.as_tensor(
+                    noise,
+                    dtype=self.dtype,
+                    device=self.device,
+                )))
+        self._init_optimizers(lr_hyper)
+        self.num_neighbors = num_neighbors
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        self._neighbor_buffer = TensorBuffer(torch.long, self.device)
+
+    def learn(self,
+              x_new: np.ndarray,
+              y_new: np.ndarray,
+              num_iter: int,
+              verbose: bool = True) -> None:
+        r"""Optimizes the model parameters.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+            num_iter (int): Number of optimization/training iterations.
+            verbose (bool): Print the optimization information or not?
+
+        """
+        self._add_data(x_new, y_new)
+        self.train()
+        progress_bar = tqdm(range(num_iter), disable=not verbose)
+        for i in progress_bar:
+            self.opt_hyper.zero_grad()
+            loss = self._compute_loss()
+            loss.backward()
+            self.opt_hyper.step()
+            progress_bar.set_description(
+                f"Iter: {i:02d} loss: {loss.item(): .2f}")
+        self.eval()
+
+    def predict(
+        self,
+        x_test: np.ndarray,
+        mode: str = "both",
+        noise_free: bool = False,
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Makes predictions.
+
+        Args:
+            x_test (np.ndarray): Test inputs of shape (num_inputs, dim_inputs).
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[np.ndarray]]: A tuple
+                containing predictive mean of shape (num_inputs, dim_outputs)
+                and predictive standard deviation of shape (num_inputs, 1).
+                The entry not requested by `mode` is None.
+
+        """
+        self._validate_mode(mode)
+        x_test_tensor = torch.as_tensor(x_test,
+                                        dtype=self.dtype,
+                                        device=self.device)
+        mean_tensor, std_tensor = self.forward(x_test_tensor,
+                                               noise_free=noise_free,
+                                               mode=mode)
+        mean = None if mean_tensor is None else mean_tensor.cpu().numpy()
+        std = None if std_tensor is None else std_tensor.cpu().numpy()
+        return mean, std
+
+    def forward(
+        self,
+        x_test: torch.Tensor,
+        noise_free: bool = False,
+        mode: str = "both",
+    ) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        r"""Make prediction.
+
+        Args:
+            x_test (torch.Tensor): Test inputs of shape
+                (num_inputs, dim_inputs).
+            noise_free (bool, optional): If True, predict the latent function
+                values. Otherwise, predict the noisy targets.
+            mode (str, optional): Which predictive moments to compute: "mean",
+                "var", or "both". Defaults to "both".
+
+        Returns:
+            mean (Optional[torch.Tensor]): Predictive mean of shape
+                (num_inputs, dim_outputs), or None if `mode` is "var".
+            std (Optional[torch.Tensor]): Predictive standard deviation of
+                shape (num_inputs, 1), or None if `mode` is "mean".
+
+        """
+        with torch.no_grad():
+            neighbors = torch_utils.nearest_neighbors(x_test, self.x_train,
+                                                      self.num_neighbors)
+            means, variances = [], []
+            for start in range(0, x_test.shape[0], self.batch_size):
+                index = slice(start, start + self.batch_size)
+                mean, var = self._conditional(x_test[index], neighbors[index])
+                means.append(mean)
+                variances.append(var)
+            mean, std = None, None
+            if mode in ("mean", "both"):
+                mean = torch.cat(means)
+            if mode in ("var", "both"):
+                var = torch.cat(variances)
+                var.clamp_(min=self.jitter)
+                if not noise_free:
+                    var += self.noise
+                std = var.sqrt()
+        return mean, std
+
+    @property
+    def x_train(self) -> torch.Tensor:
+        r"""Training inputs of shape (num_train, dim_inputs)."""
+        return self._x_buffer.data
+
+    @property
+    def y_train(self) -> torch.Tensor:
+        r"""Training outputs of shape (num_train, dim_outputs)."""
+        return self._y_buffer.data
+
+    @property
+    def neighbors(self) -> torch.Tensor:
+        r"""Neighbor indices of shape (num_train, num_neighbors)."""
+        return self._neighbor_buffer.data
+
+    @property
+    def noise(self) -> torch.Tensor:
+        r"""The noise variance hyper-parameter.
+
+        Returns:
+            torch.Tensor: The noise variance of the Gaussian likelihood.
+
+        """
+        return torch_utils.softplus(self._free_noise)
+
+    @noise.setter
+    def noise(self, noise: torch.Tensor) -> None:
+        r"""The noise variance hyper-parameter.
+
+        Args:
+            noise (torch.Tensor): The new value of the noise variance.
+
+        """
+        with torch.inference_mode():
+            self._free_noise.copy_(torch_utils.inv_softplus(noise))
+
+    def _add_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Add new data to the training set and search their neighbors.
+
+        Args:
+            x_new (np.ndarray): New training inputs of shape
+                (num_inputs, dim_inputs).
+            y_new (np.ndarray): New training outputs of shape
+                (num_outputs, dim_outputs).
+
+        """
+        self._validate_data(x_new, y_new)
+        num_old = len(self._x_buffer)
+        self._x_buffer.append(x_new)
+        self._y_buffer.append(y_new)
+        num_train = len(self._x_buffer)
+        earlier = torch.arange(num_old, num_train, device=self.device)
+        self._neighbor_buffer.append(
+            torch_utils.nearest_neighbors(self.x_train[num_old:],
+                                          self.x_train, self.num_neighbors,
+                                          earlier))
+
+    def _validate_data(self, x_new: np.ndarray, y_new: np.ndarray) -> None:
+        r"""Check if the inputs `x_new` and `y_new` are valid.
+
+        Args:
+            x_new (np.ndarray): An array of shape (num_inputs, dim_inputs)
+                containing the input features of the new data.
+            y_new (np.ndarray): An array of shape (num_outputs, dim_outputs)
+                containing the output targets of the new data.
+
+        Raises:
+            ValueError: If any of the following conditions are met:
+                1. `x_new` is not 2D.
+                2. `y_new` is not 2D.
+                3. `x_new` and `y_new` have different number of samples.
+                4. `x_new` and `self.x_train` have different number of features.
+                5. `y_new` and `self.y_train` have different number of columns.
+
+        """
+        if x_new.ndim != 2:
+            raise ValueError("x_train must be 2D.")
+        if y_new.ndim != 2:
+            raise ValueError("y_train must be 2D.")
+        if x_new.shape[0] != y_new.shape[0]:
+            raise ValueError("x_train and y_train should have same length.")
+        if (len(self._x_buffer) > 0
+                and x_new.shape[1] != self.x_train.shape[1]):
+            raise ValueError("x_train and x_new should have same shape.")
+        if (len(self._y_buffer) > 0
+                and y_new.shape[1] != self.y_train.shape[1]):
+            raise ValueError("y_train and y_new should have same shape.")
+
+    def _compute_loss(self) -> torch.Tensor:
+        r"""Compute training loss.
+
+        Returns:
+            torch.Tensor: The training loss.
+
+        ??? note "Loss Function: Vecchia Negative Log Marginal Likelihood"
+
+            With the conditional mean $\mu_i$ and latent variance $v_i$ of
+            sample $i$ given its neighbors,
+
+            $$
+            -\log{p(\mathbf{y}|X)}\approx
+            \frac{1}{2}\sum_{i=1}^{n}\left[
+            \frac{(y_i-\mu_i)^2}{v_i+\sigma^2}
+            +\log(v_i+\sigma^2)+\log{2\pi}\right].
+            $$
+
+        """
+        num_train, num_outputs = self.y_train.shape
+        neighbors = self.neighbors
+        loss = 0.0
+        for start in range(0, num_train, self.batch_size):
+            index = slice(start, start + self.batch_size)
+            mean, var = self._conditional(self.x_train[index],
+                                          neighbors[index])
+            var = var.clamp(min=0.0) + self.noise
+            residual = self.y_train[index] - mean
+            quadratic = torch.sum(residual.square() / var)
+            logdet = num_outputs * var.log().sum()
+            loss = loss + quadratic + logdet
+        constant = num_train * num_outputs * np.log(2 * np.pi)
+        return 0.5 * (loss + constant)
+
+    def _conditional(
+        self,
+        x: torch.Tensor,
+        neighbors: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Conditions the latent function at `x` on its neighbors.
+
+        Args:
+            x (torch.Tensor): Inputs of shape (batch_size, dim_inputs).
+            neighbors (torch.Tensor): Indices of the training samples each
+                input conditions on, of shape (batch_size, num_neighbors),
+                padded with -1.
+
+        Returns:
+            mean (torch.Tensor): Conditional mean of shape
+                (batch_size, dim_outputs).
+            var (torch.Tensor): Conditional latent variance of shape
+                (batch_size, 1).
+
+        ??? note "Padding"
+
+            Missing neighbors get an identity block in the covariance matrix
+            and zero cross-covariances and outputs, which leaves the
+            conditionals of the other neighbors unchanged.
+
+        """
+        mask = (neighbors >= 0).to(self.dtype)
+        index = neighbors.clamp(min=0)
+        x_near = self.x_train[index]
+        y_near = self.y_train[index] * mask.unsqueeze(-1)
+        K = self.kernel(x_near, x_near)
+        K = K * (mask.unsqueeze(-1) * mask.unsqueeze(-2))
+        K = K + torch.diag_embed(self.noise * mask + (1.0 - mask))
+        L = torch_utils.robust_cholesky(K, jitter=self.jitter)
+        K_near = self.kernel(x.unsqueeze(1), x_near) * mask.unsqueeze(1)
+        iL_K = torch.linalg.solve_triangular(L,
+                                             K_near.transpose(-2, -1),
+                                             upper=False)
+        iL_y = torch.linalg.solve_triangular(L, y_near, upper=False)
+        mean = (iL_K.transpose(-2, -1) @ iL_y).squeeze(1)
+        var = self.kernel.diag(x) - iL_K.square().sum(1)
+        return mean, var
+
+    def _get_checkpoint(self) -> Dict[str, Any]:
+        r"""Collects the training data, neighbors, and parameters."""
+        has_data = len(self._x_buffer) > 0
+        return {
+            "state_dict": self.state_dict(),
+            "x_train": self.x_train if has_data else None,
+            "y_train": self.y_train if has_data else None,
+            "neighbors": self.neighbors if has_data else None,
+        }
+
+    def _set_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        r"""Restores the state collected by `_get_checkpoint`."""
+        self.load_state_dict(checkpoint["state_dict"])
+        self._init_optimizers(self.lr_hyper)
+        self._x_buffer = TensorBuffer(self.dtype, self.device)
+        self._y_buffer = TensorBuffer(self.dtype, self.device)
+        self._neighbor_buffer = TensorBuffer(torch.long, self.device)
+        if checkpoint["x_train"] is not None:
+            self._x_buffer.append(checkpoint["x_train"])
+            self._y_buffer.append(checkpoint["y_train"])
+            self._neighbor_buffer.append(checkpoint["neighbors"])
+
+    def _init_optimizers(self, lr_hyper: float) -> None:
+        """Initialize optimizers for hyper-parameters.
+
+        Args:
+            lr_hyper (float, optional): Learning rate of hyper-parameters.
+                Defaults to 0.01.
+
+        """
+        self.lr_hyper = lr_hyper
+        hyper_params = []
+        for name, param in self.named_parameters():
+            hyper_params.append(param)
+        self.opt_hyper = torch.optim.Adam(hyper_params, lr=lr_hyper)
@@ -18,6 +18,9 @@ def gaussian_entropy(predict_fn: Callable, x: np.ndarray) -> np.ndarray:
         $$
 
     Args:
+        predict_fn (Callable): Prediction function such as
+            `BaseModel.predict`, which is called with `mode="var"` so that the
+            predictive mean is not computed.
         x (np.ndarray): Input array of shape (num_inputs, dim_inputs) to be
             evaluated.
 
@@ -25,6 +28,6 @@ def gaussian_entropy(predict_fn: Callable, x: np.ndarray) -> np.ndarray:
         np.ndarray: An array of entropy values corresponding to the inputs.
 
     """
-    _, std = predict_fn(x)
+    _, std = predict_fn(x, mode="var")
     entropy = 0.5 * np.log(2 * np.pi * np.square(std)) + 0.5
     return entropy
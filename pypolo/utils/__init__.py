@@ -1,8 +1,10 @@
 from . import scalers, torch_utils
+from .tensor_buffer import TensorBuffer
 from .tensor_map import TensorMap
 
 __all__ = [
     "scalers",
     "torch_utils",
+    "TensorBuffer",
     "TensorMap",
 ]
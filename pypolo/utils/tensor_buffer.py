@@ -0,0 +1,126 @@
+from typing import Union
+
+import numpy as np
+import torch
+
+
+class TensorBuffer:
+
+    def __init__(
+        self,
+        dtype: torch.dtype,
+        device: torch.device,
+        capacity: int = 64,
+    ) -> None:
+        r"""A tensor that grows along the first dimension.
+
+        Args:
+            dtype (torch.dtype): Data type of the stored tensor.
+            device (torch.device): Device of the stored tensor.
+            capacity (int, optional): Number of rows allocated by the first
+                `append`. Defaults to 64.
+
+        ??? note "Amortized doubling"
+
+            Rows are written into a pre-allocated storage whose capacity is
+            doubled whenever it is full, so appending a row costs $O(1)$
+            amortized instead of copying the whole tensor as `torch.cat` does.
+            `data` is a view of the filled rows of the storage.
+
+        ??? note "Views stay valid"
+
+            Rows are never overwritten once written: `append` writes behind
+            the filled rows, `remove_first` only advances the first filled
+            row, and a full storage is replaced by a new one. Hence, like
+            the tensors returned by `torch.cat`, a `data` view obtained
+            earlier keeps its rows after later appends and removals.
+
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        self.dtype = dtype
+        self.device = device
+        self._initial_capacity = capacity
+        self._storage = None
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Number of rows that fit in the storage without reallocation."""
+        return 0 if self._storage is None else self._storage.shape[0]
+
+    @property
+    def data(self) -> torch.Tensor:
+        r"""The stored rows.
+
+        Returns:
+            torch.Tensor: A view of the filled rows of the storage.
+
+        Raises:
+            ValueError: If nothing has been appended yet.
+
+        """
+        if self._storage is None:
+            raise ValueError("The buffer is empty.")
+        return self._storage[self._start:self._start + self._size]
+
+    def append(self, values: Union[np.ndarray, torch.Tensor]) -> None:
+        r"""Appends rows to the buffer.
+
+        Args:
+            values (Union[np.ndarray, torch.Tensor]): Rows of shape
+                (num_rows, ...) whose trailing dimensions must match those of
+                the rows appended before.
+
+        Raises:
+            ValueError: If the trailing dimensions do not match.
+
+        """
+        values = torch.as_tensor(values, dtype=self.dtype, device=self.device)
+        if self._storage is None:
+            self._allocate(max(self._initial_capacity, values.shape[0]),
+                           values.shape[1:])
+        elif values.shape[1:] != self._storage.shape[1:]:
+            raise ValueError("values and data should have same shape.")
+        new_size = self._size + values.shape[0]
+        if self._start + new_size > self.capacity:
+            capacity = self.capacity
+            if 2 * new_size > capacity:
+                capacity = max(new_size, 2 * capacity)
+            # Rows removed from the front are reclaimed by a new storage.
+            self._reserve(capacity)
+        end = self._start + self._size
+        self._storage[end:end + values.shape[0]] = values
+        self._size = new_size
+
+    def remove_first(self, num_rows: int) -> None:
+        r"""Removes the oldest rows in $O(1)$ without moving any row.
+
+        Args:
+            num_rows (int): Number of leading rows to remove.
+
+        Raises:
+            ValueError: If `num_rows` is negative or exceeds the size.
+
+        """
+        if not 0 <= num_rows <= self._size:
+            raise ValueError("num_rows must be in [0, len(buffer)].")
+        self._start += num_rows
+        self._size -= num_rows
+
+    def _allocate(self, capacity: int, trailing_shape: torch.Size) -> None:
+        self._storage = torch.empty(
+            (capacity, *trailing_shape),
+            dtype=self.dtype,
+            device=self.device,
+        )
+
+    def _reserve(self, capacity: int) -> None:
+        old_data = self.data
+        self._allocate(capacity, old_data.shape[1:])
+        self._storage[:self._size] = old_data
+        self._start = 0
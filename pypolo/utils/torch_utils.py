@@ -1,10 +1,16 @@
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
 
 import torch
 import torch.nn.functional as F
 
 
-def get_dtype_and_device(device_name: str) -> Tuple[torch.dtype, torch.device]:
+PRECISIONS = ("float32", "float64", "mixed")
+
+
+def get_dtype_and_device(
+    device_name: str,
+    precision: Optional[str] = None,
+) -> Tuple[torch.dtype, torch.device]:
     """
     Returns the PyTorch dtype and device associated with the given device name.
 
@@ -12,6 +18,11 @@ def get_dtype_and_device(device_name: str) -> Tuple[torch.dtype, torch.device]:
     ----------
     device_name : str
         The name of the device. Must be one of 'cpu' or 'cuda'.
+    precision : Optional[str] = None
+        One of 'float32', 'float64', and 'mixed'. The 'mixed' policy stores
+        data and parameters in float64 and lets models factorize in float32
+        (see `factor_dtype`). Defaults to None, i.e., float64 on CPU and
+        float32 on CUDA.
 
     Returns
     -------
@@ -21,7 +32,8 @@ def get_dtype_and_device(device_name: str) -> Tuple[torch.dtype, torch.device]:
     Raises
     ------
     ValueError
-        If the device name is not 'cpu' and does not contain the string 'cuda'.
+        If the device name is not 'cpu' and does not contain the string 'cuda',
+        or if the precision is unknown.
     """
     if device_name == "cpu":
         dtype = torch.double
@@ -29,10 +41,51 @@ def get_dtype_and_device(device_name: str) -> Tuple[torch.dtype, torch.device]:
         dtype = torch.float
     else:
         raise ValueError("Invalid device name.")
+    if precision is not None and precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}.")
+    if precision == "float32":
+        dtype = torch.float
+    elif precision in ("float64", "mixed"):
+        dtype = torch.double
     device = torch.device(device_name)
     return dtype, device
 
 
+def factor_dtype(dtype: torch.dtype, precision: Optional[str]) -> torch.dtype:
+    """Dtype of matrix factorizations under a precision policy.
+
+    Parameters
+    ----------
+    dtype: torch.dtype
+        Dtype of the data and parameters.
+    precision: Optional[str]
+        The precision policy passed to `get_dtype_and_device`.
+
+    Returns
+    -------
+    torch.dtype
+        float32 for the 'mixed' policy and `dtype` otherwise.
+    """
+    return torch.float if precision == "mixed" else dtype
+
+
+def default_jitter(dtype: torch.dtype) -> float:
+    """Jitter that keeps Cholesky factorizations stable in `dtype`.
+
+    Parameters
+    ----------
+    dtype: torch.dtype
+        Dtype of the covariance matrix.
+
+    Returns
+    -------
+    float
+        1e-6 in float64, and about 1e3 times the machine epsilon in lower
+        precisions, e.g., 1.2e-4 in float32.
+    """
+    return max(1e-6, 1e3 * torch.finfo(dtype).eps)
+
+
 def softplus(x):
     """Transform the input to positive output."""
     return F.softplus(x, 1.0, 20.0) + 1e-6
@@ -46,16 +99,20 @@ def inv_softplus(y):
     return _y + torch.log(-torch.expm1(-_y))
 
 
-def robust_cholesky(cov_mat, jitter: float = 1e-6, num_attempts: int = 3):
+def robust_cholesky(cov_mat,
+                    jitter: Optional[float] = None,
+                    num_attempts: int = 3):
     """Numerically stable Cholesky.
 
     Parameters
     ----------
-    cov_mat: TensorType["num_samples", "num_samples"]
-        Covariance matrix to be decomposed.
-    jitter: float = 1e-6
+    cov_mat: TensorType[..., "num_samples", "num_samples"]
+        Covariance matrix to be decomposed, or a batch of them. Jitter is only
+        added to the matrices whose factorization fails.
+    jitter: Optional[float] = None
         Small positive number added to the digonal elements of covariance
-        matrix for preventing Cholesky decomposition failure.
+        matrix for preventing Cholesky decomposition failure. Defaults to
+        `default_jitter` of the dtype of `cov_mat`.
     num_tries: int = 3
         Number of attempts (with successively increasing jitter) to make before
         raising an error.
@@ -66,6 +123,8 @@ def robust_cholesky(cov_mat, jitter: float = 1e-6, num_attempts: int = 3):
     https://github.com/cornellius-gp/gpytorch/blob/5a0ff6b59720b3db1cbaf0063bd10486d2d4213e/gpytorch/utils/cholesky.py#L12
 
     """
+    if jitter is None:
+        jitter = default_jitter(cov_mat.dtype)
     L, info = torch.linalg.cholesky_ex(cov_mat, out=None)
     if not torch.any(info):
         return L
@@ -78,7 +137,7 @@ def robust_cholesky(cov_mat, jitter: float = 1e-6, num_attempts: int = 3):
         is_positive_definite = info > 0
         jitter_new = jitter * (10**i)
         increment = is_positive_definite * (jitter_new - jitter_prev)
-        _cov_mat.diagonal().add_(increment)
+        _cov_mat.diagonal(dim1=-2, dim2=-1).add_(increment.unsqueeze(-1))
         jitter_prev = jitter_new
         print("Matrix is not positive definite! " +
               f"Added {jitter_new:.1e} to the diagonal.")
@@ -88,3 +147,396 @@ def robust_cholesky(cov_mat, jitter: float = 1e-6, num_attempts: int = 3):
     raise ValueError(
         "Covariance matrix is still not positive-definite " +
         f"after adding {jitter_new:.1e} to the diagonal elements.")
+
+
+def cholesky_extend(L, cov_cross, cov_new, jitter: Optional[float] = None):
+    """Extends a Cholesky factor with new rows and columns.
+
+    Parameters
+    ----------
+    L: TensorType["num_old", "num_old"]
+        Lower Cholesky factor of the existing covariance matrix `A`.
+    cov_cross: TensorType["num_old", "num_new"]
+        Covariance between the existing and the new entries.
+    cov_new: TensorType["num_new", "num_new"]
+        Covariance matrix of the new entries.
+    jitter: Optional[float] = None
+        Jitter passed to `robust_cholesky` for the Schur complement.
+
+    Returns
+    -------
+    TensorType["num_old + num_new", "num_old + num_new"]
+        Lower Cholesky factor of the extended covariance matrix
+        `[[A, cov_cross], [cov_cross.T, cov_new]]`.
+
+    Notes
+    -----
+    This is a block Cholesky update that costs O(num_old^2 * num_new) instead
+    of the O((num_old + num_new)^3) of refactorizing the extended matrix.
+
+    """
+    B = torch.linalg.solve_triangular(L, cov_cross, upper=False)
+    schur = cov_new - B.t() @ B
+    L_new = robust_cholesky(schur, jitter=jitter)
+    top = torch.cat((L, L.new_zeros(L.shape[0], L_new.shape[1])), dim=1)
+    bottom = torch.cat((B.t(), L_new), dim=1)
+    return torch.cat((top, bottom), dim=0)
+
+
+def refined_cholesky_solve(
+    L: torch.Tensor,
+    rhs: torch.Tensor,
+    matvec: Callable,
+    num_refinements: int = 2,
+) -> torch.Tensor:
+    """Solves `A x = rhs` with a low-precision factor and refinement.
+
+    Parameters
+    ----------
+    L: TensorType["num_rows", "num_rows"]
+        Lower Cholesky factor of `A`, possibly in a lower precision than
+        `rhs`.
+    rhs: TensorType["num_rows", "num_columns"]
+        Right-hand sides in the working precision.
+    matvec: Callable
+        Function that multiplies `A` in the working precision with a tensor
+        of shape (num_rows, num_columns).
+    num_refinements: int = 2
+        Number of refinement steps.
+
+    Returns
+    -------
+    TensorType["num_rows", "num_columns"]
+        The solution in the dtype of `rhs`.
+
+    Notes
+    -----
+    Each step solves for the correction of the residual `rhs - A x`, which
+    is computed in the working precision. The error contracts by a factor
+    of about `cond(A) * eps(L.dtype)` per step, so a float32 factor reaches
+    close to float64 accuracy on reasonably conditioned matrices.
+
+    """
+    x = torch.cholesky_solve(rhs.to(L.dtype), L, upper=False).to(rhs.dtype)
+    for _ in range(num_refinements):
+        residual = rhs - matvec(x)
+        x = x + torch.cholesky_solve(residual.to(L.dtype), L,
+                                     upper=False).to(rhs.dtype)
+    return x
+
+
+def conjugate_gradient(
+    matvec: Callable,
+    rhs: torch.Tensor,
+    precond_diag: Optional[torch.Tensor] = None,
+    max_iter: int = 1000,
+    tol: float = 1e-6,
+) -> Tuple[torch.Tensor, List[torch.Tensor], List[torch.Tensor], torch.Tensor]:
+    """Batched (Jacobi-preconditioned) conjugate gradients.
+
+    Parameters
+    ----------
+    matvec: Callable
+        Function that multiplies the symmetric positive-definite matrix `A`
+        with a tensor of shape (num_rows, num_columns).
+    rhs: TensorType["num_rows", "num_columns"]
+        Right-hand sides, each column being solved independently.
+    precond_diag: Optional[TensorType["num_rows", 1]] = None
+        Diagonal of the Jacobi preconditioner, typically the diagonal of `A`.
+    max_iter: int = 1000
+        Maximum number of iterations.
+    tol: float = 1e-6
+        Relative residual norm at which a column is considered converged.
+
+    Returns
+    -------
+    solution: TensorType["num_rows", "num_columns"]
+        Approximation of `A^{-1} rhs`.
+    alphas: List[TensorType["num_columns"]]
+        Step sizes of every iteration, zero for converged columns.
+    betas: List[TensorType["num_columns"]]
+        Conjugation coefficients of every iteration.
+    num_iters: TensorType["num_columns"]
+        Number of iterations each column ran before converging.
+
+    Notes
+    -----
+    `A` is only accessed through `matvec`, so it never has to be formed.
+    The coefficients define the Lanczos tridiagonal matrices used by
+    `lanczos_logdet_quadrature`.
+
+    """
+    solution = torch.zeros_like(rhs)
+    residual = rhs.clone()
+    precond_residual = (residual if precond_diag is None else residual /
+                        precond_diag)
+    direction = precond_residual.clone()
+    rz = (residual * precond_residual).sum(0)
+    threshold = tol * rhs.norm(dim=0)
+    active = residual.norm(dim=0) > threshold
+    zeros = torch.zeros_like(rz)
+    alphas, betas = [], []
+    num_iters = torch.zeros(rhs.shape[1], dtype=torch.long, device=rhs.device)
+    for _ in range(max_iter):
+        if not torch.any(active):
+            break
+        A_direction = matvec(direction)
+        alpha = torch.where(active, rz / (direction * A_direction).sum(0),
+                            zeros)
+        solution += alpha * direction
+        residual -= alpha * A_direction
+        precond_residual = (residual if precond_diag is None else residual /
+                            precond_diag)
+        rz_new = (residual * precond_residual).sum(0)
+        beta = torch.where(active, rz_new / rz, zeros)
+        direction = precond_residual + beta * direction
+        rz = torch.where(active, rz_new, rz)
+        alphas.append(alpha)
+        betas.append(beta)
+        num_iters += active
+        active = active & (residual.norm(dim=0) > threshold)
+    return solution, alphas, betas, num_iters
+
+
+def lanczos_logdet_quadrature(alphas: List[torch.Tensor],
+                              betas: List[torch.Tensor],
+                              num_iters: torch.Tensor) -> torch.Tensor:
+    """Stochastic Lanczos quadrature of `z^T log(A) z / z^T z`.
+
+    Parameters
+    ----------
+    alphas: List[TensorType["num_probes"]]
+        Step sizes returned by `conjugate_gradient` for probe vectors `z`.
+    betas: List[TensorType["num_probes"]]
+        Conjugation coefficients returned by `conjugate_gradient`.
+    num_iters: TensorType["num_probes"]
+        Number of iterations of each probe.
+
+    Returns
+    -------
+    TensorType["num_probes"]
+        Gauss quadrature estimate of `e_1^T log(T) e_1` for the Lanczos
+        tridiagonal matrix `T` of every probe. Multiplying by the squared
+        (preconditioned) norm of the probe and averaging over probes estimates
+        the log-determinant of the (preconditioned) matrix.
+
+    Notes
+    -----
+    The Lanczos tridiagonal matrix is recovered from the conjugate gradient
+    coefficients: `T[0, 0] = 1 / alpha_0`,
+    `T[j, j] = 1 / alpha_j + beta_{j-1} / alpha_{j-1}`, and
+    `T[j, j + 1] = sqrt(beta_j) / alpha_j`.
+
+    """
+    all_alphas, all_betas = torch.stack(alphas), torch.stack(betas)
+    estimates = []
+    for j in range(all_alphas.shape[1]):
+        m = int(num_iters[j])
+        alpha, beta = all_alphas[:m, j], all_betas[:m, j]
+        main = alpha.reciprocal()
+        main[1:] += beta[:-1] / alpha[:-1]
+        off = beta[:-1].sqrt() / alpha[:-1]
+        T = torch.diag(main) + torch.diag(off, 1) + torch.diag(off, -1)
+        eigvals, eigvecs = torch.linalg.eigh(T)
+        log_eigvals = eigvals.clamp(min=torch.finfo(T.dtype).tiny).log()
+        estimates.append((eigvecs[0].square() * log_eigvals).sum())
+    return torch.stack(estimates)
+
+
+def cholesky_update(L, vectors):
+    """Rank-k update of a Cholesky factor.
+
+    Parameters
+    ----------
+    L: TensorType["num_rows", "num_rows"]
+        Lower Cholesky factor of a matrix `A`.
+    vectors: TensorType["num_rows", "num_vectors"]
+        Columns `v` of the update.
+
+    Returns
+    -------
+    TensorType["num_rows", "num_rows"]
+        Lower Cholesky factor of `A + vectors @ vectors.T`.
+
+    Notes
+    -----
+    Column `k` of the factor and row `k` of all vectors are combined by one
+    Householder reflection of `[L[k, k], vectors[k]]`, which updates all
+    vectors at once in O(num_rows * num_vectors). The update thus runs
+    `num_rows` vectorized steps and costs O(num_rows^2 * num_vectors) in
+    total, which is cheaper than the O(num_rows^3) refactorization when
+    `num_vectors` is small. Otherwise, `A + vectors @ vectors.T` is
+    refactorized directly.
+
+    """
+    num_rows, num_vectors = vectors.shape
+    if num_vectors >= num_rows:
+        return torch.linalg.cholesky(L @ L.T + vectors @ vectors.T)
+    L = L.clone()
+    vectors = vectors.clone()
+    for k in range(num_rows):
+        diag, row = L[k, k], vectors[k]
+        row_norm = row.square().sum()
+        radius = torch.sqrt(diag.square() + row_norm)
+        # The reflection maps [diag, row] to [-radius, 0] without cancellation
+        # because the diagonal is positive.
+        head = diag + radius
+        scale = 1.0 / (radius * head)
+        column, tail = L[k:, k], vectors[k:]
+        projection = head * column + tail @ row
+        L[k:, k] = scale * head * projection - column
+        vectors[k:] = tail - scale * projection.unsqueeze(1) * row
+    return L
+
+
+def radius_neighbors(
+    x1: torch.Tensor,
+    x2: torch.Tensor,
+    radius: float,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Finds all pairs of points that are closer than `radius`.
+
+    Parameters
+    ----------
+    x1: TensorType["num_inputs_1", "dim_inputs"]
+        First set of points.
+    x2: TensorType["num_inputs_2", "dim_inputs"]
+        Second set of points.
+    radius: float
+        Search radius.
+
+    Returns
+    -------
+    rows: TensorType["num_pairs"]
+        Indices into `x1` of the pairs.
+    cols: TensorType["num_pairs"]
+        Indices into `x2` of the pairs.
+
+    Notes
+    -----
+    Points are hashed into cells of side `radius`, so the neighbors of a
+    point lie in its own or the adjacent 3^d cells. Every cell offset is
+    matched by a sorted search over the cell keys, which costs
+    O((n1 + n2) log n2 + num_candidates) instead of the O(n1 * n2) of a dense
+    distance matrix.
+
+    """
+    x1, x2 = x1.detach(), x2.detach()
+    dim = x1.shape[1]
+    origin = torch.minimum(x1.min(0).values, x2.min(0).values)
+    cells1 = torch.div(x1 - origin, radius, rounding_mode="floor").long()
+    cells2 = torch.div(x2 - origin, radius, rounding_mode="floor").long()
+    # Padding by one cell keeps the shifted keys of `x1` non-negative.
+    extent = torch.maximum(cells1.max(0).values, cells2.max(0).values) + 3
+    strides = torch.ones(dim, dtype=torch.long, device=x1.device)
+    for k in range(dim - 2, -1, -1):
+        strides[k] = strides[k + 1] * extent[k + 1]
+    keys2 = ((cells2 + 1) * strides).sum(1)
+    sorted_keys2, order2 = torch.sort(keys2)
+    offsets = torch.cartesian_prod(*[
+        torch.tensor([-1, 0, 1], device=x1.device) for _ in range(dim)
+    ]).view(-1, dim)
+    all_rows, all_cols = [], []
+    for offset in offsets:
+        keys1 = ((cells1 + 1 + offset) * strides).sum(1)
+        starts = torch.searchsorted(sorted_keys2, keys1, right=False)
+        stops = torch.searchsorted(sorted_keys2, keys1, right=True)
+        counts = stops - starts
+        rows = torch.repeat_interleave(
+            torch.arange(len(x1), device=x1.device), counts)
+        # Position of every candidate within its run of equal keys.
+        run_starts = torch.repeat_interleave(starts, counts)
+        first = torch.cumsum(counts, 0) - counts
+        within = (torch.arange(len(rows), device=x1.device) -
+                  torch.repeat_interleave(first, counts))
+        cols = order2[run_starts + within]
+        close = (x1[rows] - x2[cols]).norm(dim=1) < radius
+        all_rows.append(rows[close])
+        all_cols.append(cols[close])
+    return torch.cat(all_rows), torch.cat(all_cols)
+
+
+def nearest_neighbors(
+    x1: torch.Tensor,
+    x2: torch.Tensor,
+    num_neighbors: int,
+    num_candidates: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    """Finds the nearest points of `x2` for every point of `x1`.
+
+    Parameters
+    ----------
+    x1: TensorType["num_inputs_1", "dim_inputs"]
+        Query points.
+    x2: TensorType["num_inputs_2", "dim_inputs"]
+        Reference points.
+    num_neighbors: int
+        Number of neighbors per query point.
+    num_candidates: Optional[TensorType["num_inputs_1"]] = None
+        If given, query point `i` only considers the first
+        `num_candidates[i]` reference points, e.g., the samples collected
+        before it. Defaults to None, i.e., all reference points.
+
+    Returns
+    -------
+    indices: TensorType["num_inputs_1", "num_neighbors"]
+        Indices into `x2` sorted by increasing distance, padded with -1 if a
+        query point has fewer than `num_neighbors` candidates.
+
+    Notes
+    -----
+    The neighbors are gathered by `radius_neighbors`, starting from the
+    radius that contains `num_neighbors` points on average, and the radius is
+    doubled only for the query points that found too few candidates. The k
+    nearest candidates within the radius are the k nearest overall, so the
+    result is exact at a cost that grows with the local density rather than
+    with `num_inputs_1 * num_inputs_2`.
+
+    """
+    x1, x2 = x1.detach(), x2.detach()
+    num1, num2 = x1.shape[0], x2.shape[0]
+    device = x1.device
+    indices = torch.full((num1, num_neighbors),
+                         -1,
+                         dtype=torch.long,
+                         device=device)
+    if num1 == 0 or num2 == 0:
+        return indices
+    if num_candidates is None:
+        num_candidates = torch.full((num1, ),
+                                    num2,
+                                    dtype=torch.long,
+                                    device=device)
+    required = num_candidates.clamp(max=num_neighbors)
+    extent = x2.max(0).values - x2.min(0).values
+    span = extent.max().item()
+    if span > 0.0:
+        # Flat dimensions get the spacing of evenly distributed points.
+        volume = extent.clamp(min=span / num2).prod().item()
+        radius = (volume * num_neighbors / num2)**(1.0 / x2.shape[1])
+    else:
+        radius = 1.0
+    pending = torch.arange(num1, device=device)[required > 0]
+    while len(pending) > 0:
+        rows, cols = radius_neighbors(x1[pending], x2, radius)
+        rows = pending[rows]
+        allowed = cols < num_candidates[rows]
+        rows, cols = rows[allowed], cols[allowed]
+        counts = torch.bincount(rows, minlength=num1)
+        is_done = torch.zeros(num1, dtype=torch.bool, device=device)
+        is_done[pending] = counts[pending] >= required[pending]
+        found = is_done[rows]
+        rows, cols = rows[found], cols[found]
+        # Sort by distance, then stably by query point.
+        order = torch.argsort((x1[rows] - x2[cols]).square().sum(1))
+        rows, cols = rows[order], cols[order]
+        order = torch.sort(rows, stable=True).indices
+        rows, cols = rows[order], cols[order]
+        counts = torch.bincount(rows, minlength=num1)
+        first = torch.cumsum(counts, 0) - counts
+        rank = torch.arange(len(rows), device=device) - first[rows]
+        nearest = rank < num_neighbors
+        indices[rows[nearest], rank[nearest]] = cols[nearest]
+        pending = pending[~is_done[pending]]
+        radius *= 2.0
+    return indices
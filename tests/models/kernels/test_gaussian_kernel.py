@@ -1,3 +1,5 @@
+import math
+
 import pytest
 import torch
 
@@ -171,3 +173,42 @@ def test_gaussian_kernel_forward(isotropic: GaussianKernel,
         device=device,
     ).exp_()
     assert torch.allclose(isotropic(x3, x4), expected)
+
+
+def test_gaussian_kernel_random_features(device: torch.device):
+    torch.manual_seed(0)
+    kernel = GaussianKernel(lengthscale=[0.5, 2.0],
+                            amplitude=1.5,
+                            device_name="cpu")
+    x = torch.randn((5, 2), dtype=torch.double, device=device)
+    frequencies = kernel.sample_frequencies(20000, 2)
+    phases = 2 * math.pi * torch.rand(20000, dtype=torch.double)
+    features = kernel.random_features(x, frequencies, phases)
+    assert features.shape == (5, 20000)
+    with torch.no_grad():
+        approx = features @ features.t()
+        exact = kernel(x, x)
+    assert torch.allclose(approx, exact, atol=0.1)
+
+
+def test_gaussian_kernel_gram_cache():
+    torch.manual_seed(0)
+    x = torch.randn(20, 2, dtype=torch.double)
+    for lengthscale in [1.5, [0.5, 2.0]]:
+        kernel = GaussianKernel(lengthscale=lengthscale,
+                                amplitude=2.0,
+                                device_name="cpu")
+        torch.testing.assert_close(kernel.gram(x, key=0), kernel(x, x))
+        cache = kernel._gram_cache
+        # Changing the lengthscale reuses the cached squared differences.
+        kernel.lengthscale = torch.tensor(0.7, dtype=torch.double)
+        torch.testing.assert_close(kernel.gram(x, key=0), kernel(x, x))
+        assert kernel._gram_cache is cache
+        # A new key recomputes them.
+        kernel.gram(x[:10], key=1)
+        assert kernel._gram_cache is not cache
+
+    kernel.gram(x, key=2).sum().backward()
+    assert kernel._free_lengthscale.grad is not None
+    kernel.clear_cache()
+    assert kernel._gram_cache is None
@@ -0,0 +1,157 @@
+import math
+
+import pytest
+import torch
+
+from pypolo.models.kernels import (GaussianKernel, MaternKernel,
+                                   PairwiseDistances, ProductKernel,
+                                   RationalQuadraticKernel, SumKernel)
+
+
+@pytest.fixture
+def inputs():
+    torch.manual_seed(0)
+    x1 = torch.randn(6, 2, dtype=torch.double)
+    x2 = torch.randn(4, 2, dtype=torch.double)
+    return x1, x2
+
+
+@pytest.mark.parametrize("nu", [0.5, 1.5, 2.5])
+def test_matern_kernel_forward(inputs, nu):
+    x1, x2 = inputs
+    kernel = MaternKernel(lengthscale=0.8,
+                          amplitude=2.0,
+                          device_name="cpu",
+                          nu=nu)
+    r = torch.cdist(x1, x2) / 0.8
+    if nu == 0.5:
+        expected = torch.exp(-r)
+    elif nu == 1.5:
+        expected = (1 + math.sqrt(3) * r) * torch.exp(-math.sqrt(3) * r)
+    else:
+        expected = (1 + math.sqrt(5) * r +
+                    5 * r.square() / 3) * torch.exp(-math.sqrt(5) * r)
+    torch.testing.assert_close(kernel(x1, x2), 2.0 * expected)
+    with torch.no_grad():
+        torch.testing.assert_close(kernel.diag(x1),
+                                   kernel(x1, x1).diag()[:, None])
+    # The gradient at zero distance is finite.
+    kernel.gram(x1, key=0).sum().backward()
+    assert torch.isfinite(kernel._free_lengthscale.grad).all()
+
+
+def test_matern_kernel_invalid_nu():
+    with pytest.raises(ValueError):
+        MaternKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu", nu=1)
+
+
+def test_rational_quadratic_kernel(inputs):
+    x1, x2 = inputs
+    kernel = RationalQuadraticKernel(lengthscale=[0.5, 2.0],
+                                     amplitude=1.5,
+                                     device_name="cpu",
+                                     alpha=3.0)
+    d2 = torch.cdist(x1 / torch.tensor([0.5, 2.0]),
+                     x2 / torch.tensor([0.5, 2.0])).square()
+    expected = 1.5 * (1 + d2 / 6.0).pow(-3.0)
+    torch.testing.assert_close(kernel(x1, x2), expected)
+    # Large alpha approaches the Gaussian kernel.
+    kernel.alpha = torch.tensor(1e6, dtype=torch.double)
+    assert kernel.hyper_version == 1
+    gaussian = GaussianKernel(lengthscale=[0.5, 2.0],
+                              amplitude=1.5,
+                              device_name="cpu")
+    torch.testing.assert_close(kernel(x1, x2),
+                               gaussian(x1, x2),
+                               rtol=1e-4,
+                               atol=1e-6)
+
+
+def test_composite_kernels(inputs):
+    x1, x2 = inputs
+    gaussian = GaussianKernel(lengthscale=1.0, amplitude=2.0,
+                              device_name="cpu")
+    matern = MaternKernel(lengthscale=0.5, amplitude=0.5, device_name="cpu")
+    total = SumKernel([gaussian, matern])
+    product = ProductKernel([gaussian, matern])
+    with torch.no_grad():
+        torch.testing.assert_close(total(x1, x2),
+                                   gaussian(x1, x2) + matern(x1, x2))
+        torch.testing.assert_close(product(x1, x2),
+                                   gaussian(x1, x2) * matern(x1, x2))
+        torch.testing.assert_close(total.diag(x1),
+                                   total(x1, x1).diag()[:, None])
+        torch.testing.assert_close(product.diag(x1),
+                                   product(x1, x1).diag()[:, None])
+        torch.testing.assert_close(total.gram(x1, key=0), total(x1, x1))
+    assert len(list(total.parameters())) == 4
+    version = total.hyper_version
+    matern.lengthscale = torch.tensor(0.7, dtype=torch.double)
+    assert total.hyper_version == version + 1
+    assert not hasattr(total, "lengthscale")
+    for kernel in [total, product]:
+        kernel.amplitude = torch.tensor(3.0, dtype=torch.double)
+        torch.testing.assert_close(
+            kernel.amplitude.detach(),
+            torch.tensor(3.0, dtype=torch.double),
+        )
+
+
+def test_composite_kernel_shares_ard_differences(inputs, monkeypatch):
+    x1, x2 = inputs
+    kernel = ProductKernel([
+        GaussianKernel(lengthscale=[1.0, 2.0],
+                       amplitude=1.0,
+                       device_name="cpu"),
+        MaternKernel(lengthscale=[0.5, 1.5], amplitude=1.0,
+                     device_name="cpu"),
+    ])
+    calls = []
+    cdist = torch.cdist
+
+    def counting_cdist(*args, **kwargs):
+        calls.append(1)
+        return cdist(*args, **kwargs)
+
+    monkeypatch.setattr(torch, "cdist", counting_cdist)
+    with torch.no_grad():
+        cov = kernel(x1, x2)
+    assert len(calls) == 0
+    monkeypatch.setattr(torch, "cdist", cdist)
+    with torch.no_grad():
+        expected = kernel.kernels[0](x1, x2) * kernel.kernels[1](x1, x2)
+    torch.testing.assert_close(cov, expected)
+
+
+def test_composite_kernel_computes_distances_once(inputs, monkeypatch):
+    x1, x2 = inputs
+    kernel = SumKernel([
+        GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu"),
+        MaternKernel(lengthscale=2.0, amplitude=1.0, device_name="cpu"),
+        RationalQuadraticKernel(lengthscale=0.5,
+                                amplitude=1.0,
+                                device_name="cpu"),
+    ])
+    calls = []
+    cdist = torch.cdist
+
+    def counting_cdist(*args, **kwargs):
+        calls.append(1)
+        return cdist(*args, **kwargs)
+
+    monkeypatch.setattr(torch, "cdist", counting_cdist)
+    kernel(x1, x2)
+    assert len(calls) == 1
+
+
+def test_pairwise_distances(inputs):
+    x1, x2 = inputs
+    lengthscale = torch.tensor([0.5, 2.0], dtype=torch.double)
+    expected = torch.cdist(x1 / lengthscale, x2 / lengthscale).square()
+    for cache_differences in [False, True]:
+        distances = PairwiseDistances(x1, x2, cache_differences)
+        torch.testing.assert_close(distances.squared(),
+                                   torch.cdist(x1, x2).square())
+        torch.testing.assert_close(distances.scaled_squared(lengthscale),
+                                   expected)
+        assert (distances._squared_diff is not None) == cache_differences
@@ -0,0 +1,43 @@
+import pytest
+import torch
+
+from pypolo.models.kernels import WendlandKernel
+from pypolo.utils import torch_utils
+
+
+@pytest.fixture(scope="module")
+def kernel() -> WendlandKernel:
+    return WendlandKernel(lengthscale=1.5, amplitude=2.0, device_name="cpu")
+
+
+def test_wendland_kernel_compact_support(kernel: WendlandKernel):
+    x1 = torch.tensor([[0.0, 0.0]], dtype=torch.double)
+    x2 = torch.tensor([[0.0, 0.0], [1.0, 0.0], [1.5, 0.0], [3.0, 0.0]],
+                      dtype=torch.double)
+    cov = kernel(x1, x2)
+    assert cov[0, 0].item() == pytest.approx(2.0)
+    assert 0.0 < cov[0, 1].item() < 2.0
+    assert cov[0, 2].item() == pytest.approx(0.0)
+    assert cov[0, 3].item() == 0.0
+
+
+def test_wendland_kernel_sparse_forward(kernel: WendlandKernel):
+    torch.manual_seed(0)
+    x1 = 10 * torch.rand(200, 2, dtype=torch.double)
+    x2 = 10 * torch.rand(150, 2, dtype=torch.double)
+    sparse = kernel.sparse_forward(x1, x2)
+    dense = kernel(x1, x2)
+    assert sparse._nnz() == int((dense > 0).sum())
+    torch.testing.assert_close(sparse.to_dense(), dense)
+
+
+def test_radius_neighbors_matches_brute_force():
+    torch.manual_seed(0)
+    x1 = 5 * torch.rand(100, 3, dtype=torch.double)
+    x2 = 5 * torch.rand(80, 3, dtype=torch.double)
+    rows, cols = torch_utils.radius_neighbors(x1, x2, 1.0)
+    expected = torch.cdist(x1, x2) < 1.0
+    found = torch.zeros_like(expected)
+    found[rows, cols] = True
+    assert torch.equal(found, expected)
+    assert len(rows) == int(expected.sum())
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import BatchedGPRModel, GPRModel
+from pypolo.models.kernels import GaussianKernel, MaternKernel, SumKernel
+
+NOISES = [0.01, 0.1, 0.05]
+
+
+@pytest.fixture
+def data():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    x_train, y_train = [], []
+    for num_train in [5, 12, 8]:
+        x = np.random.uniform(-5, 5, size=(num_train, 1))
+        x_train.append(x)
+        y_train.append(np.sin(x))
+    return x_train, y_train
+
+
+def make_kernels():
+    return [
+        GaussianKernel(lengthscale=0.5, amplitude=1.0, device_name="cpu"),
+        MaternKernel(lengthscale=1.0, amplitude=2.0, device_name="cpu"),
+        SumKernel([
+            GaussianKernel(lengthscale=2.0, amplitude=0.5, device_name="cpu"),
+            MaternKernel(lengthscale=0.5, amplitude=0.1, device_name="cpu"),
+        ]),
+    ]
+
+
+def make_batched_model() -> BatchedGPRModel:
+    return BatchedGPRModel(device_name="cpu",
+                           kernels=make_kernels(),
+                           noise=NOISES)
+
+
+def test_matches_independent_models(data):
+    x_train, y_train = data
+    batched = make_batched_model()
+    batched.learn(x_train, y_train, num_iter=0, verbose=False)
+    x_test = np.linspace(-5, 5, num=7).reshape(-1, 1)
+    means, stds = batched.predict(x_test)
+    loss = 0.0
+    for b, kernel in enumerate(make_kernels()):
+        model = GPRModel(device_name="cpu", kernel=kernel, noise=NOISES[b])
+        model.learn(x_train[b], y_train[b], num_iter=0, verbose=False)
+        mean, std = model.predict(x_test)
+        np.testing.assert_allclose(means[b], mean, atol=1e-8)
+        np.testing.assert_allclose(stds[b], std, atol=1e-8)
+        loss += model._compute_loss().item()
+    # The padded entries do not change the sum of the losses.
+    np.testing.assert_allclose(batched._compute_loss().item(), loss)
+
+
+def test_learn_and_modes(data):
+    x_train, y_train = data
+    batched = make_batched_model()
+    batched.learn(x_train, y_train, num_iter=0, verbose=False)
+    initial_loss = batched._compute_loss().item()
+    batched.learn([None, None, None], [None, None, None],
+                  num_iter=20,
+                  verbose=False)
+    assert batched._compute_loss().item() < initial_loss
+
+    x_test = [np.zeros((2, 1)), np.zeros((4, 1)), np.zeros((3, 1))]
+    mean, std = batched.predict(x_test, mode="mean")
+    assert std is None
+    assert [m.shape for m in mean] == [(2, 1), (4, 1), (3, 1)]
+    mean, std = batched.predict(x_test, mode="var")
+    assert mean is None
+
+    with pytest.raises(ValueError):
+        batched.predict(x_test[:2])
+
+
+def test_predict_without_data():
+    with pytest.raises(ValueError):
+        make_batched_model().predict(np.zeros((2, 1)))
+
+
+def test_save_and_load(data, tmp_path):
+    x_train, y_train = data
+    model = make_batched_model()
+    model.learn([x_train[0], None, x_train[2]], [y_train[0], None, y_train[2]],
+                num_iter=5,
+                verbose=False)
+    x_test = np.linspace(-5, 5, num=7).reshape(-1, 1)
+    means, stds = model.predict(x_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    restored = make_batched_model()
+    restored.load(str(path))
+    assert restored.num_train == [5, 0, 8]
+    loaded_means, loaded_stds = restored.predict(x_test)
+    for b in range(3):
+        np.testing.assert_allclose(loaded_means[b], means[b])
+        np.testing.assert_allclose(loaded_stds[b], stds[b])
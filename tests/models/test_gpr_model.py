@@ -2,8 +2,8 @@ import numpy as np
 import pytest
 import torch
 
-from pypolo.models import GPRModel
-from pypolo.models.kernels import GaussianKernel
+from pypolo.models import GPRModel, gpr_model
+from pypolo.models.kernels import GaussianKernel, WendlandKernel
 from matplotlib import pyplot as plt
 import pyvista as pv
 
@@ -60,3 +60,519 @@ def test_predict(model, verbose, render):
         plt.show(block=False)
         plt.pause(2)
         plt.close()
+
+
+def test_posterior_cache(model):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+
+    # Repeated predictions reuse the same factorization.
+    mean, std = model.predict(X_test)
+    L, _ = model._cache
+    mean_again, std_again = model.predict(X_test)
+    assert model._cache[0] is L
+    np.testing.assert_allclose(mean, mean_again)
+    np.testing.assert_allclose(std, std_again)
+
+    # Hyper-parameter setters invalidate the cache.
+    model.kernel.lengthscale = torch.tensor(1.0, dtype=torch.double)
+    model.predict(X_test)
+    assert model._cache[0] is not L
+    L = model._cache[0]
+    model.noise = torch.tensor(0.1, dtype=torch.double)
+    model.predict(X_test)
+    assert model._cache[0] is not L
+
+    # New data invalidates the cache.
+    L = model._cache[0]
+    model.learn(X_train[:2], y_train[:2], num_iter=0, verbose=False)
+    model.predict(X_test)
+    assert model._cache[0].shape == (22, 22)
+
+
+def test_incremental_conditioning():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(30, 1))
+    y_train = np.sin(X_train)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    models = []
+    for incremental in [False, True]:
+        kernel = GaussianKernel(lengthscale=1.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        model = GPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=0.01,
+                         incremental=incremental)
+        model.learn(X_train[:20], y_train[:20], num_iter=0, verbose=False)
+        model.predict(X_test)
+        model.learn(X_train[20:], y_train[20:], num_iter=0, verbose=False)
+        models.append(model)
+    full, incremental = models
+    # The factor is extended when data is added rather than on prediction.
+    L_extended = incremental._cache[0]
+    assert L_extended.shape == (30, 30)
+    mean_full, std_full = full.predict(X_test)
+    mean_incr, std_incr = incremental.predict(X_test)
+    assert incremental._cache[0] is L_extended
+    np.testing.assert_allclose(full._cache[0].numpy(),
+                               L_extended.numpy(),
+                               atol=1e-8)
+    np.testing.assert_allclose(mean_full, mean_incr, atol=1e-8)
+    np.testing.assert_allclose(std_full, std_incr, atol=1e-8)
+
+    # Optimizing right after adding data would discard the extension.
+    cache = incremental._cache
+    incremental.learn(X_train[:2], y_train[:2], num_iter=1, verbose=False)
+    assert incremental._cache is cache
+
+
+def test_chunked_predict(model):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    X_test = np.linspace(-5, 5, num=101).reshape(-1, 1)
+    mean, std = model.predict(X_test)
+    mean_chunked, std_chunked = model.predict(X_test, chunk_size=10)
+    np.testing.assert_allclose(mean, mean_chunked)
+    np.testing.assert_allclose(std, std_chunked)
+    # Room for about 7 test inputs with 20 training inputs in float64.
+    budget = 2 * 20 * 8 * 7
+    mean_budget, std_budget = model.predict(X_test, memory_budget=budget)
+    assert model._budget_to_chunk_size(budget) == 7
+    np.testing.assert_allclose(mean, mean_budget)
+    np.testing.assert_allclose(std, std_budget)
+    sizes = []
+    for index, mean_chunk, std_chunk in model.predict_chunks(X_test, 25):
+        np.testing.assert_allclose(mean[index], mean_chunk)
+        np.testing.assert_allclose(std[index], std_chunk)
+        sizes.append(len(mean_chunk))
+    assert sizes == [25, 25, 25, 25, 1]
+
+
+def test_predict_modes(model):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    X_test = np.linspace(-5, 5, num=11).reshape(-1, 1)
+    mean, std = model.predict(X_test)
+    mean_only, no_std = model.predict(X_test, mode="mean")
+    no_mean, std_only = model.predict(X_test, mode="var")
+    assert no_std is None
+    assert no_mean is None
+    np.testing.assert_allclose(mean, mean_only)
+    np.testing.assert_allclose(std, std_only)
+    _, std_latent = model.predict(X_test, mode="var", noise_free=True)
+    np.testing.assert_allclose(std_latent**2 + model.noise.item(), std**2)
+    _, std_chunked = model.predict(X_test, mode="var", chunk_size=3)
+    np.testing.assert_allclose(std, std_chunked)
+    with pytest.raises(ValueError):
+        model.predict(X_test, mode="std")
+
+
+def test_cg_solver():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(-5, 5, size=(50, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(50, 1))
+    X_test = np.linspace(-5, 5, num=20).reshape(-1, 1)
+    models = []
+    for solver in ["cholesky", "cg"]:
+        kernel = GaussianKernel(lengthscale=1.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        model = GPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=0.1,
+                         solver=solver,
+                         num_probes=100,
+                         tile_size=16)
+        model.learn(X_train, y_train, num_iter=0, verbose=False)
+        models.append(model)
+    exact, iterative = models
+    mean_exact, std_exact = exact.predict(X_test)
+    mean_iter, std_iter = iterative.predict(X_test)
+    np.testing.assert_allclose(mean_exact, mean_iter, atol=1e-4)
+    np.testing.assert_allclose(std_exact, std_iter, atol=1e-4)
+    # Stochastic Lanczos quadrature approximates the log-determinant.
+    loss_exact = exact._compute_loss()
+    loss_iter = iterative._compute_loss()
+    assert loss_iter.item() == pytest.approx(loss_exact.item(), rel=0.05)
+    # Gradients of the surrogate approximate the exact gradients.
+    loss_exact.backward()
+    loss_iter.backward()
+    grad_exact = exact._free_noise.grad.item()
+    grad_iter = iterative._free_noise.grad.item()
+    assert grad_iter == pytest.approx(grad_exact, rel=0.2, abs=0.5)
+    with pytest.raises(ValueError):
+        GPRModel(device_name="cpu",
+                 kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                 noise=0.1,
+                 solver="lu")
+
+
+def test_streaming_budget():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(40, 1))
+    y_train = np.sin(X_train)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    model = GPRModel(device_name="cpu",
+                     kernel=kernel,
+                     noise=0.01,
+                     max_num_train=15)
+    model.learn(X_train[:10], y_train[:10], num_iter=0, verbose=False)
+    model.predict(X_test)
+    for i in range(10, 40, 3):
+        model.learn(X_train[i:i + 3],
+                    y_train[i:i + 3],
+                    num_iter=0,
+                    verbose=False)
+    assert len(model.x_train) == 15
+    np.testing.assert_array_equal(model.x_train.numpy(), X_train[-15:])
+    np.testing.assert_array_equal(model.y_train.numpy(), y_train[-15:])
+    L_updated = model._cache[0]
+    mean, std = model.predict(X_test)
+    # The factor was maintained by updates rather than refactorization.
+    assert model._cache[0] is L_updated
+    reference = GPRModel(device_name="cpu",
+                         kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                         noise=0.01)
+    reference.learn(X_train[-15:], y_train[-15:], num_iter=0, verbose=False)
+    mean_ref, std_ref = reference.predict(X_test)
+    np.testing.assert_allclose(L_updated.numpy(),
+                               reference._cache[0].numpy(),
+                               atol=1e-8)
+    np.testing.assert_allclose(mean, mean_ref, atol=1e-6)
+    np.testing.assert_allclose(std, std_ref, atol=1e-6)
+
+
+def test_lbfgs_early_stopping():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(30, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(30, 1))
+    kernel = GaussianKernel(lengthscale=3.0, amplitude=1.0, device_name="cpu")
+    model = GPRModel(device_name="cpu",
+                     kernel=kernel,
+                     noise=0.01,
+                     optimizer="lbfgs")
+    model._add_data(X_train, y_train)
+    initial_loss = model._compute_loss().item()
+    num_run = model._optimize(num_iter=200, verbose=False, tol=1e-6)
+    assert 0 < num_run < 200
+    # The distances cached for the iterations are released afterwards.
+    assert kernel._gram_cache is None
+    assert model._compute_loss().item() < initial_loss
+
+    with pytest.raises(ValueError):
+        GPRModel(device_name="cpu",
+                 kernel=kernel,
+                 noise=0.01,
+                 optimizer="sgd")
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_multi_restart(num_workers):
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(-5, 5, size=(30, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(30, 1))
+    losses = []
+    for num_restarts in [1, 4]:
+        kernel = GaussianKernel(lengthscale=3.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        model = GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+        model.learn(X_train,
+                    y_train,
+                    num_iter=50,
+                    verbose=False,
+                    num_restarts=num_restarts,
+                    num_workers=num_workers)
+        with torch.no_grad():
+            losses.append(model._compute_loss().item())
+    # The first restart starts from the same initialization as a single run.
+    assert losses[1] <= losses[0] + 1e-6
+
+    with pytest.raises(ValueError):
+        model.learn(X_train, y_train, num_iter=1, num_restarts=0)
+
+
+def test_failed_restarts_keep_parameters(monkeypatch):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    model = GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+    state = {k: v.clone() for k, v in model.state_dict().items()}
+
+    def failing_restart(restart, num_iter, tol, verbose=False):
+        with torch.no_grad():
+            for param in restart.parameters():
+                param.fill_(float("nan"))
+        return float("inf"), restart.state_dict(), num_iter
+
+    monkeypatch.setattr(gpr_model, "_optimize_restart", failing_restart)
+    num_run = model.learn(X_train,
+                          y_train,
+                          num_iter=5,
+                          verbose=False,
+                          num_restarts=3,
+                          num_workers=1)
+    assert num_run == 15
+    for name, value in model.state_dict().items():
+        torch.testing.assert_close(value, state[name])
+
+
+@pytest.mark.parametrize("subset", ["random", "spatial"])
+def test_subset_learning(subset):
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(-5, 5, size=(200, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(200, 1))
+    probe = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(3.0, 1.0, "cpu"),
+                     noise=0.5)
+    probe._add_data(X_train, y_train)
+    with torch.no_grad():
+        initial_loss = probe._compute_loss().item()
+        # The full subset recovers the exact loss.
+        np.testing.assert_allclose(
+            probe._compute_subset_loss(torch.arange(200)).item(),
+            initial_loss)
+    indices = probe._sample_subset(40, subset)
+    assert len(indices.unique()) == 40
+
+    kernel = GaussianKernel(lengthscale=3.0, amplitude=1.0, device_name="cpu")
+    model = GPRModel(device_name="cpu", kernel=kernel, noise=0.5,
+                     lr_hyper=0.05)
+    model.learn(X_train,
+                y_train,
+                num_iter=50,
+                verbose=False,
+                subset_size=40,
+                subset=subset)
+    with torch.no_grad():
+        assert model._compute_loss().item() < initial_loss
+
+    with pytest.raises(ValueError):
+        model.learn(X_train, y_train, num_iter=1, subset_size=0)
+    with pytest.raises(ValueError):
+        model.learn(X_train, y_train, num_iter=1, subset_size=10,
+                    num_restarts=2)
+    with pytest.raises(ValueError):
+        model.learn(X_train, y_train, num_iter=1, subset_size=10, tol=1e-3)
+    lbfgs = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(3.0, 1.0, "cpu"),
+                     noise=0.5,
+                     optimizer="lbfgs")
+    with pytest.raises(ValueError):
+        lbfgs.learn(X_train, y_train, num_iter=1, subset_size=10)
+
+
+def test_multi_output():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    Y_train = np.hstack([np.sin(X_train), np.cos(X_train)])
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+
+    def make_model():
+        kernel = GaussianKernel(lengthscale=1.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        return GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+
+    model = make_model()
+    model.learn(X_train, Y_train, num_iter=0, verbose=False)
+    mean, std = model.predict(X_test)
+    assert mean.shape == (10, 2)
+    assert std.shape == (10, 1)
+    loss = model._compute_loss().item()
+    total_loss = 0.0
+    for channel in range(2):
+        single = make_model()
+        single.learn(X_train, Y_train[:, [channel]], num_iter=0, verbose=False)
+        single_mean, single_std = single.predict(X_test)
+        np.testing.assert_allclose(mean[:, [channel]], single_mean)
+        np.testing.assert_allclose(std, single_std)
+        total_loss += single._compute_loss().item()
+    np.testing.assert_allclose(loss, total_loss)
+
+
+def test_precision():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(50, 1))
+    y_train = np.sin(X_train)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    predictions = {}
+    for precision in ["float64", "float32", "mixed"]:
+        kernel = GaussianKernel(lengthscale=1.0,
+                                amplitude=1.0,
+                                device_name="cpu",
+                                precision=precision)
+        model = GPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=0.01,
+                         precision=precision)
+        model.learn(X_train, y_train, num_iter=0, verbose=False)
+        predictions[precision] = model.predict(X_test)
+        L, iK_y = model._cache
+        if precision == "mixed":
+            assert L.dtype == torch.float
+            assert iK_y.dtype == torch.double
+        else:
+            assert L.dtype == model.dtype
+    mean, std = predictions["float64"]
+    # Iterative refinement recovers the float64 solution.
+    np.testing.assert_allclose(predictions["mixed"][0], mean, atol=1e-8)
+    np.testing.assert_allclose(predictions["mixed"][1], std, atol=1e-3)
+    np.testing.assert_allclose(predictions["float32"][0], mean, atol=1e-2)
+
+    kernel = GaussianKernel(lengthscale=1.0,
+                            amplitude=1.0,
+                            device_name="cpu",
+                            precision="float32")
+    with pytest.raises(ValueError):
+        GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+
+
+def test_mixed_precision_variance_is_refined():
+    np.random.seed(123)
+    X_train = np.random.uniform(-5, 5, size=(300, 1))
+    y_train = np.sin(X_train)
+    X_test = np.random.uniform(-5, 5, size=(100, 1))
+    predictions = {}
+    for precision in ["float64", "mixed"]:
+        kernel = GaussianKernel(lengthscale=1.0,
+                                amplitude=1.0,
+                                device_name="cpu",
+                                precision=precision)
+        model = GPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=1e-4,
+                         precision=precision)
+        model.learn(X_train, y_train, num_iter=0, verbose=False)
+        predictions[precision] = model.predict(X_test, noise_free=True)
+    mean, std = predictions["float64"]
+    mixed_mean, mixed_std = predictions["mixed"]
+    assert np.all(np.isfinite(mixed_std))
+    np.testing.assert_allclose(mixed_mean, mean, atol=1e-4)
+    np.testing.assert_allclose(mixed_std, std, atol=1e-2)
+
+
+def test_save_and_load(model, tmp_path):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=10, verbose=False)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    mean, std = model.predict(X_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    restored = GPRModel(device_name="cpu", kernel=kernel, noise=0.1)
+    restored.load(str(path))
+    L, _ = restored._cache
+    loaded_mean, loaded_std = restored.predict(X_test)
+    # The loaded factorization answers the prediction without refactorizing.
+    assert restored._cache[0] is L
+    np.testing.assert_allclose(loaded_mean, mean)
+    np.testing.assert_allclose(loaded_std, std)
+
+    # Learning continues from the restored data.
+    restored.learn(X_train[:2], y_train[:2], num_iter=0, verbose=False)
+    assert restored.x_train.shape == (22, 1)
+
+
+def test_condition_on(model):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    X_fantasy = np.random.uniform(-5, 5, size=(3, 4, 1))
+    y_fantasy = np.cos(X_fantasy)
+    posterior = model.condition_on(X_fantasy, y_fantasy)
+    mean, std = posterior.predict(X_test)
+    assert mean.shape == (3, 10, 1)
+    assert std.shape == (3, 10, 1)
+    # The parent model is not modified.
+    assert model.x_train.shape == (20, 1)
+    for b in range(3):
+        kernel = GaussianKernel(lengthscale=3.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        refit = GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+        refit.learn(np.vstack([X_train, X_fantasy[b]]),
+                    np.vstack([y_train, y_fantasy[b]]),
+                    num_iter=0,
+                    verbose=False)
+        refit_mean, refit_std = refit.predict(X_test)
+        np.testing.assert_allclose(mean[b], refit_mean, atol=1e-6)
+        np.testing.assert_allclose(std[b], refit_std, atol=1e-6)
+
+    # Without fantasy outputs, only the variance changes.
+    mean, std = model.condition_on(X_fantasy[0]).predict(X_test)
+    parent_mean, parent_std = model.predict(X_test)
+    np.testing.assert_allclose(mean, parent_mean)
+    assert np.all(std <= parent_std + 1e-12)
+
+    # Batched test inputs match the shared ones.
+    batched_mean, batched_std = posterior.predict(np.stack([X_test] * 3))
+    np.testing.assert_allclose(batched_mean, posterior.predict(X_test)[0])
+    np.testing.assert_allclose(batched_std, posterior.predict(X_test)[1])
+
+    # The posterior refuses to predict once the parent has changed.
+    model.learn(X_train[:2], y_train[:2], num_iter=0, verbose=False)
+    with pytest.raises(ValueError):
+        posterior.predict(X_test)
+
+
+def test_sample_posterior(model):
+    X_train = np.random.uniform(-5, 5, size=(20, 1))
+    y_train = np.sin(X_train)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    samples = model.sample_posterior(X_test, num_samples=2000, seed=0)
+    assert samples.shape == (2000, 10, 1)
+    mean, std = model.predict(X_test, noise_free=True)
+    np.testing.assert_allclose(samples.mean(0), mean, atol=0.05)
+    np.testing.assert_allclose(samples.std(0), std, atol=0.05)
+
+    # The same seed evaluates the same functions at other inputs.
+    subset = model.sample_posterior(X_test[::2], num_samples=2000, seed=0)
+    np.testing.assert_allclose(subset, samples[:, ::2])
+
+
+def test_sparse_solver():
+    np.random.seed(123)
+    X_train = np.random.uniform(0, 20, size=(200, 2))
+    y_train = np.sin(0.5 * X_train[:, :1]) + np.random.normal(
+        0, 0.1, size=(200, 1))
+    X_test = np.random.uniform(0, 20, size=(30, 2))
+    predictions = []
+    for solver in ["cholesky", "sparse"]:
+        kernel = WendlandKernel(lengthscale=3.0,
+                                amplitude=1.0,
+                                device_name="cpu")
+        model = GPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=0.01,
+                         solver=solver,
+                         cg_tol=1e-10)
+        model.learn(X_train, y_train, num_iter=0, verbose=False)
+        predictions.append(model.predict(X_test))
+    np.testing.assert_allclose(predictions[1][0],
+                               predictions[0][0],
+                               atol=1e-6)
+    np.testing.assert_allclose(predictions[1][1],
+                               predictions[0][1],
+                               atol=1e-6)
+
+    model.learn(X_train[:10], y_train[:10], num_iter=2, verbose=False)
+
+    with pytest.raises(ValueError):
+        GPRModel(device_name="cpu",
+                 kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                 noise=0.01,
+                 solver="sparse")
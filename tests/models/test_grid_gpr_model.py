@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import GPRModel, GridGPRModel
+from pypolo.models.kernels import GaussianKernel, MaternKernel
+
+
+@pytest.fixture
+def data():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(0, 10, size=(100, 2))
+    y_train = np.sin(0.5 * X_train[:, :1]) * np.cos(0.5 * X_train[:, 1:])
+    X_test = np.random.uniform(0, 10, size=(50, 2))
+    return X_train, y_train, X_test
+
+
+def make_model(num_variance_samples: int = 64) -> GridGPRModel:
+    return GridGPRModel(device_name="cpu",
+                        kernel=GaussianKernel(2.0, 1.0, "cpu"),
+                        noise=0.01,
+                        workspace=[0.0, 0.0, 10.0, 10.0],
+                        grid_shape=(50, 40),
+                        num_variance_samples=num_variance_samples)
+
+
+def test_approximates_exact_gp(data):
+    X_train, y_train, X_test = data
+    model = make_model(num_variance_samples=2000)
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    exact = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(2.0, 1.0, "cpu"),
+                     noise=0.01)
+    exact.learn(X_train, y_train, num_iter=0, verbose=False)
+    mean, std = model.predict(X_test)
+    exact_mean, exact_std = exact.predict(X_test)
+    np.testing.assert_allclose(mean, exact_mean, atol=0.02)
+    np.testing.assert_allclose(std, exact_std, atol=0.05)
+
+
+def test_learn_and_predict_grid(data):
+    X_train, y_train, _ = data
+    model = make_model()
+    model.learn(X_train, y_train, num_iter=5, verbose=False)
+    mean, std = model.predict_grid()
+    assert mean.shape == (40, 50)
+    assert std.shape == (40, 50)
+    assert np.all(std > 0)
+    mean, std = model.predict_grid(mode="mean")
+    assert std is None
+
+    with pytest.raises(ValueError):
+        model.learn(np.zeros((2, 3)), np.zeros((2, 1)), num_iter=0)
+
+
+def test_rejects_non_gaussian_kernels():
+    for kernel in [
+            MaternKernel(2.0, 1.0, "cpu"),
+            GaussianKernel([1.0, 2.0, 3.0], 1.0, "cpu"),
+    ]:
+        with pytest.raises(ValueError):
+            GridGPRModel(device_name="cpu",
+                         kernel=kernel,
+                         noise=0.01,
+                         workspace=[0.0, 0.0, 10.0, 10.0],
+                         grid_shape=(50, 40))
+
+
+def test_variance_samples_are_lazy_and_seeded(data):
+    X_train, y_train, X_test = data
+    model = make_model()
+    model.learn(X_train, y_train, num_iter=0, verbose=False)
+    model.predict(X_test, mode="mean")
+    assert model._sample_cache is None
+    state = torch.get_rng_state()
+    _, std = model.predict(X_test)
+    assert torch.equal(torch.get_rng_state(), state)
+    model._sample_cache = None
+    _, std_again = model.predict(X_test)
+    np.testing.assert_allclose(std_again, std)
+
+
+def test_save_and_load(data, tmp_path):
+    X_train, y_train, X_test = data
+    model = make_model()
+    model.learn(X_train, y_train, num_iter=2, verbose=False)
+    mean, std = model.predict(X_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    restored = make_model()
+    restored.load(str(path))
+    loaded_mean, loaded_std = restored.predict(X_test)
+    np.testing.assert_allclose(loaded_mean, mean)
+    # The variance samples are redrawn from the same seed.
+    np.testing.assert_allclose(loaded_std, std, rtol=1e-6)
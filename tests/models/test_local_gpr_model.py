@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import GPRModel, LocalGPRModel
+from pypolo.models.kernels import GaussianKernel
+
+
+def make_tile_model() -> GPRModel:
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    return GPRModel(device_name="cpu", kernel=kernel, noise=0.01)
+
+
+@pytest.fixture
+def model() -> LocalGPRModel:
+    np.random.seed(123)
+    torch.manual_seed(123)
+    return LocalGPRModel(device_name="cpu",
+                         workspace=[0.0, 0.0, 10.0, 10.0],
+                         num_tiles=(2, 2),
+                         model_factory=make_tile_model,
+                         overlap=0.2)
+
+
+def field(x: np.ndarray) -> np.ndarray:
+    return np.sin(0.5 * x[:, :1]) * np.cos(0.5 * x[:, 1:])
+
+
+def test_weights_are_partition_of_unity(model: LocalGPRModel):
+    x = np.random.uniform(-1, 11, size=(500, 2))
+    weights = model._compute_weights(x)
+    assert weights.shape == (500, 4)
+    assert np.all(weights >= 0.0)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    # Inputs deep inside a tile only belong to that tile.
+    weights = model._compute_weights(np.array([[2.5, 7.5]]))
+    np.testing.assert_allclose(weights, [[0.0, 0.0, 1.0, 0.0]])
+
+
+def test_only_tiles_with_new_data_are_updated(model: LocalGPRModel, verbose):
+    x_new = np.random.uniform(0, 4, size=(30, 2))
+    model.learn(x_new, field(x_new), num_iter=10, verbose=verbose)
+    assert model.models[0] is not None
+    assert all(tile is None for tile in model.models[1:])
+    x_new = np.random.uniform(6, 10, size=(30, 2))
+    model.learn(x_new, field(x_new), num_iter=10, verbose=verbose)
+    assert len(model.models[0].x_train) == 30
+    assert len(model.models[3].x_train) == 30
+
+
+def test_predict(model: LocalGPRModel, verbose):
+    x_train = np.random.uniform(0, 10, size=(400, 2))
+    model.learn(x_train, field(x_train), num_iter=0, verbose=verbose)
+    x_test = np.random.uniform(0, 10, size=(100, 2))
+    mean, std = model.predict(x_test)
+    assert mean.shape == (100, 1)
+    assert std.shape == (100, 1)
+    assert np.all(std > 0.0)
+    rmse = np.sqrt(np.mean(np.square(mean - field(x_test))))
+    assert rmse < 0.05
+    mean_only, no_std = model.predict(x_test, mode="mean")
+    assert no_std is None
+    np.testing.assert_allclose(mean, mean_only)
+
+
+def test_predict_prior_without_data(model: LocalGPRModel):
+    mean, std = model.predict(np.array([[5.0, 5.0]]))
+    np.testing.assert_allclose(mean, 0.0)
+    np.testing.assert_allclose(std, np.sqrt(1.01), rtol=1e-5)
+
+
+def test_save_and_load(model: LocalGPRModel, tmp_path):
+    x_train = np.random.uniform(0, 4, size=(30, 2))
+    model.learn(x_train, field(x_train), num_iter=5, verbose=False)
+    x_test = np.random.uniform(0, 10, size=(20, 2))
+    mean, std = model.predict(x_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    restored = LocalGPRModel(device_name="cpu",
+                             workspace=[0.0, 0.0, 10.0, 10.0],
+                             num_tiles=(2, 2),
+                             model_factory=make_tile_model,
+                             overlap=0.2)
+    restored.load(str(path))
+    assert restored.models[0] is not None
+    assert all(tile is None for tile in restored.models[1:])
+    loaded_mean, loaded_std = restored.predict(x_test)
+    np.testing.assert_allclose(loaded_mean, mean)
+    np.testing.assert_allclose(loaded_std, std)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import MultiOutputGPRModel
+from pypolo.models.kernels import GaussianKernel
+
+
+@pytest.fixture
+def model() -> MultiOutputGPRModel:
+    np.random.seed(123)
+    torch.manual_seed(123)
+    kernels = [
+        GaussianKernel(lengthscale=lengthscale,
+                       amplitude=1.0,
+                       device_name="cpu") for lengthscale in [1.0, 2.0]
+    ]
+    return MultiOutputGPRModel(device_name="cpu", kernels=kernels, noise=0.01)
+
+
+def test_per_channel_hyper_parameters(model):
+    X_train = np.random.uniform(-5, 5, size=(30, 1))
+    Y_train = np.hstack([np.sin(X_train), np.sin(0.2 * X_train)])
+    model.learn(X_train, Y_train, num_iter=50, verbose=False)
+    assert model.noise.shape == (2, 1, 1)
+    lengthscales = [kernel.lengthscale for kernel in model.kernels]
+    assert lengthscales[0] != lengthscales[1]
+
+    X_test = np.linspace(-5, 5, num=10).reshape(-1, 1)
+    mean, std = model.predict(X_test)
+    assert mean.shape == (10, 2)
+    assert std.shape == (10, 2)
+    mean, std = model.predict(X_test, mode="var")
+    assert mean is None
+
+    with pytest.raises(ValueError):
+        model.learn(X_train, Y_train[:, :1], num_iter=0, verbose=False)
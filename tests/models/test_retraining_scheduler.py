@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pypolo.models import GPRModel, RetrainingScheduler
+from pypolo.models.kernels import GaussianKernel
+
+
+def make_model() -> GPRModel:
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    return GPRModel(device_name="cpu",
+                    kernel=kernel,
+                    noise=0.01,
+                    incremental=True)
+
+
+def stream(num_steps: int):
+    np.random.seed(123)
+    for _ in range(num_steps):
+        x = np.random.uniform(-5, 5, size=(1, 1))
+        yield x, np.sin(x) + np.random.normal(0, 0.1, size=(1, 1))
+
+
+def test_every_trigger():
+    model = make_model()
+    model.scheduler = RetrainingScheduler(every=5)
+    retrained = [
+        model.update(x, y, num_iter=10, verbose=False) for x, y in stream(20)
+    ]
+    # The first step always retrains, then every fifth sample.
+    assert np.flatnonzero(retrained).tolist() == [0, 5, 10, 15]
+    assert len(model.x_train) == 20
+    assert model.scheduler.report() == {
+        "num_steps": 20,
+        "num_retrains": 4,
+        "num_iterations": 40,
+        "num_saved_iterations": 160,
+        "num_saved_factorizations": 160,
+    }
+
+
+def test_savings_follow_early_stopping():
+    model = make_model()
+    model.scheduler = RetrainingScheduler(every=5)
+    for x, y in stream(5):
+        model.update(x, y, num_iter=100, verbose=False, tol=0.1)
+    report = model.scheduler.report()
+    # Only the first step retrains, and it stops early.
+    assert report["num_retrains"] == 1
+    assert report["num_iterations"] < 100
+    assert report["num_saved_iterations"] == 4 * report["num_iterations"]
+
+
+def test_growth_ratio_trigger():
+    model = make_model()
+    model.scheduler = RetrainingScheduler(growth_ratio=2.0)
+    retrained = [
+        model.update(x, y, num_iter=1, verbose=False) for x, y in stream(20)
+    ]
+    # Retrains at 1, 2, 4, 8, and 16 samples.
+    assert np.flatnonzero(retrained).tolist() == [0, 1, 3, 7, 15]
+
+
+def test_nll_drift_trigger():
+    model = make_model()
+    model.scheduler = RetrainingScheduler(nll_drift=1.0)
+    x = np.linspace(-5, 5, num=30).reshape(-1, 1)
+    assert model.update(x, np.sin(x), num_iter=1, verbose=False)
+    x_new = np.array([[0.1]])
+    assert not model.update(x_new, np.sin(x_new), num_iter=1, verbose=False)
+    assert not model.update(x_new, np.sin(x_new), num_iter=1, verbose=False)
+    # Data the model explains poorly fire the trigger.
+    assert model.update(x_new, np.sin(x_new) + 5.0, num_iter=1, verbose=False)
+
+
+def test_without_scheduler_and_invalid_triggers():
+    model = make_model()
+    for x, y in stream(2):
+        assert model.update(x, y, num_iter=1, verbose=False)
+    with pytest.raises(ValueError):
+        RetrainingScheduler()
+    with pytest.raises(ValueError):
+        RetrainingScheduler(every=0)
+    with pytest.raises(ValueError):
+        RetrainingScheduler(growth_ratio=1.0)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import GPRModel, RFFModel
+from pypolo.models.kernels import GaussianKernel
+
+
+@pytest.fixture
+def data():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(-5, 5, size=(40, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(40, 1))
+    X_test = np.linspace(-5, 5, num=50).reshape(-1, 1)
+    return X_train, y_train, X_test
+
+
+def test_predict(data, verbose):
+    X_train, y_train, X_test = data
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    model = RFFModel(device_name="cpu",
+                     kernel=kernel,
+                     noise=0.01,
+                     num_features=256)
+    model.learn(X_train, y_train, num_iter=100, verbose=verbose)
+    y_pred, y_std = model.predict(X_test)
+    assert y_pred.shape == (50, 1)
+    assert y_std.shape == (50, 1)
+    assert np.all(y_std >= 0)
+    rmse = np.sqrt(np.mean((y_pred.squeeze() - np.sin(X_test.squeeze()))**2))
+    assert rmse < 0.2
+
+
+def test_online_updates_match_batch(data):
+    X_train, y_train, X_test = data
+    torch.manual_seed(0)
+    online = RFFModel(device_name="cpu",
+                      kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                      noise=0.01,
+                      num_features=64)
+    online.learn(X_train[:10], y_train[:10], num_iter=0, verbose=False)
+    online.predict(X_test)
+    for i in range(10, 40):
+        online.learn(X_train[i:i + 1],
+                     y_train[i:i + 1],
+                     num_iter=0,
+                     verbose=False)
+    mean_online, std_online = online.predict(X_test)
+    # Rebuilding the statistics from all data gives the same posterior.
+    online._stats = None
+    mean_batch, std_batch = online.predict(X_test)
+    np.testing.assert_allclose(mean_online, mean_batch, atol=1e-6)
+    np.testing.assert_allclose(std_online, std_batch, atol=1e-6)
+
+
+def test_approximates_exact_gp(data):
+    X_train, y_train, X_test = data
+    torch.manual_seed(0)
+    approximate = RFFModel(device_name="cpu",
+                           kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                           noise=0.01,
+                           num_features=4096)
+    exact = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                     noise=0.01)
+    approximate.learn(X_train, y_train, num_iter=0, verbose=False)
+    exact.learn(X_train, y_train, num_iter=0, verbose=False)
+    mean_approx, _ = approximate.predict(X_test, mode="mean")
+    mean_exact, _ = exact.predict(X_test, mode="mean")
+    np.testing.assert_allclose(mean_approx, mean_exact, atol=0.1)
+
+
+def test_save_and_load(data, tmp_path):
+    X_train, y_train, X_test = data
+    model = RFFModel(device_name="cpu",
+                     kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                     noise=0.01,
+                     num_features=64)
+    model.learn(X_train[:30], y_train[:30], num_iter=10, verbose=False)
+    mean, std = model.predict(X_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    restored = RFFModel(device_name="cpu",
+                        kernel=GaussianKernel(2.0, 2.0, "cpu"),
+                        noise=0.1,
+                        num_features=64)
+    restored.load(str(path))
+    loaded_mean, loaded_std = restored.predict(X_test)
+    np.testing.assert_allclose(loaded_mean, mean)
+    np.testing.assert_allclose(loaded_std, std)
+
+    # New data updates the restored weight posterior in place.
+    model.learn(X_train[30:], y_train[30:], num_iter=0, verbose=False)
+    restored.learn(X_train[30:], y_train[30:], num_iter=0, verbose=False)
+    np.testing.assert_allclose(restored.predict(X_test)[0],
+                               model.predict(X_test)[0])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import GPRModel, SGPRModel
+from pypolo.models.kernels import GaussianKernel
+
+
+@pytest.fixture
+def data():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    X_train = np.random.uniform(-5, 5, size=(200, 1))
+    y_train = np.sin(X_train) + np.random.normal(0, 0.1, size=(200, 1))
+    X_test = np.linspace(-5, 5, num=100).reshape(-1, 1)
+    return X_train, y_train, X_test
+
+
+def test_predict(data, verbose):
+    X_train, y_train, X_test = data
+    kernel = GaussianKernel(lengthscale=1.0, amplitude=1.0, device_name="cpu")
+    x_inducing = np.linspace(-5, 5, num=15).reshape(-1, 1)
+    model = SGPRModel(device_name="cpu",
+                      kernel=kernel,
+                      noise=0.01,
+                      x_inducing=x_inducing)
+    model.learn(X_train, y_train, num_iter=200, verbose=verbose)
+    y_pred, y_std = model.predict(X_test)
+    assert y_pred.shape == (100, 1)
+    assert y_std.shape == (100, 1)
+    assert np.all(y_std >= 0)
+    rmse = np.sqrt(np.mean((y_pred.squeeze() - np.sin(X_test.squeeze()))**2))
+    assert rmse < (y_std.mean() + 0.01)
+
+
+def test_matches_exact_gp_with_training_inducing_inputs(data):
+    X_train, y_train, X_test = data
+    X_train, y_train = X_train[:30], y_train[:30]
+    sparse = SGPRModel(device_name="cpu",
+                       kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                       noise=0.01,
+                       x_inducing=X_train,
+                       learn_inducing=False)
+    exact = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                     noise=0.01)
+    sparse.learn(X_train, y_train, num_iter=0, verbose=False)
+    exact.learn(X_train, y_train, num_iter=0, verbose=False)
+    mean_sparse, std_sparse = sparse.predict(X_test)
+    mean_exact, std_exact = exact.predict(X_test)
+    np.testing.assert_allclose(mean_sparse, mean_exact, atol=1e-4)
+    np.testing.assert_allclose(std_sparse, std_exact, atol=1e-4)
+    # The collapsed bound is tight when inducing inputs are training inputs.
+    with torch.no_grad():
+        assert sparse._compute_loss().item() == pytest.approx(
+            exact._compute_loss().item(), rel=1e-4)
+
+
+def test_save_and_load(data, tmp_path):
+    X_train, y_train, X_test = data
+    x_inducing = np.linspace(-5, 5, num=15).reshape(-1, 1)
+    model = SGPRModel(device_name="cpu",
+                      kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                      noise=0.01,
+                      x_inducing=x_inducing)
+    model.learn(X_train, y_train, num_iter=10, verbose=False)
+    mean, std = model.predict(X_test)
+    path = tmp_path / "model.pt"
+    model.save(str(path))
+
+    restored = SGPRModel(device_name="cpu",
+                         kernel=GaussianKernel(2.0, 2.0, "cpu"),
+                         noise=0.1,
+                         x_inducing=np.zeros((15, 1)))
+    restored.load(str(path))
+    loaded_mean, loaded_std = restored.predict(X_test)
+    np.testing.assert_allclose(loaded_mean, mean)
+    np.testing.assert_allclose(loaded_std, std)
+
+    with pytest.raises(ValueError):
+        kernel = GaussianKernel(1.0, 1.0, "cpu")
+        GPRModel(device_name="cpu", kernel=kernel, noise=0.01).load(str(path))
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.models import GPRModel, VecchiaGPRModel
+from pypolo.models.kernels import GaussianKernel
+from pypolo.utils import torch_utils
+
+
+@pytest.fixture
+def data():
+    np.random.seed(123)
+    torch.manual_seed(123)
+    x_train = np.random.uniform(-5, 5, size=(60, 2))
+    y_train = np.sin(x_train[:, [0]]) * np.cos(x_train[:, [1]])
+    y_train += np.random.normal(0, 0.05, size=(60, 1))
+    x_test = np.random.uniform(-5, 5, size=(20, 2))
+    return x_train, y_train, x_test
+
+
+def test_nearest_neighbors_matches_brute_force():
+    torch.manual_seed(0)
+    x1 = 5 * torch.rand(50, 2, dtype=torch.double)
+    x2 = 5 * torch.rand(80, 2, dtype=torch.double)
+    indices = torch_utils.nearest_neighbors(x1, x2, 4)
+    expected = torch.cdist(x1, x2).topk(4, largest=False).indices
+    assert torch.equal(indices, expected)
+    # Every point only considers the points before it.
+    indices = torch_utils.nearest_neighbors(x2, x2, 4, torch.arange(80))
+    assert torch.all(indices[:4].diag() == -1)
+    for i in range(4, 80):
+        dist = torch.cdist(x2[i:i + 1], x2[:i])[0]
+        assert torch.equal(indices[i], dist.topk(4, largest=False).indices)
+
+
+def test_matches_exact_gp_with_all_neighbors(data):
+    x_train, y_train, x_test = data
+    vecchia = VecchiaGPRModel(device_name="cpu",
+                              kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                              noise=0.01,
+                              num_neighbors=60,
+                              batch_size=16)
+    exact = GPRModel(device_name="cpu",
+                     kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                     noise=0.01)
+    vecchia.learn(x_train[:25], y_train[:25], num_iter=0, verbose=False)
+    vecchia.learn(x_train[25:], y_train[25:], num_iter=0, verbose=False)
+    exact.learn(x_train, y_train, num_iter=0, verbose=False)
+    mean_vecchia, std_vecchia = vecchia.predict(x_test)
+    mean_exact, std_exact = exact.predict(x_test)
+    np.testing.assert_allclose(mean_vecchia, mean_exact, atol=1e-6)
+    np.testing.assert_allclose(std_vecchia, std_exact, atol=1e-6)
+    # Conditioning on all earlier samples is the exact factorization.
+    with torch.no_grad():
+        assert vecchia._compute_loss().item() == pytest.approx(
+            exact._compute_loss().item(), rel=1e-6)
+
+
+def test_learn_and_predict(data, verbose):
+    x_train, y_train, x_test = data
+    model = VecchiaGPRModel(device_name="cpu",
+                            kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                            noise=0.1,
+                            num_neighbors=8)
+    model.learn(x_train, y_train, num_iter=0, verbose=verbose)
+    assert model.neighbors.shape == (60, 8)
+    with torch.no_grad():
+        initial_loss = model._compute_loss().item()
+    model.learn(x_train[:0], y_train[:0], num_iter=30, verbose=verbose)
+    with torch.no_grad():
+        assert model._compute_loss().item() < initial_loss
+    mean, std = model.predict(x_test)
+    assert mean.shape == (20, 1)
+    assert std.shape == (20, 1)
+    assert np.all(std > 0)
+    mean, std = model.predict(x_test, mode="mean")
+    assert std is None
+    with pytest.raises(ValueError):
+        VecchiaGPRModel(device_name="cpu",
+                        kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                        noise=0.1,
+                        num_neighbors=0)
+
+
+def test_save_and_load(data, tmp_path):
+    x_train, y_train, x_test = data
+    model = VecchiaGPRModel(device_name="cpu",
+                            kernel=GaussianKernel(1.0, 1.0, "cpu"),
+                            noise=0.1,
+                            num_neighbors=8)
+    model.learn(x_train, y_train, num_iter=5, verbose=False)
+    path = tmp_path / "vecchia.pt"
+    model.save(path)
+    restored = VecchiaGPRModel(device_name="cpu",
+                               kernel=GaussianKernel(2.0, 2.0, "cpu"),
+                               noise=0.5,
+                               num_neighbors=8)
+    restored.load(path)
+    np.testing.assert_allclose(restored.predict(x_test)[0],
+                               model.predict(x_test)[0])
@@ -6,8 +6,9 @@ from pypolo.objectives.entropy import gaussian_entropy
 def test_single_std():
     x = np.array([2.0])
 
-    def predict(x):
-        return np.array([0.0]), np.array([1.0])
+    def predict(x, mode):
+        assert mode == "var"
+        return None, np.array([1.0])
 
     expected_entropy = np.array([1.4189385332046727])
     entropy = gaussian_entropy(predict, x)
@@ -18,8 +19,9 @@ def test_multiple_std():
 
     x = np.array([1.0, 2.0, 3.0])
 
-    def predict(x):
-        return x, x
+    def predict(x, mode):
+        assert mode == "var"
+        return None, x
 
     expected_entropy = np.array(
         [1.4189385332046727, 2.112085713764618, 2.5175508218727822])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import torch
+
+from pypolo.utils import TensorBuffer
+
+
+@pytest.fixture
+def buffer() -> TensorBuffer:
+    return TensorBuffer(torch.double, torch.device("cpu"), capacity=2)
+
+
+def test_empty(buffer: TensorBuffer):
+    assert len(buffer) == 0
+    assert buffer.capacity == 0
+    with pytest.raises(ValueError):
+        buffer.data
+
+
+def test_append(buffer: TensorBuffer):
+    values = np.arange(10, dtype=np.float64).reshape(5, 2)
+    buffer.append(values[:1])
+    assert len(buffer) == 1
+    assert buffer.capacity == 2
+    buffer.append(values[1:3])
+    assert len(buffer) == 3
+    assert buffer.capacity == 4
+    buffer.append(values[3:])
+    assert len(buffer) == 5
+    assert buffer.capacity == 8
+    assert buffer.data.dtype == torch.double
+    np.testing.assert_array_equal(buffer.data.numpy(), values)
+
+
+def test_append_does_not_reallocate_within_capacity(buffer: TensorBuffer):
+    buffer.append(np.zeros((1, 2)))
+    storage = buffer.data.data_ptr()
+    buffer.append(np.ones((1, 2)))
+    assert buffer.data.data_ptr() == storage
+
+
+def test_append_invalid_shape(buffer: TensorBuffer):
+    buffer.append(np.zeros((1, 2)))
+    with pytest.raises(ValueError):
+        buffer.append(np.zeros((1, 3)))
+
+
+def test_remove_first(buffer: TensorBuffer):
+    values = np.arange(10, dtype=np.float64).reshape(5, 2)
+    buffer.append(values)
+    capacity = buffer.capacity
+    buffer.remove_first(2)
+    assert len(buffer) == 3
+    assert buffer.capacity == capacity
+    np.testing.assert_array_equal(buffer.data.numpy(), values[2:])
+    buffer.append(values[:1])
+    np.testing.assert_array_equal(buffer.data.numpy()[-1], values[0])
+    with pytest.raises(ValueError):
+        buffer.remove_first(5)
+
+
+def test_views_are_not_modified(buffer: TensorBuffer):
+    values = np.arange(10, dtype=np.float64).reshape(5, 2)
+    buffer.append(values)
+    view = buffer.data
+    buffer.remove_first(2)
+    buffer.append(values)
+    np.testing.assert_array_equal(view.numpy(), values)